@@ -2,11 +2,12 @@
 AI功能路由 - 文本转视频、图生视频、即梦3.0图片生成、创意画布
 """
 
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Query
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Union
 import uuid
+import json
 import asyncio
 from datetime import datetime
 
@@ -21,16 +22,28 @@ from ai_types import (
     CreativeBoardGenerateRequest,
     CreativeBoardGenerateResponse,
     CreativeBoardGenerationStatusResponse,
+    CreativeBoardPreviewRequest,
     GenerationStatus,
     CreativeBoardSnapshot,
     GeneratedImagePreview,
+    LLMDirectiveBatchResponse,
     CreativeBoardWorkflowRunRequest,
     CreativeBoardWorkflowRunOptions,
+    WorkflowDryRunEstimate,
     WorkflowExecutionState,
     WorkflowExecutionListItem,
+    WorkflowNodeType,
     WorkflowRecomputeRequest,
+    WorkflowRunStatus,
 )
-from workflow_engine import workflow_engine, WorkflowExecutionError, WorkflowValidationError
+from workflow_engine import (
+    workflow_engine,
+    WorkflowExecutionError,
+    WorkflowQueueFullError,
+    WorkflowValidationError,
+)
+from workflow_events import WorkflowSubscriptionLimitError
+from workflow_index import encode_cursor
 
 router = APIRouter(prefix="/api/ai", tags=["AI功能"])
 
@@ -67,6 +80,8 @@ creative_board_task_index: Dict[str, str] = {}
 creative_board_workflow_board_index: Dict[str, str] = {}
 creative_board_workflow_owner_index: Dict[str, str] = {}
 creative_board_task_to_workflow: Dict[str, str] = {}
+# detach 模式下的本地任务ID -> 即梦任务ID（工作流尚未完成或提交失败时为 None）
+creative_board_provider_tasks: Dict[str, Optional[str]] = {}
 
 
 def _current_user_id(user: User) -> str:
@@ -84,8 +99,15 @@ def _get_draft_for_user(board_id: str, user_id: str) -> CreativeBoardDraft:
     return draft
 
 
-def _assert_workflow_access(workflow_id: str, user_id: str) -> None:
+async def _assert_workflow_access(workflow_id: str, user_id: str) -> None:
     owner_id = creative_board_workflow_owner_index.get(workflow_id)
+    if owner_id is None:
+        # 进程内索引可能在重启后丢失，或工作流由其他 worker 创建，回退到工作流引擎（含共享状态后端）查询
+        resolved = await workflow_engine.resolve_owner(workflow_id)
+        if resolved is not None and resolved[1]:
+            board_id, owner_id = resolved
+            creative_board_workflow_owner_index[workflow_id] = owner_id
+            creative_board_workflow_board_index[workflow_id] = board_id
     if owner_id is None:
         raise HTTPException(status_code=404, detail="工作流不存在")
     if owner_id != user_id:
@@ -161,6 +183,104 @@ def _derive_preview_title(request_title: Optional[str], snapshot: CreativeBoardS
     return base
 
 
+def _compose_generation_prompt(
+    execution,
+    snapshot: CreativeBoardSnapshot,
+    request: CreativeBoardGenerateRequest,
+) -> str:
+    prompt = execution.final_prompt or _build_board_prompt(
+        snapshot,
+        None,
+        request.focus_connection_ids,
+    )
+    if request.extra_prompt and request.extra_prompt.strip():
+        extra_prompt = request.extra_prompt.strip()
+        prompt = f"{prompt} {extra_prompt}".strip() if prompt else extra_prompt
+    return prompt
+
+
+def _store_generation_preview(board_id: str, preview: GeneratedImagePreview) -> None:
+    creative_board_generations[preview.task_id] = preview
+    draft = creative_board_drafts.get(board_id)
+    if not draft:
+        return
+    creative_board_drafts[board_id] = draft.copy(update={
+        "generations": [preview if item.task_id == preview.task_id else item for item in draft.generations],
+        "updated_at": datetime.now(),
+    })
+
+
+# 即梦生成请求的默认超时（秒）
+PROVIDER_TIMEOUT_SECONDS = 60.0
+
+
+def _provider_timeout(execution) -> Optional[float]:
+    """
+    即梦请求超时：不超过工作流截止时间的剩余预算；预算已耗尽时返回 None
+    """
+    budget = execution.remaining_budget()
+    if budget is None:
+        return PROVIDER_TIMEOUT_SECONDS
+    return min(PROVIDER_TIMEOUT_SECONDS, budget) if budget > 0 else None
+
+
+async def _dispatch_detached_generation(
+    execution,
+    task_id: str,
+    snapshot: CreativeBoardSnapshot,
+    request: CreativeBoardGenerateRequest,
+) -> None:
+    """
+    detach 模式：工作流在后台完成后再向即梦提交生成任务
+    """
+    preview = creative_board_generations.get(task_id)
+    board_id = creative_board_task_index.get(task_id)
+    if not preview or not board_id:
+        return
+
+    error_message = None
+    prompt = ""
+    timeout = _provider_timeout(execution)
+    if execution.state.status == WorkflowRunStatus.CANCELLED:
+        error_message = "工作流已被取消，未提交生成任务"
+    elif timeout is None:
+        error_message = "工作流已超出截止时间，未提交生成任务"
+    else:
+        prompt = _compose_generation_prompt(execution, snapshot, request)
+        if not prompt:
+            error_message = "画布内容不足以生成合成图"
+
+    provider_task_id = None
+    if error_message is None:
+        try:
+            provider_task_id = await asyncio.to_thread(
+                volcengine_service.dream_3_0_image_generation,
+                prompt=prompt,
+                style=request.style.value,
+                size=request.size.value,
+                timeout=timeout,
+            )
+        except Exception as exc:
+            error_message = f"创意画布生成失败: {str(exc)}"
+
+    if error_message is not None:
+        _store_generation_preview(board_id, preview.copy(update={
+            "status": GenerationStatus.FAILED,
+            "error_message": error_message,
+            "updated_at": datetime.now(),
+        }))
+        return
+
+    creative_board_provider_tasks[task_id] = provider_task_id
+    if task_id in tasks_storage:
+        tasks_storage[task_id]["request"]["prompt"] = prompt
+        tasks_storage[task_id]["provider_task_id"] = provider_task_id
+    _store_generation_preview(board_id, preview.copy(update={
+        "prompt": prompt,
+        "updated_at": datetime.now(),
+    }))
+
+
 def _default_board_name(snapshot: CreativeBoardSnapshot) -> str:
     if snapshot.connections:
         for connection in snapshot.connections:
@@ -550,40 +670,74 @@ async def generate_creative_board_image(
         metadata=options_metadata,
     )
 
-    try:
-        execution = await workflow_engine.start_workflow(
-            board_id=board_id,
-            snapshot=snapshot,
-            options=workflow_options,
-            owner_id=user_id,
-        )
-    except WorkflowValidationError as exc:
-        raise HTTPException(status_code=400, detail=f"工作流解析失败: {str(exc)}")
-    except WorkflowExecutionError as exc:
-        raise HTTPException(status_code=500, detail=f"工作流执行失败: {str(exc)}")
+    if request.detach:
+        # 立即返回本地任务ID，工作流在后台执行完成后再提交即梦任务
+        task_id = str(uuid.uuid4())
 
-    workflow_state = _register_workflow(execution, user_id)
+        async def on_workflow_finished(finished_execution) -> None:
+            await _dispatch_detached_generation(finished_execution, task_id, snapshot, request)
 
-    prompt = execution.final_prompt or _build_board_prompt(
-        snapshot,
-        None,
-        request.focus_connection_ids,
-    )
-    if request.extra_prompt and request.extra_prompt.strip():
-        extra_prompt = request.extra_prompt.strip()
-        prompt = f"{prompt} {extra_prompt}".strip() if prompt else extra_prompt
-
-    if not prompt:
-        raise HTTPException(status_code=400, detail="画布内容不足以生成合成图")
-
-    try:
-        task_id = volcengine_service.dream_3_0_image_generation(
-            prompt=prompt,
-            style=request.style.value,
-            size=request.size.value,
-        )
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"创意画布生成失败: {str(exc)}")
+        try:
+            execution = await workflow_engine.submit_workflow(
+                board_id=board_id,
+                snapshot=snapshot,
+                options=workflow_options,
+                owner_id=user_id,
+                on_finished=on_workflow_finished,
+            )
+        except WorkflowValidationError as exc:
+            raise HTTPException(status_code=400, detail=f"工作流解析失败: {str(exc)}")
+        except WorkflowQueueFullError as exc:
+            raise HTTPException(status_code=503, detail=f"工作流排队已满，请稍后重试: {str(exc)}")
+        except WorkflowExecutionError as exc:
+            raise HTTPException(status_code=500, detail=f"工作流执行失败: {str(exc)}")
+
+        workflow_state = _register_workflow(execution, user_id)
+        if execution.task_id:
+            # 相同提交已合并到进行中的工作流，复用其任务，避免重复提交即梦任务
+            task_id = execution.task_id
+        else:
+            # 新建的后台工作流，或合并到尚无任务的同步工作流：都由本次提交的回调在工作流结束后提交即梦任务
+            creative_board_provider_tasks[task_id] = None
+        prompt = ""
+    else:
+        try:
+            execution = await workflow_engine.start_workflow(
+                board_id=board_id,
+                snapshot=snapshot,
+                options=workflow_options,
+                owner_id=user_id,
+            )
+        except WorkflowValidationError as exc:
+            raise HTTPException(status_code=400, detail=f"工作流解析失败: {str(exc)}")
+        except WorkflowExecutionError as exc:
+            raise HTTPException(status_code=500, detail=f"工作流执行失败: {str(exc)}")
+
+        workflow_state = _register_workflow(execution, user_id)
+        if workflow_state.status == WorkflowRunStatus.CANCELLED:
+            raise HTTPException(status_code=409, detail="工作流已被取消，未提交生成任务")
+
+        prompt = _compose_generation_prompt(execution, snapshot, request)
+        if not prompt:
+            raise HTTPException(status_code=400, detail="画布内容不足以生成合成图")
+
+        if execution.task_id:
+            # 并发的相同提交共享同一次工作流执行，只提交一次即梦任务
+            task_id = execution.task_id
+        else:
+            # 即梦请求只能使用工作流截止时间剩下的预算，保证整体延迟有上限
+            timeout = _provider_timeout(execution)
+            if timeout is None:
+                raise HTTPException(status_code=504, detail="工作流已超出截止时间，未提交生成任务")
+            try:
+                task_id = volcengine_service.dream_3_0_image_generation(
+                    prompt=prompt,
+                    style=request.style.value,
+                    size=request.size.value,
+                    timeout=timeout,
+                )
+            except Exception as exc:
+                raise HTTPException(status_code=500, detail=f"创意画布生成失败: {str(exc)}")
 
     workflow_engine.attach_task(execution.workflow_id, task_id)
     creative_board_task_to_workflow[task_id] = execution.workflow_id
@@ -656,7 +810,7 @@ async def generate_creative_board_image(
 
 
 
-@router.post("/creative-board/workflows/run", response_model=WorkflowExecutionState)
+@router.post("/creative-board/workflows/run", response_model=Union[WorkflowExecutionState, WorkflowDryRunEstimate])
 async def run_creative_board_workflow(
     request: CreativeBoardWorkflowRunRequest,
     current_user: User = Depends(get_current_user)
@@ -664,8 +818,20 @@ async def run_creative_board_workflow(
     user_id = _current_user_id(current_user)
     board_id = request.board_id or str(uuid.uuid4())
 
+    if request.options.dry_run:
+        # dry_run 只做预估：哪些节点会执行 / 命中缓存、调用外部服务次数、关键路径与预计耗时，不执行任何节点
+        try:
+            # 此接口只运行工作流，不会提交即梦生成任务
+            return workflow_engine.estimate_workflow(
+                board_id, request.snapshot, options=request.options, provider_generations=0
+            )
+        except WorkflowValidationError as exc:
+            raise HTTPException(status_code=400, detail=f"工作流解析失败: {str(exc)}")
+
+    # detach 模式只登记执行记录并立即返回，由后台执行池运行工作流
+    run = workflow_engine.submit_workflow if request.options.detach else workflow_engine.start_workflow
     try:
-        execution = await workflow_engine.start_workflow(
+        execution = await run(
             board_id=board_id,
             snapshot=request.snapshot,
             options=request.options,
@@ -673,6 +839,8 @@ async def run_creative_board_workflow(
         )
     except WorkflowValidationError as exc:
         raise HTTPException(status_code=400, detail=f"工作流解析失败: {str(exc)}")
+    except WorkflowQueueFullError as exc:
+        raise HTTPException(status_code=503, detail=f"工作流排队已满，请稍后重试: {str(exc)}")
     except WorkflowExecutionError as exc:
         raise HTTPException(status_code=500, detail=f"工作流执行失败: {str(exc)}")
 
@@ -682,14 +850,69 @@ async def run_creative_board_workflow(
 @router.get("/creative-board/workflows/{workflow_id}", response_model=WorkflowExecutionState)
 async def get_creative_board_workflow_state(
     workflow_id: str,
+    since_version: Optional[int] = Query(default=None, ge=0),
     current_user: User = Depends(get_current_user)
 ):
     user_id = _current_user_id(current_user)
-    _assert_workflow_access(workflow_id, user_id)
+    await _assert_workflow_access(workflow_id, user_id)
+    # since_version 早于 node_set_version 时节点有增删，返回完整快照，客户端应整体替换节点列表
     try:
-        return workflow_engine.get_state(workflow_id)
+        state = await workflow_engine.fetch_state(workflow_id, since_version=since_version)
     except WorkflowExecutionError as exc:
         raise HTTPException(status_code=404, detail=str(exc))
+    # 状态快照不可变，直接序列化即可，省去 response_model 的再次校验
+    return Response(content=state.model_dump_json(), media_type="application/json")
+
+
+def _format_sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@router.get("/creative-board/workflows/{workflow_id}/events")
+async def stream_creative_board_workflow_events(
+    workflow_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    工作流进度推送接口（SSE），按节点推送增量状态
+    """
+    user_id = _current_user_id(current_user)
+    await _assert_workflow_access(workflow_id, user_id)
+    try:
+        # 先订阅再读取初始状态，避免丢失两者之间的变更
+        subscription = workflow_engine.subscribe(workflow_id)
+    except WorkflowExecutionError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except WorkflowSubscriptionLimitError:
+        raise HTTPException(status_code=429, detail="该工作流的订阅连接过多")
+
+    async def event_stream():
+        try:
+            try:
+                state = await workflow_engine.fetch_state(workflow_id)
+            except WorkflowExecutionError as exc:
+                yield _format_sse("error", json.dumps({"detail": str(exc)}, ensure_ascii=False))
+                return
+            yield _format_sse("snapshot", state.model_dump_json())
+            if state.status.value in {"completed", "partial", "failed", "cancelled"}:
+                return
+            while True:
+                batch = await subscription.next_batch(timeout=15.0)
+                if batch is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in batch:
+                    yield _format_sse(event["type"], json.dumps(event, ensure_ascii=False))
+                if subscription.finished:
+                    return
+        finally:
+            workflow_engine.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/creative-board/workflows/{workflow_id}/rerun", response_model=WorkflowExecutionState)
@@ -699,7 +922,7 @@ async def rerun_creative_board_workflow(
     current_user: User = Depends(get_current_user)
 ):
     user_id = _current_user_id(current_user)
-    _assert_workflow_access(workflow_id, user_id)
+    await _assert_workflow_access(workflow_id, user_id)
     try:
         execution = await workflow_engine.recompute_workflow(
             workflow_id,
@@ -713,15 +936,109 @@ async def rerun_creative_board_workflow(
     return execution.snapshot_state()
 
 
+@router.post("/creative-board/workflows/{workflow_id}/cancel", response_model=WorkflowExecutionState)
+async def cancel_creative_board_workflow(
+    workflow_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    取消正在运行的工作流：停止调度新节点并中断执行中的节点，已完成的节点结果保留
+    """
+    user_id = _current_user_id(current_user)
+    await _assert_workflow_access(workflow_id, user_id)
+    try:
+        # 工作流由其他 worker 执行时，取消请求会通过共享状态后端转发，此处返回当前状态
+        await workflow_engine.cancel_workflow(workflow_id)
+        return await workflow_engine.fetch_state(workflow_id)
+    except WorkflowExecutionError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+
+
 @router.get("/creative-board/{board_id}/workflows", response_model=List[WorkflowExecutionListItem])
 async def list_creative_board_workflows(
     board_id: str,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=500),
+    after: Optional[str] = Query(default=None),
     current_user: User = Depends(get_current_user)
 ):
+    """
+    按更新时间倒序分页列出画布的工作流执行记录；还有下一页时通过 X-Next-Cursor 响应头返回游标，作为 after 参数传入
+    """
     user_id = _current_user_id(current_user)
     if board_id in creative_board_drafts:
         _get_draft_for_user(board_id, user_id)
-    return workflow_engine.list_executions(board_id=board_id, owner_id=user_id)
+    try:
+        items = await workflow_engine.list_executions(board_id=board_id, owner_id=user_id, limit=limit, after=after)
+    except WorkflowValidationError:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    if len(items) == limit:
+        last = items[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor((last.updated_at, last.workflow_id))
+    return items
+
+
+@router.get("/creative-board/{board_id}/directives", response_model=LLMDirectiveBatchResponse)
+async def resolve_creative_board_directives(
+    board_id: str,
+    use_llm: bool = Query(default=False),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    批量解析画布草稿中所有连线上的指令文字：相同文本只解析一次，结果跨执行缓存
+    """
+    user_id = _current_user_id(current_user)
+    draft = _get_draft_for_user(board_id, user_id)
+    return await workflow_engine.resolve_directives(draft.snapshot, use_llm=use_llm)
+
+
+@router.post("/creative-board/preview")
+async def render_creative_board_preview(
+    request: CreativeBoardPreviewRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    本地合成画布预览图（PNG）：按图片位置、尺寸、旋转、缩放、层级与图层可见性平铺渲染，不调用即梦接口
+    """
+    user_id = _current_user_id(current_user)
+    snapshot = request.snapshot
+    if snapshot is None and request.board_id:
+        snapshot = _get_draft_for_user(request.board_id, user_id).snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=400, detail="请先提供画布状态数据")
+    try:
+        path = await workflow_engine.render_preview(snapshot, max_edge=request.max_edge)
+    except WorkflowExecutionError as exc:
+        raise HTTPException(status_code=503, detail=f"本地预览不可用: {str(exc)}")
+    return FileResponse(path, media_type="image/png")
+
+
+@router.get("/creative-board/previews/{key}.png")
+async def get_creative_board_preview(key: str):
+    """
+    读取已渲染的预览图（工作流合成节点的输出地址）；文件名为内容哈希，不可枚举，便于 <img> 直接引用
+    """
+    if len(key) != 64 or any(char not in "0123456789abcdef" for char in key):
+        raise HTTPException(status_code=404, detail="预览图不存在")
+    path = workflow_engine.preview_path(key)
+    if path is None:
+        raise HTTPException(status_code=404, detail="预览图不存在或已过期")
+    return FileResponse(path, media_type="image/png", headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+
+@router.get("/creative-board/workflow-metrics")
+async def get_creative_board_workflow_metrics(
+    node_type: Optional[WorkflowNodeType] = Query(default=None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    工作流引擎指标：按节点类型统计的耗时、排队等待、缓存命中与输出大小直方图，以及引擎缓存与队列计数
+    """
+    _current_user_id(current_user)
+    return {
+        **workflow_engine.metrics(node_type),
+        "engine": workflow_engine.stats(),
+    }
 
 @router.get("/creative-board/generate/{task_id}", response_model=CreativeBoardGenerationStatusResponse)
 async def get_creative_board_generation_status(
@@ -742,12 +1059,30 @@ async def get_creative_board_generation_status(
     workflow_id = preview.workflow_id or creative_board_task_to_workflow.get(task_id)
     if workflow_id:
         try:
-            _assert_workflow_access(workflow_id, user_id)
+            await _assert_workflow_access(workflow_id, user_id)
         except HTTPException:
             workflow_id = None
 
+    provider_task_id = creative_board_provider_tasks.get(task_id, task_id)
+    if provider_task_id is None:
+        # detach 模式下工作流尚未完成（或提交失败），直接返回本地记录
+        workflow_state = None
+        if workflow_id:
+            try:
+                workflow_state = await workflow_engine.fetch_state(workflow_id)
+            except WorkflowExecutionError:
+                workflow_state = None
+        return CreativeBoardGenerationStatusResponse(
+            board_id=board_id,
+            task_id=task_id,
+            status=preview.status,
+            preview=preview,
+            workflow_id=workflow_id,
+            workflow_state=workflow_state,
+        )
+
     try:
-        result = volcengine_service.get_dream_3_image_status(task_id)
+        result = volcengine_service.get_dream_3_image_status(provider_task_id)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"查询生成状态失败: {str(exc)}")
 
@@ -762,9 +1097,9 @@ async def get_creative_board_generation_status(
     final_asset = getattr(result, "video_url", None) or getattr(result, "image_url", None) or preview.image_url
     if workflow_id:
         if updated_status == GenerationStatus.COMPLETED and final_asset:
-            workflow_engine.update_output_asset(workflow_id, final_asset)
+            await workflow_engine.update_output_asset(workflow_id, final_asset)
         elif updated_status == GenerationStatus.FAILED:
-            workflow_engine.update_output_asset(workflow_id, None)
+            await workflow_engine.update_output_asset(workflow_id, None)
 
     updated_preview = preview.copy(update={
         "status": updated_status,
@@ -789,7 +1124,7 @@ async def get_creative_board_generation_status(
     workflow_state = None
     if workflow_id:
         try:
-            workflow_state = workflow_engine.get_state(workflow_id)
+            workflow_state = await workflow_engine.fetch_state(workflow_id)
         except WorkflowExecutionError:
             workflow_state = None
 
@@ -119,8 +119,8 @@ class CanvasPoint(BaseModel):
 
 class CanvasSize(BaseModel):
     """Canvas dimensions."""
-    width: float
-    height: float
+    width: float = Field(ge=0, le=100_000)
+    height: float = Field(ge=0, le=100_000)
 
 
 class CanvasBounds(BaseModel):
@@ -128,7 +128,7 @@ class CanvasBounds(BaseModel):
     position: CanvasPoint
     size: CanvasSize
     rotation: float = 0.0
-    scale: float = 1.0
+    scale: float = Field(default=1.0, gt=0, le=100)
 
 
 class CreativeImageSource(str, Enum):
@@ -284,6 +284,14 @@ class CanvasWorkflowDefinition(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
+class WorkflowNodeTiming(BaseModel):
+    """Monotonic timing measurements for one node evaluation."""
+    queue_wait_ms: float = 0.0
+    duration_ms: float = 0.0
+    cache: Literal["computed", "shared", "reused"] = "computed"
+    metadata_bytes: int = 0
+
+
 class WorkflowNodeState(BaseModel):
     """Runtime state for a workflow node execution."""
     node_id: str
@@ -296,6 +304,26 @@ class WorkflowNodeState(BaseModel):
     error_message: Optional[str] = None
     cached: bool = False
     upstream_ids: List[str] = Field(default_factory=list)
+    timing: Optional[WorkflowNodeTiming] = None
+
+
+class WorkflowNodeTypeTiming(BaseModel):
+    """Node timings of one node type aggregated over an execution."""
+    node_type: WorkflowNodeType
+    count: int = 0
+    cached: int = 0
+    failed: int = 0
+    duration_ms: float = 0.0
+    max_duration_ms: float = 0.0
+    queue_wait_ms: float = 0.0
+    metadata_bytes: int = 0
+
+
+class WorkflowTimingBreakdown(BaseModel):
+    """Where the time of an execution went, grouped by node type."""
+    wall_ms: float = 0.0
+    admission_wait_ms: float = 0.0
+    by_type: List[WorkflowNodeTypeTiming] = Field(default_factory=list)
 
 
 class WorkflowExecutionState(BaseModel):
@@ -309,6 +337,11 @@ class WorkflowExecutionState(BaseModel):
     updated_at: Optional[datetime] = None
     current_node_id: Optional[str] = None
     error_message: Optional[str] = None
+    version: int = 0
+    # Version at which nodes were last added or removed; a delta requested from an older version
+    # cannot express removals, so it is answered with every node state and replaces the client's list.
+    node_set_version: int = 0
+    timing: Optional[WorkflowTimingBreakdown] = None
 
 
 class LLMDirectiveResolution(BaseModel):
@@ -385,6 +418,12 @@ class CreativeBoardWorkflowRunOptions(BaseModel):
     greedy_cache: bool = True
     focus_node_ids: Optional[List[str]] = None
     priority: Literal["low", "normal", "high"] = "normal"
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+    supersede_previous: bool = True
+    detach: bool = False
+    failure_mode: Literal["fail_fast", "continue"] = "fail_fast"
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)
+    dry_run: bool = False
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
@@ -397,7 +436,7 @@ class CreativeBoardWorkflowRunRequest(BaseModel):
 
 class WorkflowRecomputeRequest(BaseModel):
     """Payload to trigger a partial workflow recompute."""
-    node_ids: List[str]
+    node_ids: List[str] = Field(default_factory=list)
     snapshot: Optional[CreativeBoardSnapshot] = None
     options: CreativeBoardWorkflowRunOptions = Field(default_factory=CreativeBoardWorkflowRunOptions)
 
@@ -418,6 +457,18 @@ class WorkflowExecutionListItem(BaseModel):
     updated_at: datetime
 
 
+class WorkflowDryRunEstimate(BaseModel):
+    """Predicted work and latency of a workflow run, computed without evaluating any node."""
+    board_id: str
+    nodes_to_run: List[str] = Field(default_factory=list)
+    cached_node_ids: List[str] = Field(default_factory=list)
+    provider_calls: int = 0
+    critical_path: List[str] = Field(default_factory=list)
+    estimated_latency_ms: float = 0.0
+    estimated_latency_p95_ms: float = 0.0
+    unestimated_node_types: List[WorkflowNodeType] = Field(default_factory=list)
+
+
 class LLMDirectiveBatchResponse(BaseModel):
     """Batch response for resolved directives on connections."""
     workflow_id: Optional[str] = None
@@ -434,6 +485,14 @@ class CreativeBoardGenerateRequest(BaseModel):
     size: Dream3Size = Dream3Size.SQUARE_1024
     quality: Literal["standard", "hd"] = "hd"
     title: Optional[str] = None
+    detach: bool = False
+
+
+class CreativeBoardPreviewRequest(BaseModel):
+    """Render a local flat preview of a board without calling the generation provider."""
+    board_id: Optional[str] = None
+    snapshot: Optional[CreativeBoardSnapshot] = None
+    max_edge: int = Field(default=1440, ge=64, le=4096)
 
 
 class CreativeBoardGenerateResponse(BaseModel):
@@ -32,6 +32,7 @@ from auth_service import (
 from video_routes import router as video_router
 from creative_board_routes import router as creative_board_router
 from ai_routes import router as ai_router
+from workflow_engine import workflow_engine
 
 # 应用生命周期管理
 @asynccontextmanager
@@ -48,8 +49,22 @@ async def lifespan(app: FastAPI):
         print("✅ 数据库连接正常")
     except Exception as e:
         print(f"❌ 数据库连接失败: {e}")
+
+    # 启动工作流后台执行池
+    workflow_engine.start_workers()
+
+    # 从工作流日志恢复执行记录
+    try:
+        restored = await workflow_engine.restore()
+        if restored:
+            print(f"✅ 已从日志恢复 {restored} 个工作流执行")
+    except Exception as e:
+        print(f"❌ 工作流日志恢复失败: {e}")
     
     yield
+
+    # 等待后台工作流执行完毕，超时后中断
+    await workflow_engine.shutdown(timeout=float(os.getenv("WORKFLOW_SHUTDOWN_GRACE", "30")))
     
     print("👋 万相营造服务器关闭")
 
@@ -0,0 +1,342 @@
+"""Offline benchmark for the creative board workflow engine.
+
+Builds synthetic boards in several shapes and times the engine's hot paths
+(graph derivation, plan compilation, topological sort, full runs, single-node
+recomputes and state snapshots) together with their peak Python allocations.
+No provider is called, so results only reflect engine overhead. Each board runs
+in its own subprocess under a time and address-space limit, so a shape that
+blows up is reported as an error instead of taking the whole run down.
+
+Run from the ``backend`` directory::
+
+    python benchmarks/workflow_bench.py --sizes 1000 10000
+    python benchmarks/workflow_bench.py --shapes chain random_dag --json results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import traceback
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_types import (  # noqa: E402
+    CanvasBounds,
+    CanvasConnection,
+    CanvasImage,
+    CanvasPoint,
+    CanvasSize,
+    ConnectionEndpoint,
+    ConnectionLabel,
+    CreativeBoardSnapshot,
+    CreativeBoardWorkflowRunOptions,
+)
+from workflow_engine import WorkflowEngine, _compute_topological_order, _plan_cache  # noqa: E402
+
+SHAPES = ("chain", "fan_in", "fan_out", "random_dag")
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+
+def _image(index: int) -> CanvasImage:
+    return CanvasImage(
+        id=f"img-{index}",
+        url=f"https://example.invalid/{index}.png",
+        name=f"image {index}",
+        description=f"element {index}",
+        bounds=CanvasBounds(
+            position=CanvasPoint(x=float(index % 100) * 12, y=float(index // 100) * 12),
+            size=CanvasSize(width=96, height=96),
+        ),
+        z_index=index,
+    )
+
+
+def _edges(shape: str, size: int, rng: random.Random, degree: int) -> List[Tuple[int, int]]:
+    if size < 2:
+        return []
+    if shape == "chain":
+        return [(index, index + 1) for index in range(size - 1)]
+    if shape == "fan_in":
+        return [(index, size - 1) for index in range(size - 1)]
+    if shape == "fan_out":
+        return [(0, index) for index in range(1, size)]
+    if shape == "random_dag":
+        # Edges only point from lower to higher indices, so the graph is acyclic by construction.
+        pairs = set()
+        for target in range(1, size):
+            for _ in range(rng.randint(1, degree)):
+                pairs.add((rng.randrange(max(0, target - 64), target), target))
+        return sorted(pairs)
+    raise ValueError(f"Unknown shape: {shape}")
+
+
+def build_snapshot(shape: str, size: int, *, seed: int = 0, degree: int = 2) -> CreativeBoardSnapshot:
+    """Board of ``size`` images wired as ``shape``; every connection carries a label."""
+
+    rng = random.Random(f"{shape}:{size}:{seed}")
+    connections = [
+        CanvasConnection(
+            id=f"conn-{number}",
+            source=ConnectionEndpoint(image_id=f"img-{source}"),
+            target=ConnectionEndpoint(image_id=f"img-{target}"),
+            # A small label vocabulary keeps directive memoization representative.
+            label=ConnectionLabel(text=f"blend {number % 32}", position=CanvasPoint(x=0, y=0)),
+        )
+        for number, (source, target) in enumerate(_edges(shape, size, rng, degree))
+    ]
+    return CreativeBoardSnapshot(images=[_image(index) for index in range(size)], connections=connections)
+
+
+@dataclass
+class PhaseResult:
+    shape: str
+    size: int
+    phase: str
+    seconds: Optional[float]
+    peak_bytes: Optional[int]
+    error: Optional[str] = None
+
+
+async def _call(func: Callable[[Any], Any], context: Any) -> None:
+    result = func(context)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def _measure(
+    prepare: Callable[[], Awaitable[Any]],
+    func: Callable[[Any], Any],
+    *,
+    repeat: int,
+    memory: bool,
+) -> Tuple[float, Optional[int]]:
+    """Best-of-``repeat`` wall time, then one traced pass for peak allocations."""
+
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        context = await prepare()
+        started = time.perf_counter()
+        await _call(func, context)
+        best = min(best, time.perf_counter() - started)
+    peak = None
+    if memory:
+        # Tracing slows allocation-heavy code several times over, so it gets a pass of its own.
+        context = await prepare()
+        tracemalloc.start()
+        try:
+            await _call(func, context)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+async def _bench_board(shape: str, size: int, args: argparse.Namespace, emit: Callable[[PhaseResult], None]) -> None:
+    snapshot = build_snapshot(shape, size, seed=args.seed, degree=args.degree)
+    # Disable cross-execution reuse so every node is evaluated.
+    options = CreativeBoardWorkflowRunOptions(greedy_cache=False, max_concurrency=64)
+    engine = WorkflowEngine(max_concurrency=64)
+    baseline: Dict[str, Any] = {}
+
+    async def measure(phase: str, prepare: Callable[[], Awaitable[Any]], func: Callable[[Any], Any]) -> None:
+        seconds, peak = await _measure(prepare, func, repeat=args.repeat, memory=args.memory)
+        emit(PhaseResult(shape=shape, size=size, phase=phase, seconds=seconds, peak_bytes=peak))
+
+    async def nothing() -> None:
+        return None
+
+    async def fresh_execution() -> Any:
+        return await engine._create_execution(f"bench-{shape}", snapshot, options=options, owner_id=None)
+
+    async def cold_plan() -> Any:
+        _plan_cache.clear()
+        return baseline["execution"]
+
+    async def warm_plan() -> Any:
+        return baseline["execution"]
+
+    async def edge_map() -> Any:
+        execution = baseline["execution"]
+        return execution.definition.nodes, execution.edges_by_source
+
+    async def completed() -> Any:
+        return baseline["execution"]
+
+    async def dirty_state() -> Any:
+        execution = baseline["execution"]
+        execution.commit_state()
+        return execution
+
+    await measure("derive_workflow", nothing, lambda _: engine._derive_workflow(snapshot))
+    baseline["execution"] = await fresh_execution()
+    await measure("rebuild_graph_cold", cold_plan, lambda execution: execution.rebuild_graph())
+    await measure("rebuild_graph_warm", warm_plan, lambda execution: execution.rebuild_graph())
+    await measure("topological_order", edge_map, lambda pair: _compute_topological_order(*pair))
+    await measure("run_execution", fresh_execution, lambda execution: engine._run_execution(execution, None))
+
+    # A completed run of its own is the baseline for the incremental phases below.
+    baseline["execution"] = await fresh_execution()
+    await engine._run_execution(baseline["execution"], None)
+    dirty_node = f"image-img-{size // 2}"
+    await measure(
+        "recompute_single_node",
+        completed,
+        lambda execution: engine.recompute_workflow(execution.workflow_id, node_ids=[dirty_node]),
+    )
+    await measure("snapshot_state_full", dirty_state, lambda execution: execution.snapshot_state())
+    await measure(
+        "snapshot_state_delta",
+        completed,
+        lambda execution: execution.snapshot_state(since_version=max(0, execution.state.version - 1)),
+    )
+
+
+def _run_worker(args: argparse.Namespace) -> int:
+    """Benchmark one board, writing each phase as a JSON line on stdout."""
+
+    shape, _, size = args.board.partition(":")
+    if args.memory_limit_mb > 0:
+        try:
+            import resource
+
+            limit = args.memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+
+    def emit(item: PhaseResult) -> None:
+        sys.stdout.write(json.dumps(asdict(item)) + "\n")
+        sys.stdout.flush()
+
+    try:
+        asyncio.run(_bench_board(shape, int(size), args, emit))
+    except MemoryError:
+        sys.stderr.write("MemoryError\n")
+        return 1
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def _run_board(shape: str, size: int, args: argparse.Namespace, passthrough: List[str]) -> List[PhaseResult]:
+    command = [sys.executable, os.path.abspath(__file__), "--board", f"{shape}:{size}", *passthrough]
+    error: Optional[str] = None
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=args.timeout)
+        stdout = completed.stdout
+        if completed.returncode < 0:
+            # Killed by a signal, typically the kernel OOM killer.
+            error = f"killed by signal {-completed.returncode}"
+        elif completed.returncode:
+            error = (completed.stderr.strip().splitlines() or [f"exit code {completed.returncode}"])[-1]
+    except subprocess.TimeoutExpired as exc:
+        stdout = exc.stdout.decode() if isinstance(exc.stdout, bytes) else (exc.stdout or "")
+        error = f"timed out after {args.timeout:g}s"
+    results = [PhaseResult(**json.loads(line)) for line in stdout.splitlines() if line.strip()]
+    if error is not None:
+        results.append(PhaseResult(shape=shape, size=size, phase="error", seconds=None, peak_bytes=None, error=error))
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_bytes(value: Optional[int]) -> str:
+    if value is None:
+        return "-"
+    return f"{value / (1024 * 1024):.1f}MiB"
+
+
+def _describe(item: PhaseResult) -> str:
+    if item.error is not None:
+        return f"error={item.error}"
+    return f"{item.phase}={item.seconds * 1000:.1f}ms/{_format_bytes(item.peak_bytes)}"
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--repeat", type=int, default=1, help="timed passes per phase; the best one is reported")
+    parser.add_argument("--seed", type=int, default=0, help="seed for random_dag boards")
+    parser.add_argument("--degree", type=int, default=2, help="max inbound connections per random_dag image")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc pass")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds allowed per board")
+    parser.add_argument("--memory-limit-mb", type=int, default=4096, help="address-space cap per board, 0 to disable")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON to PATH ('-' for stdout)")
+    parser.add_argument("--board", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.board:
+        return _run_worker(args)
+
+    passthrough = [
+        "--repeat", str(args.repeat),
+        "--seed", str(args.seed),
+        "--degree", str(args.degree),
+        "--memory-limit-mb", str(args.memory_limit_mb),
+    ]
+    if not args.memory:
+        passthrough.append("--no-memory")
+    log = sys.stderr if args.json == "-" else sys.stdout
+
+    results: List[PhaseResult] = []
+    for shape in args.shapes:
+        for size in args.sizes:
+            board = _run_board(shape, size, args, passthrough)
+            results.extend(board)
+            print(f"{shape:<10} images={size:<6} " + "  ".join(_describe(item) for item in board), file=log, flush=True)
+
+    if args.json:
+        payload = {
+            "generated_at": datetime.utcnow().isoformat(),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {
+                "sizes": args.sizes,
+                "shapes": args.shapes,
+                "repeat": args.repeat,
+                "seed": args.seed,
+                "degree": args.degree,
+                "memory": args.memory,
+                "timeout": args.timeout,
+                "memory_limit_mb": args.memory_limit_mb,
+            },
+            "results": [asdict(item) for item in results],
+        }
+        if args.json == "-":
+            json.dump(payload, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            with open(args.json, "w", encoding="utf-8") as handle:
+                json.dump(payload, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other as top-level modules.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_types import (  # noqa: E402
+    CanvasBounds,
+    CanvasConnection,
+    CanvasImage,
+    CanvasPoint,
+    CanvasSize,
+    CanvasWorkflowDefinition,
+    ConnectionEndpoint,
+    ConnectionLabel,
+    CreativeBoardSnapshot,
+    WorkflowEdge,
+    WorkflowNodeConfig,
+    WorkflowNodeDefinition,
+    WorkflowNodeType,
+    WorkflowPort,
+)
+
+
+def build_snapshot(count: int = 4, *, labels: bool = False, url: str = "http://assets.test/{index}.png"):
+    """``count`` source images all connected into one sink image."""
+
+    images = [
+        CanvasImage(
+            id=f"i{index}",
+            url=url.format(index=index),
+            name=f"image {index}",
+            description=f"description {index}",
+            bounds=CanvasBounds(position=CanvasPoint(x=index * 10, y=index * 5), size=CanvasSize(width=100, height=80)),
+            z_index=index,
+        )
+        for index in range(count + 1)
+    ]
+    connections = [
+        CanvasConnection(
+            id=f"c{index}",
+            source=ConnectionEndpoint(image_id=f"i{index}"),
+            target=ConnectionEndpoint(image_id=f"i{count}"),
+            label=ConnectionLabel(text=f"把 label {index}", position=CanvasPoint(x=0, y=0)) if labels else None,
+        )
+        for index in range(count)
+    ]
+    return CreativeBoardSnapshot(images=images, connections=connections)
+
+
+def build_graph(edges, *, isolated=()):
+    """Board whose explicit workflow is a graph of PROMPT nodes joined by ``(source, target)`` edges."""
+
+    node_ids = list(dict.fromkeys([node_id for edge in edges for node_id in edge] + list(isolated)))
+    nodes = [
+        WorkflowNodeDefinition(
+            id=node_id, type=WorkflowNodeType.PROMPT, title=node_id, config=WorkflowNodeConfig(prompt=node_id)
+        )
+        for node_id in node_ids
+    ]
+    workflow_edges = [
+        WorkflowEdge(id=f"{source}-{target}", source=WorkflowPort(node_id=source), target=WorkflowPort(node_id=target))
+        for source, target in edges
+    ]
+    targets = {target for _, target in edges}
+    sources = {source for source, _ in edges}
+    return CreativeBoardSnapshot(
+        workflow=CanvasWorkflowDefinition(
+            nodes=nodes,
+            edges=workflow_edges,
+            entry_ids=[node_id for node_id in node_ids if node_id not in targets],
+            output_ids=[node_id for node_id in node_ids if node_id not in sources],
+        )
+    )
+
+
+@pytest.fixture
+def make_snapshot():
+    return build_snapshot
+
+
+@pytest.fixture
+def make_graph():
+    return build_graph
@@ -0,0 +1,130 @@
+import asyncio
+
+from ai_types import CreativeBoardWorkflowRunOptions, WorkflowRunStatus
+from workflow_engine import WorkflowEngine, WorkflowQueueFullError
+
+
+def _counting(engine, gate=None):
+    """Wrap node evaluation to count calls and optionally hold every node until ``gate`` is set."""
+
+    calls = []
+    evaluate = engine._evaluate_node
+
+    async def wrapper(execution, node, upstream_items, *args):
+        calls.append((execution.workflow_id, node.id))
+        if gate is not None:
+            await gate.wait()
+        return await evaluate(execution, node, upstream_items, *args)
+
+    engine._evaluate_node = wrapper
+    return calls
+
+
+def test_rerun_of_a_queued_detached_execution_runs_once(make_snapshot):
+    async def scenario():
+        engine = WorkflowEngine(background_workers=1)
+        gate = asyncio.Event()
+        calls = _counting(engine, gate)
+        finished = []
+
+        async def on_finished(execution):
+            finished.append(execution.state.status)
+
+        blocker = await engine.submit_workflow("board", make_snapshot(1), owner_id="a")
+        # No shared result cache, so a second run would show up as extra node evaluations.
+        queued = await engine.submit_workflow(
+            "other",
+            make_snapshot(3),
+            owner_id="b",
+            options=CreativeBoardWorkflowRunOptions(greedy_cache=False),
+            on_finished=on_finished,
+        )
+        await asyncio.sleep(0.01)
+        assert queued.state.status == WorkflowRunStatus.NOT_STARTED
+
+        rerun = asyncio.create_task(engine.recompute_workflow(queued.workflow_id))
+        await asyncio.sleep(0.01)
+        gate.set()
+        await rerun
+        await engine.shutdown(timeout=5)
+
+        node_count = len(queued.topological_order)
+        assert sum(1 for workflow_id, _ in calls if workflow_id == queued.workflow_id) == node_count
+        assert blocker.state.status == WorkflowRunStatus.COMPLETED
+        # The detached submitter hears about the execution exactly once, after the rerun settled.
+        assert finished == [WorkflowRunStatus.COMPLETED]
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_submissions_beyond_queue_capacity_fail_cleanly(make_snapshot):
+    async def scenario():
+        engine = WorkflowEngine(background_workers=1, background_queue_size=1)
+        gate = asyncio.Event()
+        _counting(engine, gate)
+        busy = await engine.submit_workflow("busy", make_snapshot(1))
+        await asyncio.sleep(0.01)  # the worker takes it and blocks; the queue is empty again
+
+        # Hold the registry lock so every submitter is suspended while registering its execution.
+        async with engine._lock:
+            submitters = [
+                asyncio.ensure_future(engine.submit_workflow(f"board-{index}", make_snapshot(2))) for index in range(4)
+            ]
+            await asyncio.sleep(0.01)
+        results = await asyncio.gather(*submitters, return_exceptions=True)
+        accepted = [result for result in results if not isinstance(result, BaseException)]
+        rejected = [result for result in results if isinstance(result, BaseException)]
+        assert len(accepted) == 1
+        assert all(isinstance(error, WorkflowQueueFullError) for error in rejected)
+        # Rejected submissions leave nothing for later duplicates to coalesce onto.
+        in_flight = {submission.execution.workflow_id for submission in engine._submissions.values()}
+        assert in_flight == {busy.workflow_id, accepted[0].workflow_id}
+
+        gate.set()
+        await engine.shutdown(timeout=5)
+        assert accepted[0].state.status == WorkflowRunStatus.COMPLETED
+        assert not engine._submissions
+
+    asyncio.run(scenario())
+
+
+def test_detached_submission_coalesced_onto_an_inline_run_is_reported(make_snapshot):
+    async def scenario():
+        engine = WorkflowEngine(background_workers=1)
+        gate = asyncio.Event()
+        _counting(engine, gate)
+        finished = []
+
+        async def on_finished(execution):
+            finished.append(execution.workflow_id)
+
+        inline = asyncio.create_task(engine.start_workflow("board", make_snapshot(2), owner_id="u"))
+        await asyncio.sleep(0.01)
+        detached = await engine.submit_workflow("board", make_snapshot(2), owner_id="u", on_finished=on_finished)
+        later = await engine.submit_workflow("board", make_snapshot(2), owner_id="u", on_finished=on_finished)
+        gate.set()
+        shared = await inline
+        await asyncio.sleep(0.01)
+        await engine.shutdown(timeout=5)
+
+        assert detached is shared and later is shared
+        # The first detached submitter hears back once, so its provider job is still dispatched.
+        assert finished == [shared.workflow_id]
+        assert shared.state.status == WorkflowRunStatus.COMPLETED
+        assert not engine._submissions
+
+    asyncio.run(scenario())
+
+
+def test_identical_detached_submissions_share_one_run(make_snapshot):
+    async def scenario():
+        engine = WorkflowEngine(background_workers=1)
+        gate = asyncio.Event()
+        _counting(engine, gate)
+        first = await engine.submit_workflow("board", make_snapshot(2), owner_id="u")
+        second = await engine.submit_workflow("board", make_snapshot(2), owner_id="u")
+        gate.set()
+        await engine.shutdown(timeout=5)
+        assert second is first
+
+    asyncio.run(scenario())
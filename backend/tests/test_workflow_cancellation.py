@@ -0,0 +1,82 @@
+import asyncio
+
+from ai_types import WorkflowNodeRunStatus, WorkflowRunStatus
+from workflow_engine import WorkflowEngine
+
+
+def _stall_on(engine, node_id):
+    """Block ``node_id`` until cancelled; return a queue of executions reaching it and the ids of cancelled ones."""
+
+    evaluate = engine._evaluate_node
+    reached = asyncio.Queue()
+    cancelled = []
+
+    async def wrapper(execution, node, upstream_items, *args):
+        if node.id == node_id:
+            await reached.put(execution)
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(execution.workflow_id)
+                raise
+        return await evaluate(execution, node, upstream_items, *args)
+
+    engine._evaluate_node = wrapper
+    return reached, cancelled
+
+
+def test_cancelling_mid_run_settles_cancelled_without_orphaned_tasks(make_graph):
+    async def scenario():
+        engine = WorkflowEngine()
+        reached, cancelled = _stall_on(engine, "b")
+        run = asyncio.create_task(
+            engine.start_workflow("board", make_graph([("a", "b"), ("b", "c"), ("a", "d")]), owner_id="u")
+        )
+        execution = await asyncio.wait_for(reached.get(), timeout=5)
+
+        returned = await engine.cancel_workflow(execution.workflow_id, reason="stop")
+        assert returned is execution
+        assert await asyncio.wait_for(run, timeout=5) is execution
+
+        statuses = {state.node_id: state.status for state in execution.state.node_states}
+        assert execution.state.status == WorkflowRunStatus.CANCELLED
+        assert execution.state.finished_at is not None
+        assert cancelled == [execution.workflow_id]
+        assert statuses["a"] == WorkflowNodeRunStatus.COMPLETED
+        assert statuses["c"] in (WorkflowNodeRunStatus.IDLE, WorkflowNodeRunStatus.SKIPPED)
+        assert WorkflowNodeRunStatus.RUNNING not in statuses.values()
+        assert WorkflowNodeRunStatus.QUEUED not in statuses.values()
+        assert execution.workflow_id not in engine._active_runs
+        assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task()] == []
+
+        # Cancelling a run that already settled changes nothing.
+        assert await engine.cancel_workflow(execution.workflow_id) is execution
+        assert execution.state.status == WorkflowRunStatus.CANCELLED
+        await engine.shutdown(timeout=5)
+
+    asyncio.run(scenario())
+
+
+def test_a_new_run_supersedes_the_older_run_of_the_same_board_and_owner(make_graph):
+    async def scenario():
+        engine = WorkflowEngine()
+        reached, cancelled = _stall_on(engine, "b")
+        older = asyncio.create_task(engine.start_workflow("board", make_graph([("a", "b")]), owner_id="u"))
+        first = await asyncio.wait_for(reached.get(), timeout=5)
+        other_owner = asyncio.create_task(engine.start_workflow("board", make_graph([("a", "b")]), owner_id="v"))
+        bystander = await asyncio.wait_for(reached.get(), timeout=5)
+
+        newer = await engine.start_workflow("board", make_graph([("a", "c")]), owner_id="u")
+        await asyncio.wait_for(older, timeout=5)
+
+        assert newer.state.status == WorkflowRunStatus.COMPLETED
+        assert first.state.status == WorkflowRunStatus.CANCELLED
+        assert newer.workflow_id in (first.state.error_message or "")
+        assert cancelled == [first.workflow_id]
+        # Runs of other owners are left alone.
+        assert bystander.state.status == WorkflowRunStatus.RUNNING
+        await engine.cancel_workflow(bystander.workflow_id)
+        await asyncio.wait_for(other_owner, timeout=5)
+        await engine.shutdown(timeout=5)
+
+    asyncio.run(scenario())
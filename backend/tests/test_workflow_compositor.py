@@ -0,0 +1,162 @@
+import asyncio
+import base64
+import io
+
+import pytest
+from pydantic import ValidationError
+
+pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+import workflow_compositor  # noqa: E402
+from ai_types import (  # noqa: E402
+    CanvasBounds,
+    CanvasImage,
+    CanvasPoint,
+    CanvasSize,
+    CanvasWorkflowDefinition,
+    CreativeBoardCanvas,
+    CreativeBoardSnapshot,
+    WorkflowEdge,
+    WorkflowNodeDefinition,
+    WorkflowNodeType,
+    WorkflowPort,
+    WorkflowRunStatus,
+)
+from workflow_compositor import (  # noqa: E402
+    PreviewStore,
+    _prepare_sprite,
+    board_layout,
+    check_image_host,
+    layout_key,
+    render_layout,
+)
+from workflow_engine import WorkflowEngine  # noqa: E402
+
+
+def _data_url(color):
+    buffer = io.BytesIO()
+    Image.new("RGBA", (32, 32), color + (255,)).save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _image(image_id, url, x):
+    bounds = CanvasBounds(position=CanvasPoint(x=x, y=0), size=CanvasSize(width=40, height=40))
+    return CanvasImage(id=image_id, url=url, name=image_id, bounds=bounds)
+
+
+def _composite_board(red_x):
+    nodes = [
+        WorkflowNodeDefinition(id="in-red", type=WorkflowNodeType.INPUT_IMAGE, title="red", metadata={"image_id": "red"}),
+        WorkflowNodeDefinition(id="in-blue", type=WorkflowNodeType.INPUT_IMAGE, title="blue", metadata={"image_id": "blue"}),
+        WorkflowNodeDefinition(id="comp", type=WorkflowNodeType.COMPOSITE, title="composite"),
+    ]
+    edges = [
+        WorkflowEdge(id="e-red", source=WorkflowPort(node_id="in-red"), target=WorkflowPort(node_id="comp")),
+        WorkflowEdge(id="e-blue", source=WorkflowPort(node_id="in-blue"), target=WorkflowPort(node_id="comp")),
+    ]
+    return CreativeBoardSnapshot(
+        canvas=CreativeBoardCanvas(size=CanvasSize(width=120, height=60)),
+        images=[_image("red", _data_url((255, 0, 0)), red_x), _image("blue", _data_url((0, 0, 255)), 60)],
+        workflow=CanvasWorkflowDefinition(
+            nodes=nodes, edges=edges, entry_ids=["in-red", "in-blue"], output_ids=["comp"]
+        ),
+    )
+
+
+def test_moving_an_image_recomputes_the_composite(tmp_path, make_snapshot):
+    async def scenario():
+        engine = WorkflowEngine(preview_store=PreviewStore(str(tmp_path)))
+        try:
+            execution = await engine.start_workflow("board", _composite_board(red_x=0))
+            before = execution.results["comp"].asset_url
+
+            rerun = await engine.recompute_workflow(execution.workflow_id, snapshot=_composite_board(red_x=20))
+            assert rerun.state.status == WorkflowRunStatus.COMPLETED
+            assert rerun.state_lookup["comp"].timing.cache == "computed"
+            assert rerun.results["comp"].asset_url != before
+            # The inputs themselves did not change and are still reused.
+            assert rerun.state_lookup["in-blue"].cached
+        finally:
+            engine._executors.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_partial_renders_are_not_stored_under_the_layout_key(tmp_path):
+    snapshot = CreativeBoardSnapshot(
+        canvas=CreativeBoardCanvas(size=CanvasSize(width=80, height=40)),
+        images=[_image("ok", _data_url((0, 255, 0)), 0), _image("broken", "ftp://unsupported/x.png", 40)],
+    )
+    layout = board_layout(snapshot)
+
+    first = render_layout(layout, str(tmp_path))
+    assert first["missing"] == ["broken"]
+    assert first["key"] != layout_key(layout)
+    assert (tmp_path / f"{first['key']}.png").is_file()
+    assert not (tmp_path / f"{layout_key(layout)}.png").exists()
+    # A later render retries the missing image instead of serving the partial file as complete.
+    assert render_layout(layout, str(tmp_path))["missing"] == ["broken"]
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://127.0.0.1/a.png",
+        "http://localhost:8000/a.png",
+        "http://169.254.169.254/latest/meta-data/",
+        "http://10.0.0.5/a.png",
+        "http://[::1]/a.png",
+    ],
+)
+def test_image_fetches_to_non_public_addresses_are_refused(url):
+    with pytest.raises(ValueError):
+        check_image_host(url)
+    with pytest.raises(ValueError):
+        workflow_compositor.load_image(url)
+
+
+def test_image_host_allow_list(monkeypatch):
+    monkeypatch.setattr(workflow_compositor, "ALLOWED_IMAGE_HOSTS", ("assets.example.com",))
+    with pytest.raises(ValueError, match="not allowed"):
+        check_image_host("https://evil.example.org/a.png")
+    with pytest.raises(ValueError, match="not allowed"):
+        check_image_host("https://notassets.example.com/a.png")
+
+
+def test_oversized_placements_only_materialise_the_visible_crop():
+    placement = {
+        "image_id": "huge",
+        "url": _data_url((255, 0, 0)),
+        "x": -40000.0,
+        "y": -40000.0,
+        "width": 80000.0,
+        "height": 80000.0,
+        "rotation": 30.0,
+        "scale": 50.0,
+    }
+    sprite, left, top = _prepare_sprite(placement, 64, 48, 1.0)
+    assert sprite.shape == (48, 64, 4)
+    assert (left, top) == (0, 0)
+    assert (sprite[..., 0] == 255).all()
+
+    placement.update(x=5000.0, y=5000.0, width=10.0, height=10.0, scale=1.0)
+    assert _prepare_sprite(placement, 64, 48, 1.0) is None
+
+
+def test_decompression_bombs_are_refused(monkeypatch):
+    monkeypatch.setattr(workflow_compositor, "MAX_SOURCE_PIXELS", 32 * 32 - 1)
+    with pytest.raises(ValueError, match="too large"):
+        workflow_compositor.load_image(_data_url((0, 0, 0)))
+
+
+def test_board_geometry_is_bounded():
+    with pytest.raises(ValidationError):
+        CanvasSize(width=10_000_000, height=10)
+    with pytest.raises(ValidationError):
+        CanvasBounds(position=CanvasPoint(x=0, y=0), size=CanvasSize(width=10, height=10), scale=1e6)
+    layout = board_layout(
+        CreativeBoardSnapshot(canvas=CreativeBoardCanvas(size=CanvasSize(width=90_000, height=10))),
+        max_edge=1_000_000,
+    )
+    assert layout["width"] == workflow_compositor.MAX_EDGE_LIMIT
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from ai_types import WorkflowRunStatus
+from workflow_engine import WorkflowEngine, _env_seconds
+
+
+@pytest.mark.parametrize("raw, expected", [(None, None), ("", None), ("0", None), ("-5", None), ("x", None), ("2.5", 2.5)])
+def test_time_limits_from_env_treat_zero_or_unset_as_no_limit(monkeypatch, raw, expected):
+    if raw is None:
+        monkeypatch.delenv("WORKFLOW_TEST_LIMIT", raising=False)
+    else:
+        monkeypatch.setenv("WORKFLOW_TEST_LIMIT", raw)
+    assert _env_seconds("WORKFLOW_TEST_LIMIT") == expected
+
+
+def _slow(engine, delay):
+    evaluate = engine._evaluate_node
+
+    async def wrapper(execution, node, upstream_items, *args):
+        await asyncio.sleep(delay)
+        return await evaluate(execution, node, upstream_items, *args)
+
+    engine._evaluate_node = wrapper
+
+
+def test_runs_without_limits_are_not_cut_short(make_snapshot):
+    async def scenario():
+        engine = WorkflowEngine(node_timeout=None, workflow_deadline=None)
+        _slow(engine, 0.05)
+        execution = await engine.start_workflow("board", make_snapshot(2), owner_id="u")
+        await engine.shutdown(timeout=5)
+        assert execution.deadline is None
+        assert execution.state.status == WorkflowRunStatus.COMPLETED
+
+    asyncio.run(scenario())
+
+
+def test_workflow_deadline_stops_a_slow_run(make_snapshot):
+    async def scenario():
+        engine = WorkflowEngine(workflow_deadline=0.1)
+        _slow(engine, 0.5)
+        execution = await engine.start_workflow("board", make_snapshot(2), owner_id="u")
+        await engine.shutdown(timeout=5)
+        assert execution.state.status != WorkflowRunStatus.COMPLETED
+        assert "deadline" in (execution.state.error_message or "")
+
+    asyncio.run(scenario())
@@ -0,0 +1,18 @@
+from ai_types import CreativeBoardWorkflowRunOptions
+from workflow_engine import WorkflowEngine
+
+
+def test_estimate_counts_provider_calls(make_snapshot):
+    engine = WorkflowEngine()
+    snapshot = make_snapshot(2, labels=True)
+
+    # A plain run calls no provider unless labels still need the LLM.
+    assert engine.estimate_workflow("board", snapshot).provider_calls == 0
+    with_llm = engine.estimate_workflow("board", snapshot, options=CreativeBoardWorkflowRunOptions(use_llm=True))
+    assert with_llm.provider_calls == 1
+
+    # A board generation adds the task submitted from the output prompt.
+    generation = engine.estimate_workflow(
+        "board", snapshot, options=CreativeBoardWorkflowRunOptions(use_llm=True), provider_generations=1
+    )
+    assert generation.provider_calls == 2
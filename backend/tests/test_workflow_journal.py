@@ -0,0 +1,77 @@
+import asyncio
+
+from workflow_engine import WorkflowEngine
+from workflow_journal import SQLiteWorkflowJournal
+
+
+def _record(workflow_id, status="running"):
+    return {"workflow_id": workflow_id, "state": {"status": status, "node_states": []}}
+
+
+def test_writes_are_batched_off_the_caller_and_superseded_by_checkpoints(tmp_path):
+    journal = SQLiteWorkflowJournal(str(tmp_path / "journal.sqlite3"))
+    journal.checkpoint(_record("w1"))
+    journal.append_node("w1", {"node_id": "a", "status": "completed"}, {"node_id": "a", "metadata": {}})
+    journal.append_node("w2", {"node_id": "b", "status": "running"})
+    journal.checkpoint(_record("w1", "completed"))
+    journal.forget("w2")
+
+    [record] = journal.replay()
+    assert record["state"] == {"status": "completed", "node_states": []}
+    journal.close()
+
+
+def test_workers_sharing_a_path_never_replay_the_same_journal(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    first = SQLiteWorkflowJournal.for_worker(path)
+    second = SQLiteWorkflowJournal.for_worker(path)
+    assert first.path != second.path
+    first.checkpoint(_record("w1"))
+    second.checkpoint(_record("w2"))
+    first.flush()
+    # A live worker's slot stays locked, so nobody adopts it.
+    assert second.adopt_orphans() == 0
+
+    # Both workers exit and only one comes back: it reuses a slot and adopts the other.
+    first.close()
+    second.close()
+    survivor = SQLiteWorkflowJournal.for_worker(path)
+    assert survivor.path == first.path
+    assert survivor.adopt_orphans() == 1
+    assert sorted(record["workflow_id"] for record in survivor.replay()) == ["w1", "w2"]
+
+    latecomer = SQLiteWorkflowJournal.for_worker(path)
+    assert latecomer.adopt_orphans() == 0
+    assert latecomer.replay() == []
+    survivor.close()
+    latecomer.close()
+
+
+def test_an_interrupted_run_is_resumed_by_exactly_one_worker(tmp_path, make_snapshot):
+    path = str(tmp_path / "journal.sqlite3")
+
+    async def interrupted():
+        engine = WorkflowEngine(journal=SQLiteWorkflowJournal.for_worker(path))
+        evaluate = engine._evaluate_node
+
+        async def stall(execution, node, upstream_items, *args):
+            if node.id == "image-i2":
+                await asyncio.Event().wait()
+            return await evaluate(execution, node, upstream_items, *args)
+
+        engine._evaluate_node = stall
+        run = asyncio.create_task(engine.start_workflow("board", make_snapshot(3), owner_id="u"))
+        await asyncio.sleep(0.05)
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+        engine._journal.close()  # the worker process exits mid-run
+
+    async def restarted():
+        engines = [WorkflowEngine(journal=SQLiteWorkflowJournal.for_worker(path)) for _ in range(2)]
+        counts = [await engine.restore() for engine in engines]
+        for engine in engines:
+            await engine.shutdown(timeout=5)
+        return counts
+
+    asyncio.run(interrupted())
+    assert sorted(asyncio.run(restarted())) == [0, 1]
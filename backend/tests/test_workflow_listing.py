@@ -0,0 +1,88 @@
+import asyncio
+
+from workflow_engine import WorkflowEngine
+from workflow_index import encode_cursor
+from workflow_state_backend import InMemoryStateBackend, listing_score
+
+
+def _record(workflow_id, board_id, owner_id, created_at):
+    return {
+        "workflow_id": workflow_id,
+        "board_id": board_id,
+        "owner_id": owner_id,
+        "created_at": created_at,
+        "updated_at": created_at,
+        "state": {"status": "completed", "version": 1, "node_states": []},
+    }
+
+
+async def _page_all(backend, **filters):
+    seen = []
+    after = None
+    while True:
+        page = await backend.summaries(limit=1, after=after, **filters)
+        if not page:
+            return seen
+        seen.extend(item["workflow_id"] for item in page)
+        last = page[-1]
+        after = (listing_score(last["updated_at"]), last["workflow_id"])
+
+
+def test_backend_pages_by_updated_at_with_id_tiebreak_per_scope():
+    async def scenario():
+        backend = InMemoryStateBackend()
+        # Two executions share a timestamp; the id orders them so no page boundary loses one.
+        backend.save_record(_record("w1", "b", "u", "2026-01-01T00:00:01"))
+        backend.save_record(_record("w3", "b", "u", "2026-01-01T00:00:02"))
+        backend.save_record(_record("w2", "b", "u", "2026-01-01T00:00:02"))
+        backend.save_record(_record("w4", "b", "other", "2026-01-01T00:00:03"))
+        backend.save_record(_record("w5", "elsewhere", "u", "2026-01-01T00:00:04"))
+
+        assert await _page_all(backend, board_id="b", owner_id="u") == ["w3", "w2", "w1"]
+        assert await _page_all(backend, board_id="b") == ["w4", "w3", "w2", "w1"]
+        assert await _page_all(backend, owner_id="u") == ["w5", "w3", "w2", "w1"]
+        assert await _page_all(backend) == ["w5", "w4", "w3", "w2", "w1"]
+
+        # A status write moves the execution to the head of every listing it is in.
+        backend.update_status(
+            "w1", {"status": "running", "updated_at": "2026-01-01T00:00:09"}, board_id="b", owner_id="u"
+        )
+        assert await _page_all(backend, board_id="b", owner_id="u") == ["w1", "w3", "w2"]
+        assert await _page_all(backend) == ["w1", "w5", "w4", "w3", "w2"]
+
+    asyncio.run(scenario())
+
+
+def test_cursor_paging_merges_executions_from_other_processes(make_snapshot):
+    async def scenario():
+        backend = InMemoryStateBackend()
+        local = WorkflowEngine(state_backend=backend)
+        remote = WorkflowEngine(state_backend=backend)
+        created = []
+        for count in range(1, 4):
+            for engine in (local, remote):
+                execution = await engine.start_workflow("board", make_snapshot(count), owner_id="u")
+                created.append(execution)
+                await asyncio.sleep(0.001)
+        await local.start_workflow("board", make_snapshot(1), owner_id="someone-else")
+        # Rerunning the oldest execution elsewhere moves it to the head of the listing.
+        await remote.recompute_workflow(created[1].workflow_id)
+
+        pages = []
+        after = None
+        while True:
+            page = await local.list_executions(board_id="board", owner_id="u", limit=4, after=after)
+            pages.append(page)
+            if len(page) < 4:
+                break
+            after = encode_cursor((page[-1].updated_at, page[-1].workflow_id))
+        await local.shutdown(timeout=5)
+        await remote.shutdown(timeout=5)
+
+        assert [len(page) for page in pages] == [4, 2]
+        listed = [item.workflow_id for page in pages for item in page]
+        expected = sorted(created, key=lambda execution: (execution.updated_at, execution.workflow_id), reverse=True)
+        assert listed[0] == created[1].workflow_id
+        assert listed == [execution.workflow_id for execution in expected]
+
+    asyncio.run(scenario())
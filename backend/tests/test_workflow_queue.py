@@ -0,0 +1,65 @@
+import asyncio
+
+from workflow_queue import FairAdmissionQueue
+
+
+def test_abandoned_waiters_give_their_owner_back_its_virtual_time():
+    async def scenario():
+        queue = FairAdmissionQueue(max_active=1)
+        await queue.acquire(owner_id="holder")
+        admitted = []
+
+        async def request(owner_id, cost):
+            await queue.acquire(owner_id=owner_id, cost=cost)
+            admitted.append((owner_id, cost))
+            queue.release()
+
+        large = asyncio.create_task(request("a", 10))
+        await asyncio.sleep(0)
+        small = asyncio.create_task(request("a", 1))
+        await asyncio.sleep(0)
+        other = asyncio.create_task(request("b", 2))
+        await asyncio.sleep(0)
+        assert len(queue) == 3
+
+        # Withdrawing a's large board must not leave its next run queued behind b.
+        large.cancel()
+        await asyncio.gather(large, return_exceptions=True)
+        assert len(queue) == 2 and queue.abandoned == 1
+
+        queue.release()
+        await asyncio.gather(small, other)
+        assert admitted == [("a", 1), ("b", 2)]
+
+        # With every waiter gone the fast path admits straight away.
+        await asyncio.wait_for(queue.acquire(owner_id="a", cost=10), timeout=1)
+        assert queue.active == 1 and len(queue) == 0
+
+    asyncio.run(scenario())
+
+
+def test_timed_out_waiters_do_not_count_as_queued():
+    async def scenario():
+        queue = FairAdmissionQueue(max_active=1)
+        await queue.acquire(owner_id="holder")
+        for _ in range(3):
+            try:
+                await asyncio.wait_for(queue.acquire(owner_id="a", cost=5), timeout=0.01)
+            except asyncio.TimeoutError:
+                pass
+        assert len(queue) == 0 and queue.stats()["queued"] == 0 and queue.abandoned == 3
+
+        queue.release()
+        await asyncio.wait_for(queue.acquire(owner_id="b"), timeout=1)
+        waiter = asyncio.create_task(queue.acquire(owner_id="a"))
+        await asyncio.sleep(0)
+        other = asyncio.create_task(queue.acquire(owner_id="b"))
+        await asyncio.sleep(0)
+        # a's timed-out requests left no debt: its new request is served before b's second one.
+        queue.release()
+        await asyncio.wait_for(waiter, timeout=1)
+        assert not other.done()
+        other.cancel()
+        await asyncio.gather(other, return_exceptions=True)
+
+    asyncio.run(scenario())
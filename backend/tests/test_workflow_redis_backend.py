@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+
+from workflow_state_backend import RedisStateBackend  # noqa: E402
+
+
+class _FailingPipeline:
+    def __init__(self, client):
+        self._client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append(name)
+
+    async def execute(self):
+        if self._client.failures:
+            self._client.failures -= 1
+            raise ConnectionError("redis unavailable")
+        self._client.executed.append(self.commands)
+
+
+class _Client:
+    def __init__(self, failures):
+        self.failures = failures
+        self.executed = []
+
+    def pipeline(self, transaction=True):
+        return _FailingPipeline(self)
+
+
+def test_a_failed_flush_keeps_its_batch_for_the_next_attempt():
+    async def scenario():
+        backend = RedisStateBackend("redis://localhost:6379/0")
+        backend._client = _Client(failures=1)
+        backend.update_status("w1", {"status": "running", "version": 1})
+        backend.update_node("w1", {"node_id": "a", "status": "completed"}, 2)
+        backend.update_node("w2", {"node_id": "b", "status": "running"}, 1)
+
+        with pytest.raises(ConnectionError):
+            await backend._flush()
+        assert len(backend._pending) == 3
+
+        # Newer writes win over the failed ones they replace; a checkpoint drops w2's node write.
+        backend.update_status("w1", {"status": "completed", "version": 3})
+        backend.save_record(
+            {
+                "workflow_id": "w2",
+                "board_id": "b",
+                "created_at": "2026-01-01T00:00:00",
+                "updated_at": "2026-01-01T00:00:01",
+                "state": {"status": "completed", "version": 2, "node_states": []},
+            }
+        )
+        await backend._flush()
+        assert backend._pending == {} and len(backend._client.executed) == 1
+
+    asyncio.run(scenario())
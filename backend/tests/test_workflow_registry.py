@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import pytest
+
+from workflow_engine import WorkflowEngine, WorkflowExecutionError
+from workflow_registry import SQLiteSpillStore
+
+
+def _spilling_engine(store, clock):
+    registry = WorkflowEngine.create_registry(max_entries=1, idle_ttl=0, spill_store=store, clock=clock)
+    return WorkflowEngine(registry=registry)
+
+
+def test_evicted_executions_rehydrate_and_leave_the_spill_table(make_snapshot):
+    async def scenario():
+        store = SQLiteSpillStore(":memory:")
+        engine = _spilling_engine(store, clock=lambda: 0.0)
+        first = await engine.start_workflow("board", make_snapshot(3))
+        await engine.start_workflow("board", make_snapshot(4))
+        assert store.count() == 1
+
+        restored = engine.get_execution(first.workflow_id)
+        assert restored is not None and restored.final_prompt == first.final_prompt
+        # Reading a row back moves the execution into memory and the other one out.
+        assert store.load(first.workflow_id) is None
+        assert store.count() == 1
+
+    asyncio.run(scenario())
+
+
+def test_spill_store_prunes_expired_and_surplus_rows(make_snapshot):
+    async def scenario():
+        now = [1000.0]
+        store = SQLiteSpillStore(":memory:", ttl=60, max_rows=2, clock=lambda: now[0])
+        engine = _spilling_engine(store, clock=lambda: 0.0)
+        ids = []
+        for count in range(2, 6):
+            execution = await engine.start_workflow("board", make_snapshot(count))
+            ids.append(execution.workflow_id)
+            now[0] += 1
+        # Four runs with one resident: three spilled, the oldest dropped by the row cap.
+        assert store.count() == 2
+        with pytest.raises(WorkflowExecutionError):
+            engine.get_execution(ids[0])
+        assert ids[0] not in engine._index
+
+        now[0] += 120
+        assert sorted(store.prune(force=True)) == sorted(ids[1:3])
+        assert store.count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_approximate_size_tracks_the_serialized_record(make_snapshot):
+    async def scenario():
+        engine = WorkflowEngine()
+        execution = await engine.start_workflow("board", make_snapshot(20, labels=True))
+        encoded = len(json.dumps(execution.to_record(), default=str, ensure_ascii=False).encode("utf-8"))
+        assert encoded / 3 <= execution.approximate_size() <= encoded * 3
+
+    asyncio.run(scenario())
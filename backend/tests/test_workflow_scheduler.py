@@ -0,0 +1,142 @@
+import asyncio
+
+from ai_types import CreativeBoardWorkflowRunOptions, WorkflowNodeRunStatus, WorkflowRunStatus
+from workflow_engine import WorkflowEngine
+
+
+class _Trace:
+    """Wrap node evaluation to record start/finish order, concurrency and injected failures."""
+
+    def __init__(self, engine, *, delays=None, failing=()):
+        self.events = []
+        self.running = 0
+        self.peak = 0
+        self._delays = delays or {}
+        self._failing = set(failing)
+        self._evaluate = engine._evaluate_node
+        engine._evaluate_node = self._wrapper
+
+    async def _wrapper(self, execution, node, upstream_items, *args):
+        self.events.append(("start", node.id))
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self._delays.get(node.id, 0.01))
+            if node.id in self._failing:
+                raise RuntimeError(f"{node.id} failed")
+            return await self._evaluate(execution, node, upstream_items, *args)
+        finally:
+            self.running -= 1
+            self.events.append(("finish", node.id))
+
+    def started(self):
+        return [node_id for kind, node_id in self.events if kind == "start"]
+
+    def position(self, kind, node_id):
+        return self.events.index((kind, node_id))
+
+
+def _statuses(execution):
+    return {state.node_id: state.status for state in execution.state.node_states}
+
+
+def test_nodes_start_only_after_all_their_upstreams_finish(make_graph):
+    edges = [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d"), ("d", "e"), ("x", "e")]
+
+    async def scenario():
+        engine = WorkflowEngine()
+        trace = _Trace(engine, delays={"b": 0.05, "x": 0.08})
+        execution = await engine.start_workflow("board", make_graph(edges))
+        await engine.shutdown(timeout=5)
+
+        assert execution.state.status == WorkflowRunStatus.COMPLETED
+        assert sorted(trace.started()) == ["a", "b", "c", "d", "e", "x"]
+        for source, target in edges:
+            assert trace.position("finish", source) < trace.position("start", target), (source, target)
+        # Independent work overlaps: the slow root x runs alongside the a-b-c-d chain.
+        assert trace.position("start", "x") < trace.position("finish", "a")
+
+    asyncio.run(scenario())
+
+
+def test_max_concurrency_caps_nodes_in_flight(make_graph):
+    async def scenario():
+        engine = WorkflowEngine()
+        trace = _Trace(engine, delays={node_id: 0.03 for node_id in "abcdef"})
+        execution = await engine.start_workflow(
+            "board",
+            make_graph([], isolated="abcdef"),
+            options=CreativeBoardWorkflowRunOptions(max_concurrency=2),
+        )
+        await engine.shutdown(timeout=5)
+
+        assert execution.state.status == WorkflowRunStatus.COMPLETED
+        assert len(trace.started()) == 6
+        assert trace.peak == 2
+
+    asyncio.run(scenario())
+
+
+def test_fail_fast_skips_descendants_and_starts_nothing_new(make_graph):
+    async def scenario():
+        engine = WorkflowEngine()
+        # b fails while d is still running; d may finish, but e must never start.
+        trace = _Trace(engine, delays={"d": 0.1}, failing={"b"})
+        execution = await engine.start_workflow(
+            "board", make_graph([("a", "b"), ("b", "c"), ("a", "d"), ("d", "e")])
+        )
+        await engine.shutdown(timeout=5)
+
+        statuses = _statuses(execution)
+        assert execution.state.status == WorkflowRunStatus.FAILED
+        assert statuses["b"] == WorkflowNodeRunStatus.FAILED
+        assert statuses["c"] == WorkflowNodeRunStatus.SKIPPED
+        assert statuses["e"] == WorkflowNodeRunStatus.SKIPPED
+        assert "c" not in trace.started() and "e" not in trace.started()
+
+    asyncio.run(scenario())
+
+
+def test_continue_mode_only_skips_the_failed_nodes_descendants(make_graph):
+    async def scenario():
+        engine = WorkflowEngine()
+        trace = _Trace(engine, delays={"d": 0.05}, failing={"b"})
+        execution = await engine.start_workflow(
+            "board",
+            make_graph([("a", "b"), ("b", "c"), ("c", "f"), ("a", "d"), ("d", "e")]),
+            options=CreativeBoardWorkflowRunOptions(failure_mode="continue"),
+        )
+        await engine.shutdown(timeout=5)
+
+        statuses = _statuses(execution)
+        assert execution.state.status == WorkflowRunStatus.PARTIAL
+        assert statuses["b"] == WorkflowNodeRunStatus.FAILED
+        assert statuses["c"] == statuses["f"] == WorkflowNodeRunStatus.SKIPPED
+        assert statuses["a"] == statuses["d"] == statuses["e"] == WorkflowNodeRunStatus.COMPLETED
+        assert sorted(trace.started()) == ["a", "b", "d", "e"]
+
+    asyncio.run(scenario())
+
+
+def test_focused_run_only_evaluates_the_ancestor_closure(make_graph):
+    async def scenario():
+        engine = WorkflowEngine()
+        trace = _Trace(engine)
+        # Focusing b needs a and b; its descendants c and y and the unrelated root x stay untouched.
+        execution = await engine.start_workflow(
+            "board",
+            make_graph([("a", "b"), ("b", "c"), ("x", "c"), ("b", "y")]),
+            options=CreativeBoardWorkflowRunOptions(focus_node_ids=["b"]),
+        )
+        await engine.shutdown(timeout=5)
+
+        statuses = _statuses(execution)
+        assert execution.state.status == WorkflowRunStatus.COMPLETED
+        assert sorted(trace.started()) == ["a", "b"]
+        assert statuses["a"] == statuses["b"] == WorkflowNodeRunStatus.COMPLETED
+        for node_id in ("c", "x", "y"):
+            assert statuses[node_id] == WorkflowNodeRunStatus.IDLE
+            assert execution.state_lookup[node_id].started_at is None
+        assert sum(entry.count for entry in execution.state.timing.by_type) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+import asyncio
+
+from workflow_engine import WorkflowEngine
+from workflow_state_backend import InMemoryStateBackend
+
+
+def test_deltas_across_a_node_removal_fall_back_to_a_full_snapshot(make_graph):
+    async def scenario():
+        backend = InMemoryStateBackend()
+        engine = WorkflowEngine(state_backend=backend)
+        remote = WorkflowEngine(state_backend=backend)
+        execution = await engine.start_workflow("board", make_graph([("a", "b"), ("b", "c")]), owner_id="u")
+        seen = execution.state.version
+
+        # Nothing changed since the client's version: an empty delta.
+        assert execution.snapshot_state(seen).node_states == []
+
+        await engine.recompute_workflow(execution.workflow_id, snapshot=make_graph([("a", "b")]))
+        state = execution.snapshot_state(seen)
+        assert state.node_set_version > seen
+        assert sorted(node.node_id for node in state.node_states) == ["a", "b"]
+
+        # Another process answers from the shared backend with the same rule.
+        shared = await remote.fetch_state(execution.workflow_id, since_version=seen)
+        assert sorted(node.node_id for node in shared.node_states) == ["a", "b"]
+
+        # Once the client has caught up with the new node set, deltas resume.
+        latest = execution.state.version
+        assert execution.snapshot_state(latest).node_states == []
+        assert (await remote.fetch_state(execution.workflow_id, since_version=latest)).node_states == []
+        await engine.shutdown(timeout=5)
+        await remote.shutdown(timeout=5)
+
+    asyncio.run(scenario())
@@ -0,0 +1,77 @@
+import asyncio
+import base64
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+import workflow_upscale  # noqa: E402
+from ai_types import CreativeBoardSnapshot, WorkflowNodeConfig, WorkflowNodeDefinition, WorkflowNodeType  # noqa: E402
+from workflow_compositor import PreviewStore  # noqa: E402
+from workflow_executors import NodeContext, NodeInput, TiledUpscaleExecutor  # noqa: E402
+
+
+def _noise(path, seed, size=(48, 32)):
+    pixels = (np.random.default_rng(seed).random((size[1], size[0], 3)) * 255).astype(np.uint8)
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+def test_output_key_follows_source_content_not_url(tmp_path):
+    first = _noise(tmp_path / "a.png", seed=1)
+    second = _noise(tmp_path / "b.png", seed=2)
+    url = "https://assets.test/stable.png"
+
+    plans = [
+        workflow_upscale.prepare_upscale(url, {"scale": 2}, str(tmp_path), str(tmp_path), source_path=str(source))
+        for source in (first, second, first)
+    ]
+    assert plans[0]["key"] != plans[1]["key"]
+    assert plans[0]["key"] == plans[2]["key"]
+
+
+def test_tile_size_is_clamped(tmp_path):
+    source = _noise(tmp_path / "a.png", seed=1, size=(1200, 1100))
+    plan = workflow_upscale.prepare_upscale(
+        "x", {"scale": 2}, str(tmp_path), str(tmp_path), source_path=str(source), tile_size=10**6
+    )
+    edge = workflow_upscale.MAX_TILE_SIZE
+    assert max(right - left for left, _, right, _ in plan["tiles"]) == edge
+    assert max(bottom - top for _, top, _, bottom in plan["tiles"]) == edge
+
+
+def test_cancelled_upscale_leaves_no_scratch_files(tmp_path):
+    buffer = io.BytesIO()
+    Image.open(_noise(tmp_path / "a.png", seed=3, size=(256, 256))).save(buffer, "PNG")
+    source_url = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+    scratch_dir = tmp_path / "scratch"
+    scratch_dir.mkdir()
+    executor = TiledUpscaleExecutor(PreviewStore(str(tmp_path / "previews")), tile_size=16, scratch_dir=str(scratch_dir))
+    node = WorkflowNodeDefinition(
+        id="up", type=WorkflowNodeType.UPSCALE, title="up", config=WorkflowNodeConfig(parameters={"scale": 8})
+    )
+
+    async def scenario():
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            context = NodeContext(
+                workflow_id="w",
+                node=node,
+                prompt="",
+                inputs=[NodeInput(node_id="src", asset_url=source_url)],
+                snapshot=CreativeBoardSnapshot(),
+                _report=lambda fraction: None,
+                _pool=lambda: pool,
+            )
+            task = asyncio.create_task(executor.execute(context))
+            while not any(os.scandir(scratch_dir)):
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        assert not list(scratch_dir.iterdir())
+
+    asyncio.run(scenario())
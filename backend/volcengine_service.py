@@ -164,9 +164,9 @@ class VolcengineService:
         )
         return self.create_video_generation_task(request)
     
-    def dream_3_0_image_generation(self, prompt: str, style: str = "realistic", size: str = "1024x1024") -> str:
+    def dream_3_0_image_generation(self, prompt: str, style: str = "realistic", size: str = "1024x1024", timeout: float = 60) -> str:
         """
-        极梦3.0图片生成 - 专门的图片生成接口
+        极梦3.0图片生成 - 专门的图片生成接口；timeout 为请求超时（秒）
         """
         url = f"{self.base_url}/images/generations"
         
@@ -181,7 +181,7 @@ class VolcengineService:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload, timeout=60)
+            response = requests.post(url, headers=self.headers, json=payload, timeout=timeout)
             response.raise_for_status()
             
             result = response.json()
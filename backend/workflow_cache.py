@@ -0,0 +1,75 @@
+"""Content-addressed cache for workflow node results shared across executions."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class NodeResultCache(Generic[T]):
+    """LRU cache bounded by an approximate byte budget.
+
+    Keys are content hashes computed by the engine, so identical node evaluations
+    from different executions (or different users) resolve to the same entry.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max(0, max_bytes)
+        self._entries: "OrderedDict[str, Tuple[T, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[T]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def peek(self, key: str) -> Optional[T]:
+        """Look up ``key`` without touching recency or the hit/miss counters."""
+
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, key: str, value: T, size: int) -> None:
+        if size > self.max_bytes:
+            # Never let a single oversized result flush the whole cache.
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
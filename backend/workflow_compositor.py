@@ -0,0 +1,351 @@
+"""Local flat-image rendering of a creative board, used for instant previews.
+
+Requires the optional ``numpy`` and ``Pillow`` packages; without them
+``COMPOSITOR_AVAILABLE`` is false and callers fall back to remote generation.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import http.client
+import io
+import ipaddress
+import logging
+import math
+import os
+import socket
+import tempfile
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+from ai_types import CreativeBoardSnapshot
+
+try:  # Optional dependencies: only needed for local rendering.
+    import numpy as np
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the deployment
+    np = None
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+COMPOSITOR_AVAILABLE = np is not None and Image is not None
+
+DEFAULT_MAX_EDGE = 1440
+MAX_EDGE_LIMIT = 4096
+PREVIEW_URL_PREFIX = "/api/ai/creative-board/previews/"
+FETCH_TIMEOUT = 10.0
+MAX_SOURCE_BYTES = 32 * 1024 * 1024
+# Decoded size cap: a small compressed file can still expand to gigabytes of pixels.
+MAX_SOURCE_PIXELS = 50_000_000
+# Hosts board images may be fetched from (an entry also admits its subdomains); empty admits any public host.
+# Private, loopback, link-local and other non-global addresses are refused either way.
+ALLOWED_IMAGE_HOSTS = tuple(
+    host.strip().lower().lstrip(".") for host in (os.getenv("WORKFLOW_IMAGE_HOSTS") or "").split(",") if host.strip()
+)
+
+
+class PreviewStore:
+    """Content-addressed directory of rendered PNGs, trimmed to the newest ``max_files``."""
+
+    def __init__(self, directory: str, *, max_files: int = 2000) -> None:
+        self.directory = directory
+        self.max_files = max(1, max_files)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def prune(self) -> int:
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".png")]
+        except FileNotFoundError:
+            return 0
+        # Only sweep once clearly over budget so a busy store does not rescan on every render.
+        if len(entries) <= self.max_files + self.max_files // 10:
+            return 0
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        removed = 0
+        for entry in entries[: len(entries) - self.max_files]:
+            try:
+                os.unlink(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+def preview_url(key: str) -> str:
+    return f"{PREVIEW_URL_PREFIX}{key}.png"
+
+
+def board_layout(
+    snapshot: CreativeBoardSnapshot,
+    *,
+    image_ids: Optional[List[str]] = None,
+    max_edge: int = DEFAULT_MAX_EDGE,
+) -> Dict[str, Any]:
+    """Reduce a snapshot to the picklable paint list consumed by ``render_layout``.
+
+    Images on hidden layers are dropped; the rest are painted by layer
+    ``z_index``, then image ``z_index``, then board order. Everything is scaled
+    so the longer canvas edge is at most ``max_edge`` pixels (itself capped at
+    ``MAX_EDGE_LIMIT``).
+    """
+
+    max_edge = max(1, min(int(max_edge), MAX_EDGE_LIMIT))
+    canvas = snapshot.canvas.size
+    factor = min(1.0, float(max_edge) / max(canvas.width, canvas.height, 1.0))
+    layer_of: Dict[str, Tuple[bool, int]] = {}
+    for layer in snapshot.layers:
+        for image_id in layer.image_ids:
+            layer_of[image_id] = (layer.visible, layer.z_index)
+
+    wanted = set(image_ids) if image_ids is not None else None
+    placements = []
+    for order, image in enumerate(snapshot.images):
+        visible, layer_z = layer_of.get(image.id, (True, 0))
+        if not visible or (wanted is not None and image.id not in wanted):
+            continue
+        bounds = image.bounds
+        placements.append(
+            (
+                (layer_z, image.z_index, order),
+                {
+                    "image_id": image.id,
+                    "url": image.url,
+                    "x": bounds.position.x * factor,
+                    "y": bounds.position.y * factor,
+                    "width": bounds.size.width * factor,
+                    "height": bounds.size.height * factor,
+                    "rotation": bounds.rotation,
+                    "scale": bounds.scale,
+                },
+            )
+        )
+    placements.sort(key=lambda item: item[0])
+    return {
+        "width": max(1, int(round(canvas.width * factor))),
+        "height": max(1, int(round(canvas.height * factor))),
+        "background": snapshot.canvas.background_color,
+        "placements": [placement for _, placement in placements],
+    }
+
+
+def layout_key(layout: Dict[str, Any]) -> str:
+    encoded = repr(sorted(layout.items())).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def render_layout(layout: Dict[str, Any], directory: str, fetch_timeout: float = FETCH_TIMEOUT) -> Dict[str, Any]:
+    """Render ``layout`` to ``<directory>/<key>.png``; runs inside the executor process pool.
+
+    ``fetch_timeout`` bounds each source image download.
+    """
+
+    if not COMPOSITOR_AVAILABLE:
+        raise RuntimeError("Local compositing requires numpy and Pillow")
+
+    key = layout_key(layout)
+    path = os.path.join(directory, f"{key}.png")
+    missing: List[str] = []
+    if not os.path.isfile(path):
+        width, height = layout["width"], layout["height"]
+        frame = np.empty((height, width, 3), dtype=np.float32)
+        frame[...] = _parse_color(layout["background"])
+        for placement in layout["placements"]:
+            try:
+                prepared = _prepare_sprite(placement, width, height, fetch_timeout)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Skipping image %s in preview: %s", placement["image_id"], exc)
+                missing.append(placement["image_id"])
+                continue
+            if prepared is not None:
+                _blend(frame, *prepared)
+        if missing:
+            # Never store a partial render under the layout key: the next render must retry the
+            # missing images instead of finding this file and reporting nothing missing.
+            key = hashlib.sha256(f"{key}:partial".encode("utf-8")).hexdigest()
+            path = os.path.join(directory, f"{key}.png")
+        os.makedirs(directory, exist_ok=True)
+        # Write under a temporary name first so concurrent readers never see a partial PNG.
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix=".part")
+        with os.fdopen(handle, "wb") as stream:
+            Image.fromarray(np.clip(frame + 0.5, 0, 255).astype(np.uint8), "RGB").save(stream, "PNG")
+        os.replace(temporary, path)
+    return {"key": key, "width": layout["width"], "height": layout["height"], "missing": missing}
+
+
+def _prepare_sprite(
+    placement: Dict[str, Any],
+    frame_width: int,
+    frame_height: int,
+    fetch_timeout: float,
+) -> Optional[Tuple["np.ndarray", int, int]]:
+    """The part of a placed image that lands on the frame, as (RGBA pixels, left, top).
+
+    Only the visible crop is ever materialised: the source is at most shrunk
+    to its on-canvas size, then one affine transform scales, rotates and crops
+    it. Returns ``None`` when the image lies entirely off the frame.
+    """
+
+    scale = placement["scale"] or 1.0
+    width = max(1.0, placement["width"] * scale)
+    height = max(1.0, placement["height"] * scale)
+    # Scaling and rotation pivot on the element centre, as the canvas renders them.
+    centre_x = placement["x"] + placement["width"] / 2.0
+    centre_y = placement["y"] + placement["height"] / 2.0
+    angle = math.radians(placement["rotation"] or 0.0)
+    cos, sin = math.cos(angle), math.sin(angle)
+    extent_x = (abs(cos) * width + abs(sin) * height) / 2.0
+    extent_y = (abs(sin) * width + abs(cos) * height) / 2.0
+    left = max(0, int(math.floor(centre_x - extent_x)))
+    top = max(0, int(math.floor(centre_y - extent_y)))
+    right = min(frame_width, int(math.ceil(centre_x + extent_x)))
+    bottom = min(frame_height, int(math.ceil(centre_y + extent_y)))
+    if left >= right or top >= bottom:
+        return None
+
+    image = load_image(placement["url"], timeout=fetch_timeout)
+    # Shrinking first keeps downscales antialiased; enlarging is left to the transform.
+    reduced = (min(image.width, max(1, int(round(width)))), min(image.height, max(1, int(round(height)))))
+    if reduced != image.size:
+        image = image.resize(reduced, Image.BILINEAR)
+    # Map each crop pixel back into the source: undo the clockwise rotation about the centre,
+    # then the scale, then move the origin to the source's top-left corner.
+    ratio_x, ratio_y = image.width / width, image.height / height
+    offset_x, offset_y = left - centre_x, top - centre_y
+    coefficients = (
+        cos * ratio_x,
+        sin * ratio_x,
+        (cos * offset_x + sin * offset_y) * ratio_x + image.width / 2.0,
+        -sin * ratio_y,
+        cos * ratio_y,
+        (-sin * offset_x + cos * offset_y) * ratio_y + image.height / 2.0,
+    )
+    resample = Image.BICUBIC if placement["rotation"] else Image.BILINEAR
+    sprite = image.transform((right - left, bottom - top), Image.AFFINE, coefficients, resample=resample)
+    return np.asarray(sprite, dtype=np.uint8), left, top
+
+
+def _blend(frame: "np.ndarray", sprite: "np.ndarray", left: int, top: int) -> None:
+    """Alpha-composite an RGBA sprite over the RGB frame, touching only the overlap."""
+
+    frame_height, frame_width = frame.shape[:2]
+    x0, y0 = max(left, 0), max(top, 0)
+    x1 = min(left + sprite.shape[1], frame_width)
+    y1 = min(top + sprite.shape[0], frame_height)
+    if x0 >= x1 or y0 >= y1:
+        return
+    region = sprite[y0 - top : y1 - top, x0 - left : x1 - left]
+    alpha = region[..., 3:4].astype(np.float32) * (1.0 / 255.0)
+    target = frame[y0:y1, x0:x1]
+    target *= 1.0 - alpha
+    target += region[..., :3].astype(np.float32) * alpha
+
+
+def load_image(url: str, *, timeout: float = FETCH_TIMEOUT) -> "Image.Image":
+    if url.startswith("data:"):
+        header, _, payload = url.partition(",")
+        data = base64.b64decode(payload) if header.endswith(";base64") else payload.encode("utf-8")
+    elif url.startswith(("http://", "https://")):
+        if timeout <= 0:
+            raise TimeoutError(f"no time left to fetch {url[:64]}")
+        check_image_host(url)
+        with _public_opener().open(url, timeout=timeout) as response:
+            data = response.read(MAX_SOURCE_BYTES + 1)
+        if len(data) > MAX_SOURCE_BYTES:
+            raise ValueError("source image is too large")
+    else:
+        raise ValueError(f"unsupported image URL scheme: {url[:32]}")
+    image = Image.open(io.BytesIO(data))
+    # The header is parsed lazily, so this check runs before any pixel is decoded.
+    if image.width * image.height > MAX_SOURCE_PIXELS:
+        raise ValueError(f"source image is too large ({image.width}x{image.height})")
+    image.load()
+    return image.convert("RGBA")
+
+
+def check_image_host(url: str) -> None:
+    """Refuse URLs outside ``ALLOWED_IMAGE_HOSTS`` or whose host resolves to a non-public address.
+
+    Board image URLs are user input and the fetched pixels are served back
+    as previews, so an unchecked fetch would expose internal services.
+    """
+
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    if not host:
+        raise ValueError(f"image URL has no host: {url[:64]}")
+    if ALLOWED_IMAGE_HOSTS and not any(
+        host == allowed or host.endswith(f".{allowed}") for allowed in ALLOWED_IMAGE_HOSTS
+    ):
+        raise ValueError(f"image host {host} is not allowed")
+    for *_, address in socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP):
+        _check_address(address[0], host)
+
+
+def _check_address(address: str, host: str) -> None:
+    if not ipaddress.ip_address(address.split("%", 1)[0]).is_global:
+        raise ValueError(f"image host {host} resolves to non-public address {address}")
+
+
+def _check_peer(connection: http.client.HTTPConnection) -> None:
+    # Checked again on the connected socket, so DNS answers that change after check_image_host do not help.
+    try:
+        _check_address(connection.sock.getpeername()[0], connection.host)
+    except ValueError:
+        connection.close()
+        raise
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def connect(self) -> None:
+        super().connect()
+        _check_peer(self)
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def connect(self) -> None:
+        super().connect()
+        _check_peer(self)
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _SameHostRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urllib.parse.urlsplit(newurl).hostname != urllib.parse.urlsplit(req.full_url).hostname:
+            raise ValueError(f"refusing redirect to another host: {newurl[:64]}")
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _public_opener() -> urllib.request.OpenerDirector:
+    # No proxies: the peer check must see the image host itself.
+    return urllib.request.build_opener(
+        urllib.request.ProxyHandler({}),
+        _PublicHTTPHandler(),
+        _PublicHTTPSHandler(),
+        _SameHostRedirectHandler(),
+    )
+
+
+def _parse_color(value: Optional[str]) -> Tuple[float, float, float]:
+    text = (value or "").strip().lstrip("#")
+    if len(text) == 3:
+        text = "".join(char * 2 for char in text)
+    try:
+        return tuple(float(int(text[index : index + 2], 16)) for index in (0, 2, 4))  # type: ignore[return-value]
+    except ValueError:
+        return (255.0, 255.0, 255.0)
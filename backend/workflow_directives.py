@@ -0,0 +1,159 @@
+"""Batched, memoized resolution of the natural-language directives on board connections."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ai_types import LLMDirectiveResolution, WorkflowNodeType
+from workflow_cache import NodeResultCache
+
+
+@dataclass(frozen=True)
+class ResolvedDirective:
+    """Connection-independent outcome of resolving one directive text."""
+
+    resolved_prompt: str
+    confidence: float
+    suggested_node_type: Optional[WorkflowNodeType] = WorkflowNodeType.CUSTOM
+    parameters: Dict[str, Any] = field(default_factory=dict)
+
+
+DirectiveBatchFn = Callable[[Sequence[str], bool], Awaitable[Sequence[ResolvedDirective]]]
+
+
+async def local_directive_batch(texts: Sequence[str], use_llm: bool) -> List[ResolvedDirective]:
+    """Resolve directives without a model; returns one result per text, in order."""
+
+    results: List[ResolvedDirective] = []
+    for text in texts:
+        if use_llm:
+            # Placeholder: in future integrate with an actual LLM service
+            results.append(ResolvedDirective(resolved_prompt=text.replace("把", "将").strip(), confidence=0.75))
+        else:
+            results.append(ResolvedDirective(resolved_prompt=text, confidence=0.35))
+    return results
+
+
+class DirectiveResolver:
+    """Dedupes directive texts, resolves the unknown ones in a single batch call
+    and memoizes the outcome in an LRU keyed by ``(text, use_llm)``.
+
+    ``batch_fn`` receives every distinct unresolved text of a request at once,
+    so a model-backed implementation pays one round trip per board instead of
+    one per connection. Concurrent requests for the same text share the call
+    already in flight.
+    """
+
+    def __init__(self, *, batch_fn: Optional[DirectiveBatchFn] = None, max_bytes: int = 4 * 1024 * 1024) -> None:
+        self._batch_fn: DirectiveBatchFn = batch_fn or local_directive_batch
+        self._memo: NodeResultCache[ResolvedDirective] = NodeResultCache(max_bytes=max_bytes)
+        self._inflight: Dict[str, "asyncio.Future[ResolvedDirective]"] = {}
+        self.batches = 0
+        self.texts_resolved = 0
+        self.shared = 0
+
+    @staticmethod
+    def _key(text: str, use_llm: bool) -> str:
+        return f"{int(use_llm)}:{text}"
+
+    async def resolve_texts(self, texts: Iterable[str], *, use_llm: bool) -> Dict[str, ResolvedDirective]:
+        """Map every distinct non-empty text to its resolution."""
+
+        results: Dict[str, ResolvedDirective] = {}
+        waiting: Dict[str, "asyncio.Future[ResolvedDirective]"] = {}
+        missing: List[str] = []
+        for text in dict.fromkeys(text for text in texts if text):
+            key = self._key(text, use_llm)
+            cached = self._memo.get(key)
+            if cached is not None:
+                results[text] = cached
+            elif key in self._inflight:
+                waiting[text] = self._inflight[key]
+            else:
+                missing.append(text)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {text: loop.create_future() for text in missing}
+            for text, future in futures.items():
+                self._inflight[self._key(text, use_llm)] = future
+            try:
+                resolved = list(await self._batch_fn(missing, use_llm))
+                if len(resolved) != len(missing):
+                    raise ValueError(f"Directive batch returned {len(resolved)} results for {len(missing)} texts")
+            except BaseException as exc:
+                for text, future in futures.items():
+                    self._inflight.pop(self._key(text, use_llm), None)
+                    if isinstance(exc, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(exc)
+                        # Mark as retrieved so unshared failures are not logged twice.
+                        future.exception()
+                raise
+            self.batches += 1
+            self.texts_resolved += len(missing)
+            for text, item in zip(missing, resolved):
+                key = self._key(text, use_llm)
+                self._memo.put(key, item, _approximate_size(text, item))
+                self._inflight.pop(key, None)
+                futures[text].set_result(item)
+                results[text] = item
+
+        for text, future in waiting.items():
+            self.shared += 1
+            try:
+                results[text] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The request that owned the call was cancelled; resolve the text ourselves.
+                results.update(await self.resolve_texts([text], use_llm=use_llm))
+        return results
+
+    def unresolved(self, texts: Iterable[str], *, use_llm: bool) -> List[str]:
+        """Distinct non-empty texts that would need a batch call: neither memoized nor in flight."""
+
+        return [
+            text
+            for text in dict.fromkeys(text for text in texts if text)
+            if self._memo.peek(self._key(text, use_llm)) is None and self._key(text, use_llm) not in self._inflight
+        ]
+
+    async def resolve_labels(
+        self,
+        labels: Iterable[Tuple[str, Optional[str]]],
+        *,
+        use_llm: bool,
+    ) -> List[LLMDirectiveResolution]:
+        """Resolve ``(connection_id, label)`` pairs, skipping blank labels."""
+
+        labelled = [(connection_id, label.strip()) for connection_id, label in labels if label and label.strip()]
+        resolved = await self.resolve_texts((text for _, text in labelled), use_llm=use_llm)
+        return [to_resolution(connection_id, text, resolved[text]) for connection_id, text in labelled]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._memo.stats(),
+            "batches": self.batches,
+            "texts_resolved": self.texts_resolved,
+            "shared_inflight": self.shared,
+            "inflight": len(self._inflight),
+        }
+
+
+def to_resolution(connection_id: str, text: str, item: ResolvedDirective) -> LLMDirectiveResolution:
+    return LLMDirectiveResolution(
+        connection_id=connection_id,
+        original_text=text,
+        resolved_prompt=item.resolved_prompt,
+        suggested_node_type=item.suggested_node_type,
+        parameters=dict(item.parameters),
+        confidence=item.confidence,
+    )
+
+
+def _approximate_size(text: str, item: ResolvedDirective) -> int:
+    return len(text.encode("utf-8")) + len(item.resolved_prompt.encode("utf-8")) + 64 * (1 + len(item.parameters)) + 128
@@ -3,32 +3,106 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import heapq
+import json
 import logging
+import os
+import tempfile
+import time
 import uuid
 from collections import deque
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
 
 from ai_types import (
+    CanvasImage,
     CanvasWorkflowDefinition,
     CreativeBoardSnapshot,
     CreativeBoardWorkflowRunOptions,
+    LLMDirectiveBatchResponse,
     LLMDirectiveResolution,
+    WorkflowDryRunEstimate,
     WorkflowExecutionListItem,
     WorkflowExecutionState,
     WorkflowNodeDefinition,
     WorkflowNodeRunStatus,
     WorkflowNodeState,
+    WorkflowNodeTiming,
     WorkflowNodeType,
+    WorkflowNodeTypeTiming,
     WorkflowRunStatus,
+    WorkflowTimingBreakdown,
     WorkflowEdge,
     WorkflowPort,
     WorkflowNodeConfig,
 )
+from workflow_cache import NodeResultCache
+from workflow_directives import DirectiveResolver
+from workflow_events import WorkflowEventHub, WorkflowSubscription
+from workflow_compositor import (
+    COMPOSITOR_AVAILABLE,
+    DEFAULT_MAX_EDGE,
+    PreviewStore,
+    board_layout,
+    layout_key,
+    render_layout,
+)
+from workflow_executors import NodeContext, NodeExecutorRegistry, NodeInput, default_executor_registry
+from workflow_index import ExecutionIndex, IndexedExecution, decode_cursor
+from workflow_journal import SQLiteWorkflowJournal
+from workflow_metrics import WorkflowMetrics
+from workflow_queue import FairAdmissionQueue
+from workflow_state_backend import (
+    CONTROL_KEY,
+    InMemoryStateBackend,
+    RedisStateBackend,
+    WorkflowStateBackend,
+    listing_score,
+)
+from workflow_registry import ExecutionRegistry, SQLiteSpillStore
 
 logger = logging.getLogger(__name__)
 
+_INTERRUPTED_REASON = "Workflow run interrupted"
+
+# Flat per-record, per-node (definition plus state) and per-edge sizes used by WorkflowExecution.approximate_size.
+_RECORD_BASE_BYTES = 1024
+_RECORD_NODE_BYTES = 640
+_RECORD_EDGE_BYTES = 192
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read a positive integer from the environment, falling back to ``default``."""
+
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        logger.warning("Ignoring invalid integer for %s: %r", name, raw)
+        return default
+    return value if value > 0 else default
+
+
+def _env_seconds(name: str) -> Optional[float]:
+    """Read a time limit in seconds from the environment; unset or ``0`` means no limit."""
+
+    raw = os.getenv(name)
+    if not raw:
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        logger.warning("Ignoring invalid number for %s: %r", name, raw)
+        return None
+    if value < 0:
+        logger.warning("Ignoring negative time limit for %s: %r", name, raw)
+        return None
+    return value or None
+
 
 class WorkflowValidationError(Exception):
     """Raised when a workflow definition fails validation."""
@@ -38,6 +112,14 @@ class WorkflowExecutionError(Exception):
     """Raised when the workflow execution cannot proceed."""
 
 
+class WorkflowQueueFullError(WorkflowExecutionError):
+    """Raised when the background run queue cannot accept another execution."""
+
+
+class WorkflowNodeTimeoutError(WorkflowExecutionError):
+    """Raised when a node (or the run's directive batch) runs out of time."""
+
+
 @dataclass
 class OperationResult:
     """Normalized output returned by a workflow node."""
@@ -46,6 +128,9 @@ class OperationResult:
     asset_url: Optional[str] = None
     prompt: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
+    # Degraded results are neither shared through the result cache nor reused by reruns.
+    cacheable: bool = field(default=True, compare=False)
+    _encoded: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def materialize_metadata(self) -> Dict[str, Any]:
         data = dict(self.metadata)
@@ -55,6 +140,52 @@ class OperationResult:
             data.setdefault("asset_url", self.asset_url)
         return data
 
+    def _canonical(self) -> str:
+        if self._encoded is None:
+            self._encoded = _canonical_json(self.to_record())
+        return self._encoded
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "asset_url": self.asset_url,
+            "prompt": self.prompt,
+            "metadata": self.metadata,
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "OperationResult":
+        return cls(
+            node_id=record["node_id"],
+            asset_url=record.get("asset_url"),
+            prompt=record.get("prompt"),
+            metadata=dict(record.get("metadata") or {}),
+        )
+
+    def fingerprint(self) -> str:
+        """Stable content hash used to key downstream cache entries."""
+
+        return hashlib.sha256(self._canonical().encode("utf-8")).hexdigest()
+
+    def approximate_size(self) -> int:
+        return len(self._canonical().encode("utf-8"))
+
+
+def _freeze_node_state(node_state: WorkflowNodeState) -> WorkflowNodeState:
+    """Copy a node state for publishing.
+
+    The engine always replaces ``output_metadata`` and ``upstream_ids`` rather than
+    mutating them, so copying the top-level containers is enough and far cheaper
+    than a deep copy.
+    """
+
+    return node_state.model_copy(
+        update={
+            "output_metadata": dict(node_state.output_metadata),
+            "upstream_ids": list(node_state.upstream_ids),
+        }
+    )
+
 
 @dataclass
 class WorkflowExecution:
@@ -76,43 +207,202 @@ class WorkflowExecution:
     edges_by_source: Dict[str, List[WorkflowEdge]] = field(default_factory=dict)
     edges_by_target: Dict[str, List[WorkflowEdge]] = field(default_factory=dict)
     topological_order: List[str] = field(default_factory=list)
+    image_lookup: Dict[str, CanvasImage] = field(default_factory=dict)
+    state_lookup: Dict[str, WorkflowNodeState] = field(default_factory=dict)
+    plan: Optional["CompiledPlan"] = None
+    # edge_id -> directive resolved for the edge's label, rebuilt at the start of every run; never persisted
+    directives: Dict[str, LLMDirectiveResolution] = field(default_factory=dict, repr=False)
+    # Monotonic time by which the current (or last) run must be over; set per run, never persisted
+    deadline: Optional[float] = field(default=None, repr=False)
+    # Bumped whenever a run starts or a queued run is withdrawn; background jobs carry the value they
+    # were queued at, so a job overtaken by a rerun or a cancellation is recognized as stale. Never persisted.
+    run_generation: int = field(default=0, repr=False)
+    # node_id -> (state.version at which it last changed, immutable copy shared by snapshots)
+    _frozen_nodes: Dict[str, Tuple[int, WorkflowNodeState]] = field(default_factory=dict, init=False, repr=False)
+    _published: Optional[WorkflowExecutionState] = field(default=None, init=False, repr=False)
+    # (snapshot, its encoded size): snapshots are replaced rather than edited, so the size is measured once.
+    _snapshot_size: Optional[Tuple[CreativeBoardSnapshot, int]] = field(default=None, init=False, repr=False)
 
     def rebuild_graph(self) -> None:
         """Synchronize cached structures after definition changes."""
 
+        plan = _compile_plan(self.definition)
+        self.plan = plan
+        edges = self.definition.edges
         self.node_lookup = {node.id: node for node in self.definition.nodes}
-        self.edges_by_source = {node_id: [] for node_id in self.node_lookup.keys()}
-        self.edges_by_target = {node_id: [] for node_id in self.node_lookup.keys()}
-
-        cleaned_edges: List[WorkflowEdge] = []
-        for edge in self.definition.edges:
-            if edge.source.node_id not in self.node_lookup or edge.target.node_id not in self.node_lookup:
-                logger.debug("Dropping dangling edge %s", edge.id)
-                continue
-            self.edges_by_source.setdefault(edge.source.node_id, []).append(edge)
-            self.edges_by_target.setdefault(edge.target.node_id, []).append(edge)
-            cleaned_edges.append(edge)
-        self.definition.edges = cleaned_edges
-
+        self.edges_by_source = {
+            node_id: [edges[index] for index in outbound] for node_id, outbound in zip(plan.node_ids, plan.outbound)
+        }
+        self.edges_by_target = {
+            node_id: [edges[index] for index in inbound] for node_id, inbound in zip(plan.node_ids, plan.inbound)
+        }
+        if len(plan.kept_edges) != len(edges):
+            logger.debug("Dropping %d dangling edges", len(edges) - len(plan.kept_edges))
+            self.definition.edges = [edges[index] for index in plan.kept_edges]
+
+        upstream_ids = dict(zip(plan.node_ids, plan.upstream_ids))
         for node in self.definition.nodes:
-            inbound = [edge.source.node_id for edge in self.edges_by_target.get(node.id, [])]
-            node.input_ids = inbound
+            inbound_ids = upstream_ids[node.id]
+            # Pydantic attribute assignment is comparatively slow; skip it when nothing changed.
+            if len(node.input_ids) != len(inbound_ids) or tuple(node.input_ids) != inbound_ids:
+                node.input_ids = list(inbound_ids)
 
-        state_map = {ns.node_id: ns for ns in self.state.node_states}
+        self.state_lookup = {ns.node_id: ns for ns in self.state.node_states}
         for node in self.definition.nodes:
-            node_state = state_map.get(node.id)
+            inbound_ids = upstream_ids[node.id]
+            node_state = self.state_lookup.get(node.id)
             if not node_state:
-                node_state = WorkflowNodeState(node_id=node.id)
+                node_state = WorkflowNodeState(node_id=node.id, upstream_ids=list(inbound_ids))
                 self.state.node_states.append(node_state)
-            node_state.upstream_ids = [edge.source.node_id for edge in self.edges_by_target.get(node.id, [])]
-        self.state.node_states = [ns for ns in self.state.node_states if ns.node_id in self.node_lookup]
+                self.state_lookup[node.id] = node_state
+            elif tuple(node_state.upstream_ids) != inbound_ids:
+                node_state.upstream_ids = list(inbound_ids)
+        if len(self.state.node_states) != len(self.node_lookup):
+            self.state.node_states = [ns for ns in self.state.node_states if ns.node_id in self.node_lookup]
+            self.state_lookup = {ns.node_id: ns for ns in self.state.node_states}
+        self.image_lookup = {}
+        for image in self.snapshot.images:
+            # Keep the first image for duplicated ids, matching a linear scan.
+            self.image_lookup.setdefault(image.id, image)
+
+        self.topological_order = list(plan.topological_order)
+        self.refreeze()
+
+    def approximate_size(self) -> int:
+        """Estimated size of ``to_record`` in bytes, without serializing the execution.
+
+        The registry calls this on every put and refresh. Node results cache
+        their own encoding, the snapshot is measured once and the remaining
+        per-node bookkeeping is counted at a flat rate.
+        """
+
+        if self._snapshot_size is None or self._snapshot_size[0] is not self.snapshot:
+            self._snapshot_size = (self.snapshot, len(self.snapshot.model_dump_json().encode("utf-8")))
+        return (
+            self._snapshot_size[1]
+            + _RECORD_NODE_BYTES * len(self.state.node_states)
+            + _RECORD_EDGE_BYTES * len(self.definition.edges)
+            + sum(result.approximate_size() for result in self.results.values())
+            + len(self.final_prompt or "")
+            + _RECORD_BASE_BYTES
+        )
 
-        self.topological_order = _compute_topological_order(self.definition.nodes, self.edges_by_source)
+    def remaining_budget(self) -> Optional[float]:
+        """Seconds left before ``deadline`` (never negative), or ``None`` without a deadline."""
 
-    def snapshot_state(self) -> WorkflowExecutionState:
-        """Return a deep copy of the current execution state."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
 
-        return self.state.model_copy(deep=True)
+    def commit_node(self, node_state: WorkflowNodeState) -> None:
+        """Publish a new version in which only ``node_state`` changed."""
+
+        frozen = self._frozen_nodes.get(node_state.node_id)
+        if frozen is not None and frozen[1] == node_state:
+            return
+        self.state.version += 1
+        self._frozen_nodes[node_state.node_id] = (self.state.version, _freeze_node_state(node_state))
+        self._published = None
+
+    def commit_state(self) -> None:
+        """Publish a new version after execution-level fields changed."""
+
+        self.state.version += 1
+        self._published = None
+
+    def refreeze(self) -> None:
+        """Re-freeze node states after bulk edits, keeping copies of unchanged nodes."""
+
+        version = self.state.version + 1
+        changed = len(self._frozen_nodes) != len(self.state.node_states)
+        frozen_nodes: Dict[str, Tuple[int, WorkflowNodeState]] = {}
+        for node_state in self.state.node_states:
+            frozen = self._frozen_nodes.get(node_state.node_id)
+            if frozen is None or frozen[1] != node_state:
+                frozen = (version, _freeze_node_state(node_state))
+                changed = True
+            frozen_nodes[node_state.node_id] = frozen
+        if frozen_nodes.keys() != self._frozen_nodes.keys():
+            self.state.node_set_version = version
+        self._frozen_nodes = frozen_nodes
+        if changed:
+            self.state.version = version
+        self._published = None
+
+    def node_versions(self) -> Dict[str, int]:
+        """Return the state version at which each node last changed."""
+
+        return {node_id: frozen[0] for node_id, frozen in self._frozen_nodes.items()}
+
+    def snapshot_state(self, since_version: Optional[int] = None) -> WorkflowExecutionState:
+        """Return the current immutable version of the execution state.
+
+        Snapshots share unchanged node states with earlier versions and must not be
+        mutated. With ``since_version`` only node states changed after that version
+        are included, unless the node set changed since then (``node_set_version``):
+        that delta could not express removed nodes, so the full snapshot is returned.
+        """
+
+        if since_version is not None and self.state.node_set_version <= since_version <= self.state.version:
+            return self._build_snapshot(since_version)
+        if self._published is None:
+            self._published = self._build_snapshot(None)
+        return self._published
+
+    def _build_snapshot(self, since_version: Optional[int]) -> WorkflowExecutionState:
+        node_states: List[WorkflowNodeState] = []
+        for node_state in self.state.node_states:
+            frozen = self._frozen_nodes.get(node_state.node_id)
+            if frozen is None:
+                frozen = (self.state.version, _freeze_node_state(node_state))
+                self._frozen_nodes[node_state.node_id] = frozen
+            if since_version is None or frozen[0] > since_version:
+                node_states.append(frozen[1])
+        fields = {name: getattr(self.state, name) for name in WorkflowExecutionState.model_fields}
+        fields["node_states"] = node_states
+        return WorkflowExecutionState.model_construct(**fields)
+
+    def to_record(self) -> Dict[str, Any]:
+        """Serialize the execution into a JSON-compatible record."""
+
+        return {
+            "workflow_id": self.workflow_id,
+            "board_id": self.board_id,
+            "owner_id": self.owner_id,
+            "snapshot": self.snapshot.model_dump(mode="json"),
+            "definition": self.definition.model_dump(mode="json"),
+            "options": self.options.model_dump(mode="json"),
+            "state": self.state.model_dump(mode="json"),
+            "results": {node_id: result.to_record() for node_id, result in self.results.items()},
+            "final_prompt": self.final_prompt,
+            "task_id": self.task_id,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "WorkflowExecution":
+        """Rebuild an execution (including graph caches) from ``to_record`` output."""
+
+        execution = cls(
+            workflow_id=record["workflow_id"],
+            board_id=record["board_id"],
+            owner_id=record.get("owner_id"),
+            snapshot=CreativeBoardSnapshot.model_validate(record["snapshot"]),
+            definition=CanvasWorkflowDefinition.model_validate(record["definition"]),
+            options=CreativeBoardWorkflowRunOptions.model_validate(record["options"]),
+            state=WorkflowExecutionState.model_validate(record["state"]),
+            results={
+                node_id: OperationResult.from_record(result)
+                for node_id, result in (record.get("results") or {}).items()
+            },
+            final_prompt=record.get("final_prompt"),
+            task_id=record.get("task_id"),
+            created_at=datetime.fromisoformat(record["created_at"]),
+            updated_at=datetime.fromisoformat(record["updated_at"]),
+        )
+        execution.rebuild_graph()
+        return execution
 
 
 def _compute_topological_order(
@@ -145,6 +435,193 @@ def _compute_topological_order(
     return ordering
 
 
+@dataclass(frozen=True)
+class CompiledPlan:
+    """Structure-only view of a workflow graph, shared by executions with the same shape.
+
+    Edge positions index into ``CanvasWorkflowDefinition.edges`` as submitted
+    (dangling edges included), so the plan can be applied to any definition whose
+    node ids and edge endpoints hash to ``key``.
+    """
+
+    key: str
+    node_ids: Tuple[str, ...]
+    kept_edges: Tuple[int, ...]
+    inbound: Tuple[Tuple[int, ...], ...]
+    outbound: Tuple[Tuple[int, ...], ...]
+    upstream_ids: Tuple[Tuple[str, ...], ...]
+    topological_order: Tuple[str, ...]
+    order_index: Dict[str, int]
+    in_degree: Dict[str, int]
+    entry_ids: Tuple[str, ...]
+    output_ids: FrozenSet[str]
+
+    def approximate_size(self) -> int:
+        return 96 * (len(self.node_ids) + len(self.kept_edges)) + 256
+
+
+# Boards are mostly rerun with an unchanged structure, so compiled plans are shared process-wide.
+_plan_cache: NodeResultCache[CompiledPlan] = NodeResultCache(
+    max_bytes=_env_int("WORKFLOW_PLAN_CACHE_BYTES", 32 * 1024 * 1024)
+)
+
+
+def _plan_key(definition: CanvasWorkflowDefinition) -> str:
+    digest = hashlib.sha256()
+    digest.update("\x1f".join(node.id for node in definition.nodes).encode("utf-8"))
+    digest.update(b"\x1e")
+    digest.update(
+        "\x1f".join(f"{edge.source.node_id}\x1d{edge.target.node_id}" for edge in definition.edges).encode("utf-8")
+    )
+    return digest.hexdigest()
+
+
+def _compile_plan(definition: CanvasWorkflowDefinition) -> CompiledPlan:
+    """Return the compiled plan for ``definition``'s structure, reusing a cached one when possible."""
+
+    key = _plan_key(definition)
+    plan = _plan_cache.get(key)
+    if plan is not None:
+        return plan
+
+    node_ids = list(dict.fromkeys(node.id for node in definition.nodes))
+    position = {node_id: index for index, node_id in enumerate(node_ids)}
+    inbound: List[List[int]] = [[] for _ in node_ids]
+    outbound: List[List[int]] = [[] for _ in node_ids]
+    kept_edges: List[int] = []
+    edges_by_source: Dict[str, List[WorkflowEdge]] = {node_id: [] for node_id in node_ids}
+    for index, edge in enumerate(definition.edges):
+        source = position.get(edge.source.node_id)
+        target = position.get(edge.target.node_id)
+        if source is None or target is None:
+            continue
+        outbound[source].append(index)
+        inbound[target].append(index)
+        kept_edges.append(index)
+        edges_by_source[edge.source.node_id].append(edge)
+
+    topological_order = _compute_topological_order(definition.nodes, edges_by_source)
+    edges = definition.edges
+    plan = CompiledPlan(
+        key=key,
+        node_ids=tuple(node_ids),
+        kept_edges=tuple(kept_edges),
+        inbound=tuple(tuple(items) for items in inbound),
+        outbound=tuple(tuple(items) for items in outbound),
+        upstream_ids=tuple(tuple(edges[index].source.node_id for index in items) for items in inbound),
+        topological_order=tuple(topological_order),
+        order_index={node_id: index for index, node_id in enumerate(topological_order)},
+        in_degree={node_id: len(inbound[position[node_id]]) for node_id in topological_order},
+        entry_ids=tuple(node_id for node_id in topological_order if not inbound[position[node_id]]),
+        output_ids=frozenset(node_id for node_id in node_ids if not outbound[position[node_id]]),
+    )
+    _plan_cache.put(key, plan, plan.approximate_size())
+    return plan
+
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _submission_key(
+    board_id: str,
+    snapshot: CreativeBoardSnapshot,
+    options: CreativeBoardWorkflowRunOptions,
+    owner_id: Optional[str],
+) -> str:
+    """Fingerprint of a submission; ``detach`` only changes how the caller waits, not the run."""
+
+    payload = {
+        "owner_id": owner_id,
+        "board_id": board_id,
+        "snapshot": snapshot.model_dump(mode="json"),
+        "options": options.model_dump(mode="json", exclude={"detach"}),
+    }
+    return hashlib.sha256(_canonical_json(payload).encode("utf-8")).hexdigest()
+
+
+def _node_inputs(upstream_items: Sequence[Tuple[WorkflowEdge, OperationResult]]) -> List[NodeInput]:
+    return [
+        NodeInput(
+            node_id=upstream.node_id,
+            asset_url=upstream.asset_url,
+            prompt=upstream.prompt,
+            metadata=upstream.metadata,
+        )
+        for _, upstream in upstream_items
+    ]
+
+
+def _node_timeout(node: WorkflowNodeDefinition, default: Optional[float]) -> Optional[float]:
+    """Per-node ``timeout_seconds`` parameter, falling back to the engine default."""
+
+    raw = node.config.parameters.get("timeout_seconds")
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        logger.warning("Ignoring invalid timeout_seconds for node %s: %r", node.id, raw)
+        return default
+    return value if value > 0 else default
+
+
+async def _bounded(awaitable: Awaitable[Any], timeout: Optional[float], what: str) -> Any:
+    """Await ``awaitable`` for at most ``timeout`` seconds, then cancel it and raise ``WorkflowNodeTimeoutError``.
+
+    Unlike ``asyncio.wait_for`` this keeps a ``TimeoutError`` raised by the
+    work itself (say a socket timeout) apart from running out of time.
+    """
+
+    if timeout is None:
+        return await awaitable
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except BaseException:
+        task.cancel()
+        raise
+    if not done:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        raise WorkflowNodeTimeoutError(f"{what} timed out after {timeout:g}s")
+    return task.result()
+
+
+def _demand_closure(execution: WorkflowExecution) -> Optional[Set[str]]:
+    """Nodes a run has to evaluate: the ancestor closure of the focused nodes, else of the outputs.
+
+    ``focus_node_ids`` may name nodes or edges; board connection ids become
+    edge ids, and an edge stands for its target node. Returns ``None`` when
+    every node is needed.
+    """
+
+    roots: Set[str] = set()
+    focus = execution.options.focus_node_ids
+    if focus:
+        edges = {edge.id: edge for edge in execution.definition.edges}
+        for item in focus:
+            if item in execution.node_lookup:
+                roots.add(item)
+            elif item in edges:
+                roots.add(edges[item].target.node_id)
+        if not roots:
+            logger.debug("No focus id of workflow %s matches the graph; using its outputs", execution.workflow_id)
+    if not roots:
+        roots = {node_id for node_id in execution.definition.output_ids or [] if node_id in execution.node_lookup}
+    if not roots:
+        return None
+    closure: Set[str] = set()
+    stack = list(roots)
+    while stack:
+        node_id = stack.pop()
+        if node_id in closure:
+            continue
+        closure.add(node_id)
+        stack.extend(edge.source.node_id for edge in execution.edges_by_target.get(node_id, []))
+    return None if len(closure) == len(execution.node_lookup) else closure
+
+
 def _unique_prompts(prompts: Iterable[str]) -> List[str]:
     seen: Set[str] = set()
     ordered: List[str] = []
@@ -175,12 +652,195 @@ def _collect_downstream(execution: WorkflowExecution, node_ids: Set[str]) -> Set
     return visited
 
 
+def _node_signature(
+    node: WorkflowNodeDefinition,
+    images_by_id: Dict[str, CanvasImage],
+) -> str:
+    """Serialize the parts of a node definition that influence its evaluation."""
+
+    data = node.model_dump(mode="json", exclude={"input_ids", "created_at", "updated_at"})
+    if node.type == WorkflowNodeType.INPUT_IMAGE:
+        image = images_by_id.get(node.metadata.get("image_id")) if node.metadata else None
+        data["image"] = image.model_dump(mode="json", include={"url", "description", "source"}) if image else None
+    return _canonical_json(data)
+
+
+def _diff_workflow(
+    previous_definition: CanvasWorkflowDefinition,
+    previous_snapshot: CreativeBoardSnapshot,
+    definition: CanvasWorkflowDefinition,
+    snapshot: CreativeBoardSnapshot,
+) -> Set[str]:
+    """Return the node ids whose own inputs changed between two board revisions.
+
+    Downstream propagation is left to ``_collect_downstream``; this only reports
+    nodes that were added, whose config or referenced image changed, or whose
+    inbound edges were added, removed, relabelled or re-wired.
+    """
+
+    previous_images = {image.id: image for image in previous_snapshot.images}
+    images = {image.id: image for image in snapshot.images}
+    previous_nodes = {node.id: node for node in previous_definition.nodes}
+
+    changed: Set[str] = set()
+    for node in definition.nodes:
+        previous = previous_nodes.get(node.id)
+        if previous is None or _node_signature(previous, previous_images) != _node_signature(node, images):
+            changed.add(node.id)
+
+    def edge_signature(edge: WorkflowEdge) -> Tuple[str, str, str, str, Optional[str]]:
+        return (edge.source.node_id, edge.source.port, edge.target.node_id, edge.target.port, edge.label)
+
+    previous_edges = {edge.id: edge for edge in previous_definition.edges}
+    edges = {edge.id: edge for edge in definition.edges}
+    for edge_id in previous_edges.keys() | edges.keys():
+        before = previous_edges.get(edge_id)
+        after = edges.get(edge_id)
+        if before is not None and after is not None and edge_signature(before) == edge_signature(after):
+            continue
+        for item in (before, after):
+            if item is not None:
+                changed.add(item.target.node_id)
+
+    node_ids = {node.id for node in definition.nodes}
+    return changed & node_ids
+
+
+@dataclass
+class _ActiveRun:
+    """Bookkeeping for an execution whose DAG is currently being evaluated."""
+
+    execution: WorkflowExecution
+    tasks: Dict[asyncio.Task, str] = field(default_factory=dict)
+    admission: Optional[asyncio.Future] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    cancel_reason: Optional[str] = None
+    # Monotonic timestamps bracketing the admission wait, and the nodes settled by this run.
+    requested_at: float = field(default_factory=time.monotonic)
+    admitted_at: Optional[float] = None
+    settled: List[str] = field(default_factory=list)
+    # Nodes this run has to evaluate (see _demand_closure); ``None`` means all of them.
+    scope: Optional[Set[str]] = None
+    # Set once the workflow deadline passed; the run stops dispatching and settles FAILED or PARTIAL.
+    deadline_reason: Optional[str] = None
+
+
+@dataclass
+class _Submission:
+    """An execution still in flight that identical submissions are coalesced onto."""
+
+    key: str
+    execution: WorkflowExecution
+    settled: asyncio.Event = field(default_factory=asyncio.Event)
+    # Submitted with submit_workflow, whose background job reports back to its submitter.
+    detached: bool = False
+    # Inline runs only: ``on_finished`` of the first detached submission coalesced onto it.
+    on_finished: Optional[Callable[[WorkflowExecution], Awaitable[None]]] = None
+
+
+@dataclass
+class _BackgroundJob:
+    """Execution handed to the background worker pool."""
+
+    execution: WorkflowExecution
+    # ``execution.run_generation`` when queued; the worker skips the job once it no longer matches.
+    generation: int = 0
+    dirty_nodes: Optional[Set[str]] = None
+    on_finished: Optional[Callable[[WorkflowExecution], Awaitable[None]]] = None
+
+
 class WorkflowEngine:
     """High-level manager responsible for building and executing workflows."""
 
-    def __init__(self) -> None:
-        self._executions: Dict[str, WorkflowExecution] = {}
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 32,
+        execution_concurrency: int = 8,
+        result_cache: Optional[NodeResultCache[OperationResult]] = None,
+        registry: Optional[ExecutionRegistry[WorkflowExecution]] = None,
+        journal: Optional[SQLiteWorkflowJournal] = None,
+        journal_retention: Optional[timedelta] = None,
+        events: Optional[WorkflowEventHub] = None,
+        admission: Optional[FairAdmissionQueue] = None,
+        background_workers: int = 16,
+        background_queue_size: int = 1024,
+        state_backend: Optional[WorkflowStateBackend] = None,
+        directives: Optional[DirectiveResolver] = None,
+        metrics: Optional[WorkflowMetrics] = None,
+        executors: Optional[NodeExecutorRegistry] = None,
+        preview_store: Optional[PreviewStore] = None,
+        node_timeout: Optional[float] = None,
+        workflow_deadline: Optional[float] = None,
+    ) -> None:
+        self._executions: ExecutionRegistry[WorkflowExecution] = (
+            registry if registry is not None else self.create_registry()
+        )
+        # Listing order by updated_at per board / owner; covers resident and spilled executions alike.
+        self._index = ExecutionIndex()
+        self._index_seeded = False
+        self._executions.on_drop = self._index.remove
         self._lock = asyncio.Lock()
+        # Engine-wide cap on node evaluations in flight across every execution.
+        self._max_concurrency = max(1, max_concurrency)
+        # Default per-execution cap, overridable via CreativeBoardWorkflowRunOptions.max_concurrency.
+        self._execution_concurrency = max(1, execution_concurrency)
+        self._node_slots = asyncio.Semaphore(self._max_concurrency)
+        # Default seconds a node may run (overridable per node via ``timeout_seconds``) and a
+        # whole run may take (overridable via CreativeBoardWorkflowRunOptions.deadline_seconds).
+        self._node_timeout = node_timeout
+        self._workflow_deadline = workflow_deadline
+        self._result_cache: NodeResultCache[OperationResult] = (
+            result_cache if result_cache is not None else NodeResultCache()
+        )
+        # Edge labels are resolved once per board run in a single batch and memoized across executions.
+        self._directives = directives if directives is not None else DirectiveResolver()
+        self._metrics = metrics if metrics is not None else WorkflowMetrics()
+        # Image-producing node types are delegated to pluggable executors (CPU work runs in a process pool).
+        self._previews = (
+            preview_store
+            if preview_store is not None
+            else PreviewStore(os.path.join(tempfile.gettempdir(), "admagic_workflow_previews"))
+        )
+        self._executors = (
+            executors if executors is not None else default_executor_registry(preview_store=self._previews)
+        )
+        self._journal = journal
+        self._journal_retention = journal_retention
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._active_runs: Dict[str, _ActiveRun] = {}
+        # Identical submissions (same owner, board, snapshot and options) share one in-flight execution.
+        self._submissions: Dict[str, _Submission] = {}
+        self._submission_keys: Dict[str, str] = {}
+        self._coalesced = 0
+        self._events = events if events is not None else WorkflowEventHub()
+        # Executions wait here for one of a bounded number of run slots.
+        self._admission = admission if admission is not None else FairAdmissionQueue()
+        # Detached submissions are run by a fixed pool of worker tasks fed from a bounded queue.
+        self._background_workers = max(1, background_workers)
+        self._background_queue_size = max(1, background_queue_size)
+        self._jobs: Optional["asyncio.Queue[_BackgroundJob]"] = None
+        # Queue slots claimed by submissions still registering their execution.
+        self._reserved_jobs = 0
+        self._workers: List[asyncio.Task] = []
+        self._draining = False
+        # Optional cross-process mirror of execution state; events are routed through it.
+        self._instance_id = uuid.uuid4().hex
+        self._state_backend = state_backend
+        self._state_backend_started = False
+        if state_backend is not None:
+            state_backend.add_listener(self._on_backend_event)
+
+    @staticmethod
+    def create_registry(**kwargs: Any) -> ExecutionRegistry[WorkflowExecution]:
+        """Build a registry that never evicts executions which are still running."""
+
+        return ExecutionRegistry(
+            loader=WorkflowExecution.from_record,
+            is_busy=lambda execution: execution.state.status
+            in {WorkflowRunStatus.NOT_STARTED, WorkflowRunStatus.RUNNING},
+            **kwargs,
+        )
 
     async def start_workflow(
         self,
@@ -190,6 +850,154 @@ class WorkflowEngine:
         options: Optional[CreativeBoardWorkflowRunOptions] = None,
         owner_id: Optional[str] = None,
     ) -> WorkflowExecution:
+        """Run a workflow to completion.
+
+        While an identical submission is still in flight, the caller waits for
+        that execution instead and gets it back (same ``workflow_id``).
+        """
+
+        options = options or CreativeBoardWorkflowRunOptions()
+        key = _submission_key(board_id, snapshot, options, owner_id)
+        while True:
+            shared = self._submissions.get(key)
+            if shared is None:
+                break
+            self._coalesced += 1
+            await shared.settled.wait()
+            state = shared.execution.state
+            if state.status != WorkflowRunStatus.CANCELLED or state.error_message != _INTERRUPTED_REASON:
+                return shared.execution
+            # The caller that owned the run went away mid-flight; run it on our own behalf.
+        execution = await self._create_execution(
+            board_id, snapshot, options=options, owner_id=owner_id, submission_key=key
+        )
+        await self._run_execution(execution, None)
+        return execution
+
+    async def submit_workflow(
+        self,
+        board_id: str,
+        snapshot: CreativeBoardSnapshot,
+        *,
+        options: Optional[CreativeBoardWorkflowRunOptions] = None,
+        owner_id: Optional[str] = None,
+        on_finished: Optional[Callable[[WorkflowExecution], Awaitable[None]]] = None,
+    ) -> WorkflowExecution:
+        """Register an execution and return immediately; a background worker runs it.
+
+        ``on_finished`` is awaited by the worker once the run has settled, whatever
+        its final status. An identical submission that is still in flight is
+        returned as-is. If that is a detached run, its own ``on_finished`` stays
+        the only callback. An inline run (``start_workflow``) has none, so the
+        first detached submitter joining it has its ``on_finished`` called once
+        the run settles; later ones are expected to share that submitter's work.
+        """
+
+        if self._draining:
+            raise WorkflowExecutionError("Workflow engine is shutting down")
+        options = options or CreativeBoardWorkflowRunOptions()
+        key = _submission_key(board_id, snapshot, options, owner_id)
+        shared = self._submissions.get(key)
+        if shared is not None:
+            self._coalesced += 1
+            if not shared.detached and shared.on_finished is None:
+                shared.on_finished = on_finished
+            return shared.execution
+        jobs = self.start_workers()
+        # Claim the slot before awaiting, so concurrent submitters cannot fill the queue in between.
+        if jobs.qsize() + self._reserved_jobs >= self._background_queue_size:
+            raise WorkflowQueueFullError("Too many workflows waiting to run")
+        self._reserved_jobs += 1
+        try:
+            execution = await self._create_execution(
+                board_id, snapshot, options=options, owner_id=owner_id, submission_key=key, detached=True
+            )
+            jobs.put_nowait(
+                _BackgroundJob(execution=execution, generation=execution.run_generation, on_finished=on_finished)
+            )
+        finally:
+            self._reserved_jobs -= 1
+        return execution
+
+    def start_workers(self) -> "asyncio.Queue[_BackgroundJob]":
+        """Start the background worker pool (idempotent) and return its job queue."""
+
+        if self._jobs is None:
+            self._jobs = asyncio.Queue(maxsize=self._background_queue_size)
+        self._draining = False
+        if self._state_backend is not None and not self._state_backend_started:
+            self._state_backend_started = True
+            self._spawn(self._state_backend.start())
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self._background_workers:
+            self._workers.append(asyncio.create_task(self._background_worker(self._jobs)))
+        return self._jobs
+
+    async def shutdown(self, timeout: float = 30.0) -> None:
+        """Stop accepting detached work and let queued and running executions drain.
+
+        Whatever is still running after ``timeout`` seconds is cancelled. Queued
+        executions the workers never reached stay NOT_STARTED in the journal and
+        are resumed by ``restore`` on the next start.
+        """
+
+        self._draining = True
+        pending: List[Awaitable[Any]] = list(self._background_tasks)
+        if self._jobs is not None and self._workers:
+            pending.append(self._jobs.join())
+        if pending:
+            done, not_done = await asyncio.wait(
+                [asyncio.ensure_future(item) for item in pending],
+                timeout=max(0.0, timeout),
+            )
+            if not_done:
+                logger.warning("Workflow engine shutdown timed out; cancelling in-flight executions")
+                for item in not_done:
+                    item.cancel()
+        for task in [*self._workers, *self._background_tasks]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._background_tasks, return_exceptions=True)
+        self._workers = []
+        if self._state_backend is not None and self._state_backend_started:
+            self._state_backend_started = False
+            await self._state_backend.close()
+        if self._journal is not None:
+            await asyncio.to_thread(self._journal.flush)
+        await asyncio.to_thread(self._executors.shutdown)
+
+    async def _background_worker(self, jobs: "asyncio.Queue[_BackgroundJob]") -> None:
+        while True:
+            job = await jobs.get()
+            try:
+                if job.generation == job.execution.run_generation:
+                    await self._run_execution(job.execution, job.dirty_nodes)
+                else:
+                    # Withdrawn or taken over by a rerun while queued: never run it a second time,
+                    # but report to the submitter once the run that replaced it has settled.
+                    active = self._active_runs.get(job.execution.workflow_id)
+                    if active is not None:
+                        await active.done.wait()
+                if job.on_finished is not None:
+                    await job.on_finished(job.execution)
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Background run of workflow %s failed", job.execution.workflow_id)
+            finally:
+                jobs.task_done()
+
+    async def _create_execution(
+        self,
+        board_id: str,
+        snapshot: CreativeBoardSnapshot,
+        *,
+        options: Optional[CreativeBoardWorkflowRunOptions],
+        owner_id: Optional[str],
+        submission_key: Optional[str] = None,
+        detached: bool = False,
+    ) -> WorkflowExecution:
+        if options is not None and options.dry_run:
+            raise WorkflowValidationError("Dry runs are answered by estimate_workflow and never executed")
         definition = self._ensure_definition(snapshot)
         workflow_id = str(uuid.uuid4())
         state = WorkflowExecutionState(
@@ -210,11 +1018,18 @@ class WorkflowEngine:
             owner_id=owner_id,
         )
         execution.rebuild_graph()
+        if submission_key is not None:
+            # Registered before the first await, so a concurrent duplicate always finds it.
+            self._submissions[submission_key] = _Submission(
+                key=submission_key, execution=execution, detached=detached
+            )
+            self._submission_keys[workflow_id] = submission_key
 
         async with self._lock:
-            self._executions[workflow_id] = execution
-
-        await self._run_execution(execution, None)
+            self._executions.put(execution)
+        self._index_execution(execution)
+        self._checkpoint(execution)
+        self._supersede(execution)
         return execution
 
     async def recompute_workflow(
@@ -225,14 +1040,29 @@ class WorkflowEngine:
         options: Optional[CreativeBoardWorkflowRunOptions] = None,
         node_ids: Optional[List[str]] = None,
     ) -> WorkflowExecution:
-        execution = self._executions.get(workflow_id)
+        if options is not None and options.dry_run:
+            raise WorkflowValidationError("Dry runs are answered by estimate_workflow and never executed")
+        execution = await self._load_execution(workflow_id)
         if not execution:
             raise WorkflowExecutionError(f"Unknown workflow_id: {workflow_id}")
+        # A rerun replaces whatever is still in flight for this execution.
+        await self.cancel_workflow(workflow_id, reason="Superseded by a rerun")
+        # The rerun no longer matches the original submission's fingerprint.
+        self._settle_submission(execution)
 
+        # ``None`` means "no change information", which falls back to a full recompute.
+        changed: Optional[Set[str]] = None
         if snapshot is not None:
+            definition = self._ensure_definition(snapshot)
+            changed = _diff_workflow(execution.definition, execution.snapshot, definition, snapshot)
+            changed |= self._executor_changes(execution, definition, snapshot)
             execution.snapshot = snapshot
-            execution.definition = snapshot.workflow or self._derive_workflow(snapshot)
+            execution.definition = definition
         if options is not None:
+            if options.use_llm != execution.options.use_llm:
+                # Directive resolution changes for every labelled edge.
+                changed = set(changed or ())
+                changed.update(edge.target.node_id for edge in execution.definition.edges if edge.label)
             execution.options = options
 
         execution.state.status = WorkflowRunStatus.NOT_STARTED
@@ -243,14 +1073,23 @@ class WorkflowEngine:
 
         execution.rebuild_graph()
 
-        dirty = set(node_ids or execution.topological_order)
-        dirty = _collect_downstream(execution, dirty)
+        if node_ids:
+            dirty = set(node_ids) | (changed or set())
+        elif changed is not None:
+            dirty = changed
+        else:
+            dirty = set(execution.topological_order)
+        dirty |= {node_id for node_id, result in execution.results.items() if not result.cacheable}
+        dirty = _collect_downstream(execution, dirty & execution.node_lookup.keys())
 
         previous_results = dict(execution.results)
-        execution.results = {node_id: res for node_id, res in previous_results.items() if node_id not in dirty}
+        execution.results = {
+            node_id: res
+            for node_id, res in previous_results.items()
+            if node_id not in dirty and node_id in execution.node_lookup
+        }
 
-        state_map = {ns.node_id: ns for ns in execution.state.node_states}
-        for node_id, node_state in state_map.items():
+        for node_id, node_state in execution.state_lookup.items():
             if node_id in dirty:
                 node_state.status = WorkflowNodeRunStatus.IDLE
                 node_state.started_at = None
@@ -260,6 +1099,7 @@ class WorkflowEngine:
                 node_state.output_metadata = {}
                 node_state.error_message = None
                 node_state.cached = False
+                self._node_changed(execution, node_state, durable=False)
             else:
                 cached_result = execution.results.get(node_id)
                 if cached_result:
@@ -267,32 +1107,215 @@ class WorkflowEngine:
                     node_state.output_asset = cached_result.asset_url
                     node_state.output_metadata = cached_result.materialize_metadata()
                     node_state.cached = True
+                    self._node_changed(execution, node_state, durable=False)
 
+        self._status_changed(execution)
+        self._checkpoint(execution)
+        self._supersede(execution)
         await self._run_execution(execution, dirty)
         return execution
 
-    def list_executions(
+    def _executor_changes(
+        self,
+        execution: WorkflowExecution,
+        definition: CanvasWorkflowDefinition,
+        snapshot: CreativeBoardSnapshot,
+    ) -> Set[str]:
+        """Nodes whose executor reads board state the node signature does not cover.
+
+        A composite, for one, depends on image bounds, stacking and layer
+        visibility; its ``cache_token`` (the layout key) is compared between
+        the previous and the new snapshot, fed with the previous run's inputs.
+        """
+
+        inbound: Dict[str, List[WorkflowEdge]] = {}
+        for edge in definition.edges:
+            inbound.setdefault(edge.target.node_id, []).append(edge)
+        previous_nodes = {node.id: node for node in execution.definition.nodes}
+        changed: Set[str] = set()
+        for node in definition.nodes:
+            executor = self._executors.get(node.type)
+            previous = previous_nodes.get(node.id)
+            if executor is None or previous is None:
+                continue
+            inputs = _node_inputs(
+                [
+                    (edge, execution.results[edge.source.node_id])
+                    for edge in inbound.get(node.id, [])
+                    if edge.source.node_id in execution.results
+                ]
+            )
+            if executor.cache_token(previous, inputs, execution.snapshot) != executor.cache_token(
+                node, inputs, snapshot
+            ):
+                changed.add(node.id)
+        return changed
+
+    async def cancel_workflow(
+        self,
+        workflow_id: str,
+        *,
+        reason: str = "Cancelled by user",
+    ) -> Optional[WorkflowExecution]:
+        """Stop scheduling new nodes, cancel in-flight ones and wait for the run to settle.
+
+        Cancelling an execution that is not running is a no-op. When the run is owned
+        by another process (shared state backend), the request is forwarded to it and
+        ``None`` is returned without waiting.
+        """
+
+        active = self._active_runs.get(workflow_id)
+        if active is not None:
+            self._request_cancel(active, reason)
+            await active.done.wait()
+            return active.execution
+
+        execution = self._executions.get(workflow_id)
+        if execution is None:
+            summary = await self._state_backend.load_summary(workflow_id) if self._state_backend else None
+            if summary is None:
+                raise WorkflowExecutionError(f"Unknown workflow_id: {workflow_id}")
+            self._send_control(workflow_id, {"type": "cancel", "reason": reason})
+            return None
+        if execution.state.status == WorkflowRunStatus.NOT_STARTED:
+            # Still waiting for a background worker; settle it and make its queued job stale.
+            execution.run_generation += 1
+            self._finish_execution(execution, failed=False, cancel_reason=reason)
+        return execution
+
+    def _request_cancel(self, active: _ActiveRun, reason: str) -> None:
+        if active.cancel_reason is None:
+            active.cancel_reason = reason
+        if active.admission is not None and not active.admission.done():
+            active.admission.cancel()
+        for task in list(active.tasks):
+            task.cancel()
+
+    def _supersede(self, execution: WorkflowExecution) -> None:
+        """Cancel older runs of the same board and owner that are still in flight."""
+
+        if not execution.options.supersede_previous:
+            return
+        for workflow_id, active in list(self._active_runs.items()):
+            other = active.execution
+            if workflow_id == execution.workflow_id:
+                continue
+            if other.board_id != execution.board_id or other.owner_id != execution.owner_id:
+                continue
+            logger.info("Workflow %s supersedes running workflow %s", execution.workflow_id, workflow_id)
+            self._request_cancel(active, f"Superseded by workflow {execution.workflow_id}")
+
+    async def restore(self) -> int:
+        """Replay the journal: re-register executions and resume unfinished ones.
+
+        Nodes that completed before the restart keep their results; nodes that
+        were queued or running are reset and scheduled again.
+        """
+
+        if self._journal is None:
+            return 0
+        # Journals left behind by exited worker processes; live workers' files stay locked and untouched.
+        await asyncio.to_thread(self._journal.adopt_orphans)
+        if self._journal_retention is not None:
+            await asyncio.to_thread(self._journal.prune, datetime.utcnow() - self._journal_retention)
+
+        restored = 0
+        for record in await asyncio.to_thread(self._journal.replay):
+            try:
+                execution = WorkflowExecution.from_record(record)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to restore workflow %s from journal", record.get("workflow_id"))
+                continue
+
+            resume = execution.state.status in {WorkflowRunStatus.NOT_STARTED, WorkflowRunStatus.RUNNING}
+            pending: Set[str] = set()
+            if resume:
+                for node_state in execution.state.node_states:
+                    if node_state.status == WorkflowNodeRunStatus.COMPLETED and node_state.node_id in execution.results:
+                        continue
+                    execution.results.pop(node_state.node_id, None)
+                    node_state.status = WorkflowNodeRunStatus.IDLE
+                    node_state.started_at = None
+                    node_state.finished_at = None
+                    node_state.progress = 0.0
+                    node_state.error_message = None
+                    node_state.cached = False
+                    pending.add(node_state.node_id)
+                execution.refreeze()
+
+            async with self._lock:
+                self._executions.put(execution)
+            self._index_execution(execution)
+            if self._state_backend is not None:
+                self._state_backend.save_record(execution.to_record(), execution.node_versions())
+            if resume:
+                logger.info("Resuming workflow %s with %d pending nodes", execution.workflow_id, len(pending))
+                self._spawn(self._run_execution(execution, pending))
+            restored += 1
+        return restored
+
+    async def list_executions(
         self,
         *,
         board_id: Optional[str] = None,
         owner_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
     ) -> List[WorkflowExecutionListItem]:
-        entries: List[WorkflowExecutionListItem] = []
-        for execution in self._executions.values():
-            if board_id and execution.board_id != board_id:
-                continue
-            if owner_id and execution.owner_id != owner_id:
-                continue
-            entries.append(
-                WorkflowExecutionListItem(
-                    workflow_id=execution.workflow_id,
-                    board_id=execution.board_id,
-                    status=execution.state.status,
-                    created_at=execution.created_at,
-                    updated_at=execution.updated_at,
-                )
+        """Executions newest-first by ``updated_at``, optionally one page at a time.
+
+        ``after`` is the cursor of the last item of the previous page (see
+        ``workflow_index.encode_cursor``); an invalid cursor raises
+        ``WorkflowValidationError``. Local executions come from the in-process
+        index; executions owned by other processes are merged in from the
+        shared state backend when one is configured.
+        """
+
+        try:
+            cursor = decode_cursor(after) if after else None
+        except ValueError as exc:
+            raise WorkflowValidationError(str(exc)) from exc
+        if not self._index_seeded:
+            self._seed_index()
+
+        entries = [
+            WorkflowExecutionListItem(
+                workflow_id=entry.workflow_id,
+                board_id=entry.board_id,
+                status=entry.status,
+                created_at=entry.created_at,
+                updated_at=entry.updated_at,
+            )
+            for entry in self._index.page(board_id=board_id, owner_id=owner_id, limit=limit, after=cursor)
+        ]
+        if self._state_backend is not None:
+            # Executions owned by other processes; local copies are fresher and win. The
+            # backend page covers every process, and a local execution's backend score is
+            # never newer than its indexed one, so the merged head is exact.
+            remote: List[WorkflowExecutionListItem] = []
+            summaries = await self._state_backend.summaries(
+                board_id=board_id,
+                owner_id=owner_id,
+                limit=limit,
+                after=(listing_score(cursor[0]), cursor[1]) if cursor is not None else None,
             )
-        entries.sort(key=lambda item: item.updated_at, reverse=True)
+            for summary in summaries:
+                if summary["workflow_id"] in self._index:
+                    continue
+                remote.append(
+                    WorkflowExecutionListItem(
+                        workflow_id=summary["workflow_id"],
+                        board_id=summary["board_id"],
+                        status=summary["status"],
+                        created_at=summary["created_at"],
+                        updated_at=summary["updated_at"],
+                    )
+                )
+            if remote:
+                entries.extend(remote)
+                entries.sort(key=lambda item: (item.updated_at, item.workflow_id), reverse=True)
+                if limit is not None:
+                    del entries[limit:]
         return entries
 
     def get_execution(self, workflow_id: str) -> WorkflowExecution:
@@ -301,24 +1324,221 @@ class WorkflowEngine:
             raise WorkflowExecutionError(f"Unknown workflow_id: {workflow_id}")
         return execution
 
-    def get_state(self, workflow_id: str) -> WorkflowExecutionState:
-        return self.get_execution(workflow_id).snapshot_state()
+    def get_state(self, workflow_id: str, since_version: Optional[int] = None) -> WorkflowExecutionState:
+        return self.get_execution(workflow_id).snapshot_state(since_version)
+
+    async def fetch_state(self, workflow_id: str, since_version: Optional[int] = None) -> WorkflowExecutionState:
+        """Like ``get_state`` but falls back to the shared backend for executions owned elsewhere."""
+
+        execution = self._executions.get(workflow_id)
+        if execution is not None:
+            return execution.snapshot_state(since_version)
+        state = await self._state_backend.load_state(workflow_id, since_version) if self._state_backend else None
+        if state is None:
+            raise WorkflowExecutionError(f"Unknown workflow_id: {workflow_id}")
+        return WorkflowExecutionState.model_validate(state)
+
+    async def resolve_owner(self, workflow_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Return ``(board_id, owner_id)`` for an execution known locally or to the shared backend."""
+
+        execution = self._executions.get(workflow_id)
+        if execution is not None:
+            return execution.board_id, execution.owner_id
+        summary = await self._state_backend.load_summary(workflow_id) if self._state_backend else None
+        if summary is None:
+            return None
+        return summary["board_id"], summary["owner_id"]
+
+    def subscribe(self, workflow_id: str) -> WorkflowSubscription:
+        """Register a progress stream consumer; call before reading the initial state."""
+
+        if self._state_backend is None:
+            # With a shared backend the execution may live in another process.
+            self.get_execution(workflow_id)
+        return self._events.subscribe(workflow_id)
+
+    def unsubscribe(self, subscription: WorkflowSubscription) -> None:
+        self._events.unsubscribe(subscription)
+
+    async def resolve_directives(
+        self,
+        snapshot: CreativeBoardSnapshot,
+        *,
+        use_llm: bool,
+        workflow_id: Optional[str] = None,
+    ) -> LLMDirectiveBatchResponse:
+        """Resolve every labelled connection of a board in one batch."""
+
+        image_ids = {image.id for image in snapshot.images}
+        labels = [
+            (connection.id, connection.label.text if connection.label else None)
+            for connection in snapshot.connections
+            if connection.source.image_id in image_ids and connection.target.image_id in image_ids
+        ]
+        directives = await self._directives.resolve_labels(labels, use_llm=use_llm)
+        return LLMDirectiveBatchResponse(workflow_id=workflow_id, directives=directives)
+
+    def estimate_workflow(
+        self,
+        board_id: str,
+        snapshot: CreativeBoardSnapshot,
+        *,
+        options: Optional[CreativeBoardWorkflowRunOptions] = None,
+        provider_generations: int = 0,
+    ) -> WorkflowDryRunEstimate:
+        """Predict what running ``snapshot`` would cost, without evaluating or registering anything.
+
+        A node counts as cached only if every upstream is cached too and its
+        key is already in the shared result cache (looked up with ``peek``, so
+        cache statistics and recency are untouched); everything else is
+        assumed to run. ``provider_calls`` adds up executor ``remote_calls``,
+        the directive batch and ``provider_generations``: generation tasks the
+        caller will submit from the finished run's output prompt (one for a
+        board generation, cached or not; none for a plain run). Latencies are the p50 / p95 of past computed
+        evaluations of each node type; the estimate is the longer of the
+        critical path and the total work spread over the concurrency limit.
+        """
+
+        options = options or CreativeBoardWorkflowRunOptions()
+        state = WorkflowExecutionState(workflow_id="dry-run", board_id=board_id)
+        execution = WorkflowExecution(
+            workflow_id=state.workflow_id,
+            board_id=board_id,
+            snapshot=snapshot,
+            definition=self._ensure_definition(snapshot),
+            options=options,
+            state=state,
+        )
+        execution.rebuild_graph()
+        scope = _demand_closure(execution)
+
+        known: Dict[str, OperationResult] = {}
+        nodes_to_run: List[str] = []
+        unestimated: Set[WorkflowNodeType] = set()
+        provider_calls = 0
+        total = [0.0, 0.0]
+        # node_id -> (p50 finish, p95 finish, nodes on the path, predecessor on the critical path)
+        paths: Dict[str, Tuple[float, float, int, Optional[str]]] = {}
+        for node_id in execution.topological_order:
+            if scope is not None and node_id not in scope:
+                continue
+            node = execution.node_lookup[node_id]
+            inbound = execution.edges_by_target.get(node_id, [])
+            cached: Optional[OperationResult] = None
+            if options.greedy_cache and all(edge.source.node_id in known for edge in inbound):
+                upstream_items = [(edge, known[edge.source.node_id]) for edge in inbound]
+                cached = self._result_cache.peek(self._node_cache_key(execution, node, upstream_items))
+            if cached is not None:
+                known[node_id] = cached
+                cost = (0.0, 0.0)
+            else:
+                nodes_to_run.append(node_id)
+                timing = self._metrics.estimate(node.type.value)
+                if timing is None:
+                    unestimated.add(node.type)
+                cost = timing or (0.0, 0.0)
+                executor = self._executors.get(node.type)
+                if executor is not None:
+                    provider_calls += executor.remote_calls
+                total[0] += cost[0]
+                total[1] += cost[1]
+            previous = max(
+                (edge.source.node_id for edge in inbound),
+                key=lambda upstream_id: paths[upstream_id][:3],
+                default=None,
+            )
+            base = paths[previous] if previous is not None else (0.0, 0.0, 0, None)
+            paths[node_id] = (base[0] + cost[0], base[1] + cost[1], base[2] + 1, previous)
+
+        if options.use_llm and self._directives.unresolved(
+            (
+                edge.label.strip()
+                for edge in execution.definition.edges
+                if edge.label and (scope is None or edge.target.node_id in scope)
+            ),
+            use_llm=True,
+        ):
+            # All labels of a run are resolved in one batch before the first node starts.
+            provider_calls += 1
+        provider_calls += provider_generations
+
+        critical_path: List[str] = []
+        tail = max(paths, key=lambda node_id: paths[node_id][:3], default=None)
+        while tail is not None:
+            critical_path.append(tail)
+            tail = paths[tail][3]
+        critical_path.reverse()
+        end = paths[critical_path[-1]] if critical_path else (0.0, 0.0, 0, None)
+        limit = min(options.max_concurrency or self._execution_concurrency, self._max_concurrency)
+        return WorkflowDryRunEstimate(
+            board_id=board_id,
+            nodes_to_run=nodes_to_run,
+            cached_node_ids=list(known),
+            provider_calls=provider_calls,
+            critical_path=critical_path,
+            estimated_latency_ms=max(end[0], total[0] / limit),
+            estimated_latency_p95_ms=max(end[1], total[1] / limit),
+            unestimated_node_types=sorted(unestimated, key=lambda node_type: node_type.value),
+        )
+
+    async def render_preview(self, snapshot: CreativeBoardSnapshot, *, max_edge: int = DEFAULT_MAX_EDGE) -> str:
+        """Flatten the board into a PNG on the executor process pool; return the file path."""
+
+        if not COMPOSITOR_AVAILABLE:
+            raise WorkflowExecutionError("Local preview rendering requires numpy and Pillow")
+        layout = board_layout(snapshot, max_edge=max_edge)
+        key = layout_key(layout)
+        if not self._previews.exists(key):
+            loop = asyncio.get_running_loop()
+            rendered = await loop.run_in_executor(
+                self._executors.pool(), render_layout, layout, self._previews.directory
+            )
+            # Partial renders (images that failed to load) are stored under their own key.
+            key = rendered["key"]
+            await asyncio.to_thread(self._previews.prune)
+        return self._previews.path(key)
+
+    def preview_path(self, key: str) -> Optional[str]:
+        """Return the stored PNG for a preview key, if it still exists."""
+
+        return self._previews.path(key) if self._previews.exists(key) else None
+
+    def metrics(self, node_type: Optional[WorkflowNodeType] = None) -> Dict[str, Any]:
+        """Return node timing histograms by node type plus execution wall times by status."""
+
+        return self._metrics.snapshot(node_type.value if node_type else None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return engine-level counters for observability."""
+
+        return {
+            "result_cache": self._result_cache.stats(),
+            "registry": self._executions.stats(),
+            "index": self._index.stats(),
+            "streams": self._events.stats(),
+            "admission": self._admission.stats(),
+            "plans": _plan_cache.stats(),
+            "directives": self._directives.stats(),
+            "executors": self._executors.stats(),
+            "submissions": {"inflight": len(self._submissions), "coalesced": self._coalesced},
+        }
 
     def attach_task(self, workflow_id: str, task_id: str) -> None:
         execution = self._executions.get(workflow_id)
         if not execution:
             return
         execution.task_id = task_id
-        execution.updated_at = datetime.utcnow()
+        self._touch(execution)
+        self._checkpoint(execution)
 
-    def update_output_asset(self, workflow_id: str, asset_url: Optional[str]) -> None:
-        execution = self._executions.get(workflow_id)
+    async def update_output_asset(self, workflow_id: str, asset_url: Optional[str]) -> None:
+        execution = await self._load_execution(workflow_id)
         if not execution:
             return
         output_ids = execution.definition.output_ids or []
         timestamp = datetime.utcnow()
         for node_id in output_ids:
-            node_state = next((ns for ns in execution.state.node_states if ns.node_id == node_id), None)
+            node_state = execution.state_lookup.get(node_id)
             if not node_state:
                 continue
             node_state.output_asset = asset_url
@@ -327,7 +1547,167 @@ class WorkflowEngine:
                 metadata["final_asset_url"] = asset_url
             node_state.output_metadata = metadata
             node_state.finished_at = node_state.finished_at or timestamp
-        execution.updated_at = timestamp
+            self._node_changed(execution, node_state, durable=False)
+        self._touch(execution, timestamp)
+        self._checkpoint(execution)
+
+    def _touch(self, execution: WorkflowExecution, timestamp: Optional[datetime] = None) -> None:
+        execution.updated_at = timestamp or datetime.utcnow()
+        self._index_execution(execution)
+
+    def _index_execution(self, execution: WorkflowExecution) -> None:
+        self._index.upsert(
+            IndexedExecution(
+                workflow_id=execution.workflow_id,
+                board_id=execution.board_id,
+                owner_id=execution.owner_id,
+                status=execution.state.status.value,
+                created_at=execution.created_at,
+                updated_at=execution.updated_at,
+            )
+        )
+
+    def _seed_index(self) -> None:
+        """Index executions that predate this engine instance (pre-filled registry, spill file)."""
+
+        self._index_seeded = True
+        for execution in self._executions.resident():
+            if execution.workflow_id not in self._index:
+                self._index_execution(execution)
+        for summary in self._executions.spilled_summaries():
+            if summary.workflow_id in self._index:
+                continue
+            self._index.upsert(
+                IndexedExecution(
+                    workflow_id=summary.workflow_id,
+                    board_id=summary.board_id,
+                    owner_id=summary.owner_id,
+                    status=summary.status,
+                    created_at=datetime.fromisoformat(summary.created_at),
+                    updated_at=datetime.fromisoformat(summary.updated_at),
+                )
+            )
+
+    def _status_changed(self, execution: WorkflowExecution) -> None:
+        execution.commit_state()
+        self._index_execution(execution)
+        if self._state_backend is not None:
+            self._state_backend.update_status(
+                execution.workflow_id,
+                execution.state.model_dump(mode="json", exclude={"node_states"}),
+                board_id=execution.board_id,
+                owner_id=execution.owner_id,
+            )
+        elif not self._events.has_subscribers(execution.workflow_id):
+            return
+        state = execution.state
+        self._publish(
+            execution.workflow_id,
+            "status",
+            {
+                "type": "status",
+                "status": state.status.value,
+                "current_node_id": state.current_node_id,
+                "error_message": state.error_message,
+                "started_at": state.started_at.isoformat() if state.started_at else None,
+                "finished_at": state.finished_at.isoformat() if state.finished_at else None,
+                "updated_at": state.updated_at.isoformat() if state.updated_at else None,
+            },
+        )
+
+    def _publish(self, workflow_id: str, key: str, event: Dict[str, Any]) -> None:
+        if self._state_backend is not None:
+            # Delivered back to every process (this one included) via _on_backend_event.
+            self._state_backend.publish(workflow_id, key, event)
+        else:
+            self._events.publish(workflow_id, key, event)
+
+    def _send_control(self, workflow_id: str, command: Dict[str, Any]) -> None:
+        if self._state_backend is not None:
+            self._state_backend.publish(workflow_id, CONTROL_KEY, {**command, "origin": self._instance_id})
+
+    def _on_backend_event(self, workflow_id: str, key: str, event: Dict[str, Any]) -> None:
+        if key != CONTROL_KEY:
+            self._events.publish(workflow_id, key, event)
+            return
+        if event.get("origin") == self._instance_id:
+            return
+        if event.get("type") == "cancel":
+            active = self._active_runs.get(workflow_id)
+            if active is not None:
+                self._request_cancel(active, str(event.get("reason") or "Cancelled by user"))
+        elif event.get("type") == "adopted" and workflow_id not in self._active_runs:
+            # Another process took ownership; drop our now-stale copy.
+            self._executions.discard(workflow_id)
+
+    async def _load_execution(self, workflow_id: str) -> Optional[WorkflowExecution]:
+        """Return the local execution, adopting it from the shared backend if another process owns it."""
+
+        execution = self._executions.get(workflow_id)
+        if execution is not None or self._state_backend is None:
+            return execution
+        record = await self._state_backend.load_record(workflow_id)
+        if record is None:
+            return None
+        execution = WorkflowExecution.from_record(record)
+        if execution.state.status in {WorkflowRunStatus.NOT_STARTED, WorkflowRunStatus.RUNNING}:
+            raise WorkflowExecutionError(f"Workflow {workflow_id} is running in another process")
+        async with self._lock:
+            self._executions.put(execution)
+        self._index_execution(execution)
+        self._send_control(workflow_id, {"type": "adopted"})
+        return execution
+
+    def _spawn(self, coroutine: Any) -> asyncio.Task:
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def _checkpoint(self, execution: WorkflowExecution) -> None:
+        if self._journal is None and self._state_backend is None:
+            return
+        record = execution.to_record()
+        if self._state_backend is not None:
+            self._state_backend.save_record(record, execution.node_versions())
+        if self._journal is None:
+            return
+        try:
+            self._journal.checkpoint(record)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to checkpoint workflow %s", execution.workflow_id)
+
+    def _node_changed(
+        self,
+        execution: WorkflowExecution,
+        node_state: WorkflowNodeState,
+        result: Optional[OperationResult] = None,
+        *,
+        durable: bool = True,
+    ) -> None:
+        """Fan a node transition out to stream subscribers and, if ``durable``, the journal."""
+
+        execution.commit_node(node_state)
+        if self._state_backend is not None:
+            node_payload = node_state.model_dump(mode="json")
+            self._state_backend.update_node(execution.workflow_id, node_payload, execution.state.version)
+            self._publish(execution.workflow_id, f"node:{node_state.node_id}", {"type": "node", "node": node_payload})
+        elif self._events.has_subscribers(execution.workflow_id):
+            self._events.publish(
+                execution.workflow_id,
+                f"node:{node_state.node_id}",
+                {"type": "node", "node": node_state.model_dump(mode="json")},
+            )
+        if self._journal is None or not durable:
+            return
+        try:
+            self._journal.append_node(
+                execution.workflow_id,
+                node_state.model_dump(mode="json"),
+                result.to_record() if result is not None else None,
+            )
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to journal node %s of workflow %s", node_state.node_id, execution.workflow_id)
 
     def _ensure_definition(self, snapshot: CreativeBoardSnapshot) -> CanvasWorkflowDefinition:
         if snapshot.workflow and snapshot.workflow.nodes:
@@ -338,6 +1718,7 @@ class WorkflowEngine:
         nodes: List[WorkflowNodeDefinition] = []
         edges: List[WorkflowEdge] = []
         image_to_node: Dict[str, str] = {}
+        node_by_id: Dict[str, WorkflowNodeDefinition] = {}
 
         for image in snapshot.images:
             node_id = f"image-{image.id}"
@@ -356,6 +1737,7 @@ class WorkflowEngine:
                 updated_at=image.updated_at,
             )
             nodes.append(node)
+            node_by_id.setdefault(node_id, node)
             image_to_node[image.id] = node_id
 
         for connection in snapshot.connections:
@@ -376,7 +1758,7 @@ class WorkflowEngine:
             )
             edges.append(edge)
             if label:
-                target_node = next((item for item in nodes if item.id == target_node_id), None)
+                target_node = node_by_id.get(target_node_id)
                 if target_node:
                     prompts = target_node.config.parameters.setdefault("prompts", [])
                     prompts.append(label)
@@ -426,89 +1808,487 @@ class WorkflowEngine:
         execution: WorkflowExecution,
         dirty_nodes: Optional[Set[str]],
     ) -> None:
-        state_map = {ns.node_id: ns for ns in execution.state.node_states}
+        """Wait for an admission slot, evaluate the DAG and record the outcome."""
+
+        execution.run_generation += 1
+        active = _ActiveRun(execution=execution, scope=_demand_closure(execution))
+        self._active_runs[execution.workflow_id] = active
+        admitted = False
+        failed = False
+        interrupted = False
+        cost = len(dirty_nodes) if dirty_nodes is not None else len(execution.topological_order)
+        if active.scope is not None:
+            cost = len(active.scope & dirty_nodes) if dirty_nodes is not None else len(active.scope)
+        # The deadline covers the whole run, admission wait included: that is what callers wait for.
+        deadline_seconds = execution.options.deadline_seconds or self._workflow_deadline
+        execution.deadline = active.requested_at + deadline_seconds if deadline_seconds else None
+        try:
+            try:
+                active.admission = asyncio.ensure_future(
+                    self._admission.acquire(
+                        owner_id=execution.owner_id,
+                        priority=execution.options.priority,
+                        cost=cost,
+                    )
+                )
+                # On timeout wait_for cancels the request, which withdraws it from the queue.
+                await asyncio.wait_for(active.admission, timeout=execution.remaining_budget())
+                admitted = True
+                active.admitted_at = time.monotonic()
+                failed = await self._evaluate_graph(execution, active, dirty_nodes)
+            except asyncio.TimeoutError:
+                active.deadline_reason = f"Workflow deadline of {deadline_seconds:g}s exceeded while queued"
+            except asyncio.CancelledError:
+                # Either cancel_workflow withdrew the run from the admission queue, or
+                # the awaiting caller went away; the latter is finished as a cancellation.
+                if admitted or active.cancel_reason is None:
+                    active.cancel_reason = active.cancel_reason or _INTERRUPTED_REASON
+                    interrupted = True
+            finally:
+                if admitted:
+                    self._admission.release()
+
+            self._finish_execution(execution, failed=failed, cancel_reason=active.cancel_reason, active=active)
+        finally:
+            self._active_runs.pop(execution.workflow_id, None)
+            self._settle_submission(execution)
+            active.done.set()
+
+        if interrupted:
+            raise asyncio.CancelledError()
+
+    async def _evaluate_graph(
+        self,
+        execution: WorkflowExecution,
+        active: _ActiveRun,
+        dirty_nodes: Optional[Set[str]],
+    ) -> bool:
+        """Dispatch every node as soon as its upstreams complete; return whether a node failed."""
+
+        state_map = execution.state_lookup
         execution.state.status = WorkflowRunStatus.RUNNING
         execution.state.updated_at = datetime.utcnow()
+        self._status_changed(execution)
+        await self._prepare_directives(execution, active.scope)
+
+        plan = execution.plan
+        order_index = plan.order_index
+        pending_inputs = dict(plan.in_degree)
+        # Nodes outside the demand closure are never dispatched and keep their state. The closure
+        # is upstream-closed, so in-scope nodes still see every one of their inputs complete.
+        scope = active.scope
+        # Ready nodes are dispatched in topological order so runs stay deterministic.
+        ready: List[Tuple[int, str]] = [
+            (order_index[node_id], node_id) for node_id in plan.entry_ids if scope is None or node_id in scope
+        ]
+        heapq.heapify(ready)
+        # Monotonic time at which each node's inputs became available, for queue-wait accounting.
+        started = time.monotonic()
+        ready_at: Dict[str, float] = {}
+        running = active.tasks
+        limit = execution.options.max_concurrency or self._execution_concurrency
+        # In "continue" mode a failure only prunes its downstream closure; independent branches keep running.
+        fail_fast = execution.options.failure_mode != "continue"
+        failed = False
+
+        def release(node_id: str) -> None:
+            for edge in execution.edges_by_source.get(node_id, []):
+                target_id = edge.target.node_id
+                pending_inputs[target_id] -= 1
+                if pending_inputs[target_id] == 0 and (scope is None or target_id in scope):
+                    ready_at[target_id] = time.monotonic()
+                    heapq.heappush(ready, (order_index[target_id], target_id))
+
+        try:
+            while ready or running:
+                while (
+                    ready
+                    and not (failed and fail_fast)
+                    and active.cancel_reason is None
+                    and active.deadline_reason is None
+                    and len(running) < limit
+                ):
+                    _, node_id = heapq.heappop(ready)
+                    node_state = state_map[node_id]
+
+                    is_dirty = dirty_nodes is None or node_id in dirty_nodes
+                    cached_result = execution.results.get(node_id) if not is_dirty else None
+                    if cached_result:
+                        node_state.status = WorkflowNodeRunStatus.COMPLETED
+                        node_state.cached = True
+                        node_state.output_asset = cached_result.asset_url
+                        node_state.output_metadata = cached_result.materialize_metadata()
+                        node_state.finished_at = node_state.finished_at or datetime.utcnow()
+                        self._record_timing(
+                            execution,
+                            node_state,
+                            queue_wait=time.monotonic() - ready_at.get(node_id, started),
+                            duration=0.0,
+                            cache="reused",
+                            result=cached_result,
+                        )
+                        self._node_changed(execution, node_state, durable=False)
+                        active.settled.append(node_id)
+                        release(node_id)
+                        continue
+
+                    node_state.status = WorkflowNodeRunStatus.QUEUED
+                    node_state.error_message = None
+                    self._node_changed(execution, node_state, durable=False)
+                    task = asyncio.create_task(
+                        self._execute_node(execution, node_id, node_state, ready_at.get(node_id, started))
+                    )
+                    running[task] = node_id
 
-        for index, node_id in enumerate(execution.topological_order):
-            node = execution.node_lookup[node_id]
-            node_state = state_map[node_id]
+                if not running:
+                    break
 
-            is_dirty = dirty_nodes is None or node_id in dirty_nodes
-            cached_result = execution.results.get(node_id) if not is_dirty else None
-            if cached_result:
-                node_state.status = WorkflowNodeRunStatus.COMPLETED
-                node_state.cached = True
-                node_state.output_asset = cached_result.asset_url
-                node_state.output_metadata = cached_result.materialize_metadata()
-                node_state.finished_at = node_state.finished_at or datetime.utcnow()
+                done, _ = await asyncio.wait(
+                    running.keys(),
+                    timeout=execution.remaining_budget(),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Out of time: the finally below cancels what is still running.
+                    deadline_seconds = execution.options.deadline_seconds or self._workflow_deadline
+                    active.deadline_reason = f"Workflow deadline of {deadline_seconds:g}s exceeded"
+                    break
+                for task in sorted(done, key=lambda item: order_index[running[item]]):
+                    node_id = running.pop(task)
+                    if task.cancelled():
+                        # Cancelled nodes are swept afterwards together with never-started ones.
+                        continue
+                    active.settled.append(node_id)
+                    if task.result():
+                        release(node_id)
+                    else:
+                        failed = True
+                        if not fail_fast:
+                            self._skip_downstream(execution, node_id, scope)
+        finally:
+            if running:
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+        return failed
+
+    def _skip_downstream(
+        self,
+        execution: WorkflowExecution,
+        failed_node_id: str,
+        scope: Optional[Set[str]] = None,
+    ) -> None:
+        """Mark every node reachable from a failed node (within ``scope``) as skipped; none can become ready."""
+
+        reason = f"Upstream node {failed_node_id} failed"
+        stack = [edge.target.node_id for edge in execution.edges_by_source.get(failed_node_id, [])]
+        seen: Set[str] = set()
+        while stack:
+            node_id = stack.pop()
+            if node_id in seen or (scope is not None and node_id not in scope):
                 continue
-
-            prerequisites = [edge.source.node_id for edge in execution.edges_by_target.get(node_id, [])]
-            if any(state_map[dep].status != WorkflowNodeRunStatus.COMPLETED for dep in prerequisites):
+            seen.add(node_id)
+            node_state = execution.state_lookup[node_id]
+            if node_state.status != WorkflowNodeRunStatus.SKIPPED:
                 node_state.status = WorkflowNodeRunStatus.SKIPPED
-                node_state.error_message = "Upstream node not completed"
-                execution.state.status = WorkflowRunStatus.FAILED
-                break
+                node_state.error_message = reason
+                node_state.finished_at = datetime.utcnow()
+                self._node_changed(execution, node_state, durable=False)
+            stack.extend(edge.target.node_id for edge in execution.edges_by_source.get(node_id, []))
+
+    def _finish_execution(
+        self,
+        execution: WorkflowExecution,
+        *,
+        failed: bool,
+        cancel_reason: Optional[str],
+        active: Optional[_ActiveRun] = None,
+    ) -> None:
+        deadline_reason = active.deadline_reason if active is not None else None
+        interrupt_reason = cancel_reason or deadline_reason
+        if failed or interrupt_reason:
+            scope = active.scope if active is not None else None
+            # Mark nodes that never got to run (or were cut short) as skipped
+            for node_state in execution.state.node_states:
+                if scope is not None and node_state.node_id not in scope:
+                    # Pruned by focus: this run never meant to touch it.
+                    continue
+                if node_state.status not in {
+                    WorkflowNodeRunStatus.COMPLETED,
+                    WorkflowNodeRunStatus.FAILED,
+                    WorkflowNodeRunStatus.SKIPPED,
+                }:
+                    if interrupt_reason and node_state.status in {
+                        WorkflowNodeRunStatus.QUEUED,
+                        WorkflowNodeRunStatus.RUNNING,
+                    }:
+                        node_state.error_message = interrupt_reason
+                    node_state.status = WorkflowNodeRunStatus.SKIPPED
+                    node_state.finished_at = datetime.utcnow()
+                    self._node_changed(execution, node_state, durable=False)
+
+        execution.state.current_node_id = None
+        execution.state.finished_at = datetime.utcnow()
+        execution.state.updated_at = execution.state.finished_at
+
+        if cancel_reason:
+            execution.state.status = WorkflowRunStatus.CANCELLED
+            execution.state.error_message = cancel_reason
+        elif execution.state.status not in {WorkflowRunStatus.FAILED, WorkflowRunStatus.PARTIAL}:
+            if deadline_reason:
+                # Bounded latency: report what finished in time instead of waiting for the rest.
+                finished_any = any(ns.status == WorkflowNodeRunStatus.COMPLETED for ns in execution.state.node_states)
+                execution.state.status = WorkflowRunStatus.PARTIAL if finished_any else WorkflowRunStatus.FAILED
+                execution.state.error_message = deadline_reason
+            elif any(ns.status == WorkflowNodeRunStatus.FAILED for ns in execution.state.node_states):
+                # Work salvaged from independent branches makes a "continue" run partial rather than failed.
+                salvaged = execution.options.failure_mode == "continue" and any(
+                    ns.status == WorkflowNodeRunStatus.COMPLETED for ns in execution.state.node_states
+                )
+                execution.state.status = WorkflowRunStatus.PARTIAL if salvaged else WorkflowRunStatus.FAILED
+            elif any(ns.status == WorkflowNodeRunStatus.SKIPPED for ns in execution.state.node_states):
+                execution.state.status = WorkflowRunStatus.PARTIAL
+            else:
+                execution.state.status = WorkflowRunStatus.COMPLETED
+
+        if active is not None:
+            execution.state.timing = self._timing_breakdown(execution, active)
+            self._metrics.observe_execution(execution.state.status.value, execution.state.timing.wall_ms)
+
+        execution.final_prompt = self._extract_final_prompt(execution, active.scope if active is not None else None)
+        self._status_changed(execution)
+        self._checkpoint(execution)
+        self._settle_submission(execution)
+        # The run is over, so the execution becomes eligible for eviction.
+        self._executions.refresh(execution.workflow_id)
+
+    def _settle_submission(self, execution: WorkflowExecution) -> None:
+        """Stop coalescing onto ``execution`` and wake callers waiting on it (idempotent)."""
+
+        key = self._submission_keys.pop(execution.workflow_id, None)
+        if key is None:
+            return
+        submission = self._submissions.get(key)
+        if submission is not None and submission.execution is execution:
+            del self._submissions[key]
+            submission.settled.set()
+            if submission.on_finished is not None:
+                self._spawn(self._report_finished(submission.on_finished, execution))
+
+    async def _report_finished(
+        self,
+        on_finished: Callable[[WorkflowExecution], Awaitable[None]],
+        execution: WorkflowExecution,
+    ) -> None:
+        try:
+            await on_finished(execution)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Finish callback of workflow %s failed", execution.workflow_id)
 
+    async def _execute_node(
+        self,
+        execution: WorkflowExecution,
+        node_id: str,
+        node_state: WorkflowNodeState,
+        ready_at: float,
+    ) -> bool:
+        """Evaluate a single node under the engine-wide slot limit; return ``True`` on success."""
+
+        node = execution.node_lookup[node_id]
+        upstream_items: List[Tuple[WorkflowEdge, OperationResult]] = []
+        for edge in execution.edges_by_target.get(node_id, []):
+            upstream_result = execution.results.get(edge.source.node_id)
+            if upstream_result:
+                upstream_items.append((edge, upstream_result))
+
+        cache_key = self._node_cache_key(execution, node, upstream_items)
+        if execution.options.greedy_cache:
+            shared_result = self._result_cache.get(cache_key)
+            if shared_result is not None:
+                execution.results[node_id] = shared_result
+                node_state.output_asset = shared_result.asset_url
+                node_state.output_metadata = shared_result.materialize_metadata()
+                node_state.status = WorkflowNodeRunStatus.COMPLETED
+                node_state.cached = True
+                node_state.progress = 1.0
+                node_state.finished_at = datetime.utcnow()
+                self._touch(execution)
+                self._record_timing(
+                    execution,
+                    node_state,
+                    queue_wait=time.monotonic() - ready_at,
+                    duration=0.0,
+                    cache="shared",
+                    result=shared_result,
+                )
+                self._node_changed(execution, node_state, shared_result)
+                return True
+
+        async with self._node_slots:
+            slot_at = time.monotonic()
             node_state.status = WorkflowNodeRunStatus.RUNNING
             node_state.started_at = datetime.utcnow()
             node_state.cached = False
+            node_state.progress = 0.0
             execution.state.current_node_id = node_id
             execution.state.updated_at = datetime.utcnow()
-
+            self._node_changed(execution, node_state)
+
+            # The workflow deadline itself is enforced by _evaluate_graph; executors see whichever
+            # bound comes first so they can cap their own I/O by it.
+            timeout = _node_timeout(node, self._node_timeout)
+            deadline = execution.deadline
+            if timeout is not None:
+                deadline = slot_at + timeout if deadline is None else min(deadline, slot_at + timeout)
             try:
-                upstream_items: List[Tuple[WorkflowEdge, OperationResult]] = []
-                for edge in execution.edges_by_target.get(node_id, []):
-                    upstream_result = execution.results.get(edge.source.node_id)
-                    if upstream_result:
-                        upstream_items.append((edge, upstream_result))
-                result = await self._evaluate_node(execution, node, upstream_items)
-                execution.results[node_id] = result
-                node_state.output_asset = result.asset_url
-                node_state.output_metadata = result.materialize_metadata()
-                node_state.status = WorkflowNodeRunStatus.COMPLETED
-                node_state.finished_at = datetime.utcnow()
-                execution.updated_at = datetime.utcnow()
+                result = await _bounded(
+                    self._evaluate_node(execution, node, upstream_items, deadline),
+                    timeout,
+                    f"Node {node_id}",
+                )
             except Exception as exc:  # pylint: disable=broad-except
                 logger.exception("Workflow node %s failed", node_id, exc_info=exc)
                 node_state.status = WorkflowNodeRunStatus.FAILED
                 node_state.error_message = str(exc)
                 node_state.finished_at = datetime.utcnow()
-                execution.state.status = WorkflowRunStatus.FAILED
-                execution.state.error_message = str(exc)
+                if execution.options.failure_mode != "continue":
+                    execution.state.status = WorkflowRunStatus.FAILED
+                execution.state.error_message = execution.state.error_message or str(exc)
                 execution.state.current_node_id = node_id
                 execution.state.updated_at = datetime.utcnow()
-                # Mark remaining nodes as skipped
-                for skipped_id in execution.topological_order[index + 1 :]:
-                    skipped_state = state_map[skipped_id]
-                    if skipped_state.status not in {
-                        WorkflowNodeRunStatus.COMPLETED,
-                        WorkflowNodeRunStatus.FAILED,
-                    }:
-                        skipped_state.status = WorkflowNodeRunStatus.SKIPPED
-                        skipped_state.finished_at = datetime.utcnow()
-                break
+                self._record_timing(
+                    execution,
+                    node_state,
+                    queue_wait=slot_at - ready_at,
+                    duration=time.monotonic() - slot_at,
+                    cache="computed",
+                    result=None,
+                )
+                self._node_changed(execution, node_state)
+                return False
+            finished = time.monotonic()
+
+        if result.cacheable:
+            self._result_cache.put(cache_key, result, result.approximate_size())
+        execution.results[node_id] = result
+        node_state.output_asset = result.asset_url
+        node_state.output_metadata = result.materialize_metadata()
+        node_state.status = WorkflowNodeRunStatus.COMPLETED
+        node_state.progress = 1.0
+        node_state.finished_at = datetime.utcnow()
+        self._touch(execution)
+        self._record_timing(
+            execution,
+            node_state,
+            queue_wait=slot_at - ready_at,
+            duration=finished - slot_at,
+            cache="computed",
+            result=result,
+        )
+        self._node_changed(execution, node_state, result)
+        return True
 
-        execution.state.current_node_id = None
-        execution.state.finished_at = datetime.utcnow()
-        execution.state.updated_at = execution.state.finished_at
+    def _record_timing(
+        self,
+        execution: WorkflowExecution,
+        node_state: WorkflowNodeState,
+        *,
+        queue_wait: float,
+        duration: float,
+        cache: str,
+        result: Optional[OperationResult],
+    ) -> None:
+        """Attach monotonic timings to the node state and feed the engine histograms."""
 
-        if execution.state.status not in {WorkflowRunStatus.FAILED, WorkflowRunStatus.PARTIAL}:
-            if any(ns.status == WorkflowNodeRunStatus.FAILED for ns in execution.state.node_states):
-                execution.state.status = WorkflowRunStatus.FAILED
-            elif any(ns.status == WorkflowNodeRunStatus.SKIPPED for ns in execution.state.node_states):
-                execution.state.status = WorkflowRunStatus.PARTIAL
-            else:
-                execution.state.status = WorkflowRunStatus.COMPLETED
+        timing = WorkflowNodeTiming(
+            queue_wait_ms=queue_wait * 1000.0,
+            duration_ms=duration * 1000.0,
+            cache=cache,
+            metadata_bytes=result.approximate_size() if result is not None else 0,
+        )
+        node_state.timing = timing
+        self._metrics.observe_node(
+            execution.node_lookup[node_state.node_id].type.value,
+            duration_ms=timing.duration_ms,
+            queue_wait_ms=timing.queue_wait_ms,
+            metadata_bytes=timing.metadata_bytes,
+            cache=cache,
+            failed=result is None,
+        )
 
-        execution.final_prompt = self._extract_final_prompt(execution)
+    def _timing_breakdown(self, execution: WorkflowExecution, active: _ActiveRun) -> WorkflowTimingBreakdown:
+        by_type: Dict[WorkflowNodeType, WorkflowNodeTypeTiming] = {}
+        for node_id in active.settled:
+            node_state = execution.state_lookup.get(node_id)
+            node = execution.node_lookup.get(node_id)
+            if node_state is None or node is None or node_state.timing is None:
+                continue
+            timing = node_state.timing
+            entry = by_type.get(node.type)
+            if entry is None:
+                entry = by_type[node.type] = WorkflowNodeTypeTiming(node_type=node.type)
+            entry.count += 1
+            if timing.cache != "computed":
+                entry.cached += 1
+            if node_state.status == WorkflowNodeRunStatus.FAILED:
+                entry.failed += 1
+            entry.duration_ms += timing.duration_ms
+            entry.max_duration_ms = max(entry.max_duration_ms, timing.duration_ms)
+            entry.queue_wait_ms += timing.queue_wait_ms
+            entry.metadata_bytes += timing.metadata_bytes
+        finished = time.monotonic()
+        admitted = active.admitted_at if active.admitted_at is not None else finished
+        return WorkflowTimingBreakdown(
+            wall_ms=(finished - admitted) * 1000.0,
+            admission_wait_ms=(admitted - active.requested_at) * 1000.0,
+            # Slowest node types first: that is what the breakdown is read for.
+            by_type=sorted(by_type.values(), key=lambda item: item.duration_ms, reverse=True),
+        )
+
+    def _report_progress(self, execution: WorkflowExecution, node_id: str, fraction: float) -> None:
+        node_state = execution.state_lookup.get(node_id)
+        if node_state is None or node_state.status != WorkflowNodeRunStatus.RUNNING:
+            return
+        # Percent granularity is plenty for a progress bar and keeps the event stream quiet.
+        if fraction < 1.0 and fraction - node_state.progress < 0.01:
+            return
+        node_state.progress = fraction
+        self._node_changed(execution, node_state, durable=False)
+
+    def _node_cache_key(
+        self,
+        execution: WorkflowExecution,
+        node: WorkflowNodeDefinition,
+        upstream_items: Sequence[Tuple[WorkflowEdge, OperationResult]],
+    ) -> str:
+        """Hash everything ``_evaluate_node`` reads so equal keys imply equal results."""
+
+        payload: Dict[str, Any] = {
+            "node": node.model_dump(mode="json", include={"id", "type", "title", "config", "metadata"}),
+            "inputs": [[edge.label, upstream.fingerprint()] for edge, upstream in upstream_items],
+        }
+        if any(edge.label for edge, _ in upstream_items):
+            # Directive resolution on labelled edges depends on the LLM toggle.
+            payload["use_llm"] = execution.options.use_llm
+        if node.type == WorkflowNodeType.INPUT_IMAGE:
+            image_id = node.metadata.get("image_id") if node.metadata else None
+            image = execution.image_lookup.get(image_id) if image_id else None
+            payload["image"] = (
+                image.model_dump(mode="json", include={"url", "description", "source"}) if image else None
+            )
+        executor = self._executors.get(node.type)
+        if executor is not None:
+            token = executor.cache_token(node, _node_inputs(upstream_items), execution.snapshot)
+            if token is not None:
+                payload["executor"] = token
+        return hashlib.sha256(_canonical_json(payload).encode("utf-8")).hexdigest()
 
     async def _evaluate_node(
         self,
         execution: WorkflowExecution,
         node: WorkflowNodeDefinition,
         upstream_items: Sequence[Tuple[WorkflowEdge, OperationResult]],
+        deadline: Optional[float] = None,
     ) -> OperationResult:
         prompts: List[str] = []
         assets: List[str] = []
@@ -519,7 +2299,7 @@ class WorkflowEngine:
             if upstream.metadata.get("prompt"):
                 prompts.append(str(upstream.metadata["prompt"]))
             if edge.label:
-                resolution = self._resolve_directive(execution, edge, upstream)
+                resolution = await self._resolve_directive(execution, edge)
                 prompts.append(resolution.resolved_prompt)
             if upstream.asset_url:
                 assets.append(upstream.asset_url)
@@ -534,7 +2314,7 @@ class WorkflowEngine:
 
         if node.type == WorkflowNodeType.INPUT_IMAGE:
             image_id = node.metadata.get("image_id") if node.metadata else None
-            image = next((item for item in execution.snapshot.images if item.id == image_id), None)
+            image = execution.image_lookup.get(image_id) if image_id else None
             asset_url = image.url if image else None
             prompt_value = combined_prompt or (image.description if image else None) or node.title
             metadata = {
@@ -549,14 +2329,33 @@ class WorkflowEngine:
             metadata = {"prompt": prompt_value}
             return OperationResult(node_id=node.id, prompt=prompt_value, metadata=metadata)
 
-        if node.type in {WorkflowNodeType.STYLE_TRANSFER, WorkflowNodeType.COMPOSITE, WorkflowNodeType.UPSCALE}:
-            asset_url = assets[0] if assets else None
+        executor = self._executors.get(node.type)
+        if executor is not None:
             prompt_value = combined_prompt or node.config.prompt or ""
+            output = await executor.execute(
+                NodeContext(
+                    workflow_id=execution.workflow_id,
+                    node=node,
+                    prompt=prompt_value,
+                    inputs=_node_inputs(upstream_items),
+                    snapshot=execution.snapshot,
+                    _report=lambda fraction: self._report_progress(execution, node.id, fraction),
+                    _pool=self._executors.pool,
+                    deadline=deadline,
+                )
+            )
             metadata = {
+                **output.metadata,
                 "prompt": prompt_value,
                 "inputs": [upstream.node_id for _, upstream in upstream_items],
             }
-            return OperationResult(node_id=node.id, asset_url=asset_url, prompt=prompt_value, metadata=metadata)
+            return OperationResult(
+                node_id=node.id,
+                asset_url=output.asset_url,
+                prompt=prompt_value,
+                metadata=metadata,
+                cacheable=output.cacheable,
+            )
 
         if node.type == WorkflowNodeType.OUTPUT:
             prompt_value = combined_prompt or node.config.prompt or ""
@@ -579,11 +2378,31 @@ class WorkflowEngine:
         prompt_value = combined_prompt or node.config.prompt or node.title
         return OperationResult(node_id=node.id, prompt=prompt_value, metadata={"prompt": prompt_value})
 
-    def _resolve_directive(
+    async def _prepare_directives(self, execution: WorkflowExecution, scope: Optional[Set[str]] = None) -> None:
+        """Resolve every labelled edge of the run (into ``scope``) with a single batch call."""
+
+        labels = [
+            (edge.id, edge.label)
+            for edge in execution.definition.edges
+            if edge.label and (scope is None or edge.target.node_id in scope)
+        ]
+        try:
+            resolutions = await _bounded(
+                self._directives.resolve_labels(labels, use_llm=execution.options.use_llm),
+                execution.remaining_budget(),
+                "Batch directive resolution",
+            )
+        except Exception:
+            # Leave it to the affected nodes to retry individually and fail on their own.
+            logger.exception("Batch directive resolution failed for workflow %s", execution.workflow_id)
+            execution.directives = {}
+            return
+        execution.directives = {resolution.connection_id: resolution for resolution in resolutions}
+
+    async def _resolve_directive(
         self,
         execution: WorkflowExecution,
         edge: WorkflowEdge,
-        upstream: OperationResult,
     ) -> LLMDirectiveResolution:
         text = edge.label.strip() if edge.label else ""
         if not text:
@@ -595,23 +2414,28 @@ class WorkflowEngine:
                 confidence=0.0,
             )
 
-        resolved_text = text
-        confidence = 0.35
-        if execution.options.use_llm:
-            # Placeholder: in future integrate with an actual LLM service
-            resolved_text = text.replace("把", "将").strip()
-            confidence = 0.75
-
-        return LLMDirectiveResolution(
-            connection_id=edge.id,
-            original_text=text,
-            resolved_prompt=resolved_text,
-            suggested_node_type=WorkflowNodeType.CUSTOM,
-            parameters={},
-            confidence=confidence,
-        )
-
-    def _extract_final_prompt(self, execution: WorkflowExecution) -> Optional[str]:
+        known = execution.directives.get(edge.id)
+        if known is not None and known.original_text == text:
+            return known
+        # Labels edited after the batch was prepared fall back to the (memoized) resolver.
+        resolutions = await self._directives.resolve_labels([(edge.id, text)], use_llm=execution.options.use_llm)
+        execution.directives[edge.id] = resolutions[0]
+        return resolutions[0]
+
+    def _extract_final_prompt(self, execution: WorkflowExecution, scope: Optional[Set[str]] = None) -> Optional[str]:
+        if scope is not None:
+            # A focused run stands in for its outputs with the last nodes of each focused branch.
+            focused: List[str] = []
+            for node_id in execution.topological_order:
+                if node_id not in scope or any(
+                    edge.target.node_id in scope for edge in execution.edges_by_source.get(node_id, [])
+                ):
+                    continue
+                result = execution.results.get(node_id)
+                if result and (result.prompt or result.metadata.get("prompt")):
+                    focused.append(result.prompt or str(result.metadata["prompt"]))
+            if focused:
+                return ", ".join(_unique_prompts(focused))
         output_ids = execution.definition.output_ids or []
         for node_id in output_ids:
             result = execution.results.get(node_id)
@@ -630,4 +2454,59 @@ class WorkflowEngine:
         return ", ".join(ordered) if ordered else None
 
 
-workflow_engine = WorkflowEngine()
+def _state_backend_from_env() -> Optional[WorkflowStateBackend]:
+    kind = (os.getenv("WORKFLOW_STATE_BACKEND") or "").strip().lower()
+    if kind == "redis":
+        return RedisStateBackend(
+            os.getenv("REDIS_URL", "redis://localhost:6379"),
+            ttl=_env_int("WORKFLOW_JOURNAL_RETENTION", 7 * 24 * 3600),
+        )
+    if kind == "memory":
+        return InMemoryStateBackend()
+    return None
+
+
+_preview_store = PreviewStore(
+    os.getenv("WORKFLOW_PREVIEW_DIR") or os.path.join(tempfile.gettempdir(), "admagic_workflow_previews"),
+    max_files=_env_int("WORKFLOW_PREVIEW_MAX_FILES", 2000),
+)
+
+workflow_engine = WorkflowEngine(
+    max_concurrency=_env_int("WORKFLOW_MAX_CONCURRENCY", 32),
+    execution_concurrency=_env_int("WORKFLOW_EXECUTION_CONCURRENCY", 8),
+    result_cache=NodeResultCache(max_bytes=_env_int("WORKFLOW_RESULT_CACHE_BYTES", 64 * 1024 * 1024)),
+    registry=WorkflowEngine.create_registry(
+        max_entries=_env_int("WORKFLOW_REGISTRY_MAX_ENTRIES", 512),
+        max_bytes=_env_int("WORKFLOW_REGISTRY_MAX_BYTES", 256 * 1024 * 1024),
+        idle_ttl=_env_int("WORKFLOW_REGISTRY_IDLE_TTL", 1800),
+        spill_store=SQLiteSpillStore(
+            # One file per worker process: a shared file would let workers overwrite each other's executions.
+            os.getenv("WORKFLOW_SPILL_PATH")
+            or os.path.join(tempfile.gettempdir(), f"admagic_workflow_spill.{os.getpid()}.sqlite3"),
+            ttl=_env_int("WORKFLOW_SPILL_TTL", 7 * 24 * 3600),
+            max_rows=_env_int("WORKFLOW_SPILL_MAX_ROWS", 100000),
+        ),
+    ),
+    journal=(
+        SQLiteWorkflowJournal.for_worker(os.environ["WORKFLOW_JOURNAL_PATH"])
+        if os.getenv("WORKFLOW_JOURNAL_PATH")
+        else None
+    ),
+    journal_retention=timedelta(seconds=_env_int("WORKFLOW_JOURNAL_RETENTION", 7 * 24 * 3600)),
+    admission=FairAdmissionQueue(max_active=_env_int("WORKFLOW_MAX_ACTIVE_EXECUTIONS", 16)),
+    background_workers=_env_int("WORKFLOW_BACKGROUND_WORKERS", 16),
+    background_queue_size=_env_int("WORKFLOW_BACKGROUND_QUEUE_SIZE", 1024),
+    state_backend=_state_backend_from_env(),
+    directives=DirectiveResolver(max_bytes=_env_int("WORKFLOW_DIRECTIVE_CACHE_BYTES", 4 * 1024 * 1024)),
+    metrics=WorkflowMetrics(),
+    executors=default_executor_registry(
+        process_workers=_env_int("WORKFLOW_PROCESS_POOL_SIZE", os.cpu_count() or 1),
+        preview_store=_preview_store,
+        upscale_tile_size=_env_int("WORKFLOW_UPSCALE_TILE_SIZE", 512),
+        upscale_max_pixels=_env_int("WORKFLOW_UPSCALE_MAX_PIXELS", 7680 * 4320),
+        upscale_scratch_dir=os.getenv("WORKFLOW_UPSCALE_SCRATCH_DIR") or None,
+    ),
+    preview_store=_preview_store,
+    node_timeout=_env_seconds("WORKFLOW_NODE_TIMEOUT_SECONDS"),
+    workflow_deadline=_env_seconds("WORKFLOW_DEADLINE_SECONDS"),
+)
@@ -0,0 +1,90 @@
+"""In-process fan-out of workflow progress events to streaming subscribers."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+TERMINAL_STATUSES = {"completed", "partial", "failed", "cancelled"}
+
+
+class WorkflowSubscriptionLimitError(Exception):
+    """Raised when a workflow already has the maximum number of subscribers."""
+
+
+class WorkflowSubscription:
+    """Coalescing mailbox for one stream consumer.
+
+    Events are keyed (one key per node plus one for the execution status), so a
+    slow consumer only ever sees the latest value for each key. Memory per
+    subscriber is therefore bounded by the board size and publishers never block.
+    """
+
+    def __init__(self, workflow_id: str, coalesce_window: float) -> None:
+        self.workflow_id = workflow_id
+        self.coalesce_window = coalesce_window
+        self.finished = False
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+
+    def push(self, key: str, event: Dict[str, Any]) -> None:
+        self._pending.pop(key, None)
+        self._pending[key] = event
+        if event.get("type") == "status" and event.get("status") in TERMINAL_STATUSES:
+            self.finished = True
+        self._wakeup.set()
+
+    async def next_batch(self, timeout: float) -> Optional[List[Dict[str, Any]]]:
+        """Wait for pending events; return ``None`` when ``timeout`` elapses first."""
+
+        if not self._pending:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.coalesce_window > 0 and not self.finished:
+            # Let bursts of transitions collapse into a single batch.
+            await asyncio.sleep(self.coalesce_window)
+        batch = list(self._pending.values())
+        self._pending.clear()
+        self._wakeup.clear()
+        return batch
+
+
+class WorkflowEventHub:
+    """Registry of live subscriptions keyed by workflow id."""
+
+    def __init__(self, *, max_subscribers: int = 16, coalesce_window: float = 0.1) -> None:
+        self.max_subscribers = max(1, max_subscribers)
+        self.coalesce_window = coalesce_window
+        self._subscriptions: Dict[str, Set[WorkflowSubscription]] = {}
+
+    def has_subscribers(self, workflow_id: str) -> bool:
+        return bool(self._subscriptions.get(workflow_id))
+
+    def subscribe(self, workflow_id: str) -> WorkflowSubscription:
+        subscribers = self._subscriptions.setdefault(workflow_id, set())
+        if len(subscribers) >= self.max_subscribers:
+            raise WorkflowSubscriptionLimitError(f"Too many subscribers for workflow {workflow_id}")
+        subscription = WorkflowSubscription(workflow_id, self.coalesce_window)
+        subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: WorkflowSubscription) -> None:
+        subscribers = self._subscriptions.get(subscription.workflow_id)
+        if not subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            self._subscriptions.pop(subscription.workflow_id, None)
+
+    def publish(self, workflow_id: str, key: str, event: Dict[str, Any]) -> None:
+        for subscription in list(self._subscriptions.get(workflow_id, ())):
+            subscription.push(key, event)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workflows": len(self._subscriptions),
+            "subscribers": sum(len(items) for items in self._subscriptions.values()),
+        }
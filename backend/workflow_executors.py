@@ -0,0 +1,379 @@
+"""Pluggable per-node-type executors, with a process pool for CPU-bound work."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type, TypeVar, Union
+
+from ai_types import CreativeBoardSnapshot, WorkflowNodeDefinition, WorkflowNodeType
+from workflow_compositor import (
+    COMPOSITOR_AVAILABLE,
+    DEFAULT_MAX_EDGE,
+    FETCH_TIMEOUT,
+    PREVIEW_URL_PREFIX,
+    PreviewStore,
+    board_layout,
+    layout_key,
+    preview_url,
+    render_layout,
+)
+from workflow_upscale import (
+    DEFAULT_MAX_PIXELS,
+    DEFAULT_TILE_SIZE,
+    encode_upscaled,
+    plan_tiles,
+    prepare_upscale,
+    upscale_tile,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class NodeInput:
+    """Output of one upstream node, as seen by a downstream executor."""
+
+    node_id: str
+    asset_url: Optional[str] = None
+    prompt: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class NodeOutput:
+    """What an executor produced; the engine adds the prompt and input bookkeeping."""
+
+    asset_url: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    # False for degraded output (e.g. a composite with images missing) that must be recomputed next time.
+    cacheable: bool = True
+
+
+@dataclass
+class NodeContext:
+    """Everything an executor may read, plus hooks for progress and CPU offloading.
+
+    Executors must be deterministic in these inputs: the engine caches their
+    results by a hash of the node definition and its upstream outputs.
+    """
+
+    workflow_id: str
+    node: WorkflowNodeDefinition
+    prompt: str
+    inputs: List[NodeInput]
+    snapshot: CreativeBoardSnapshot
+    _report: Callable[[float], None] = field(repr=False)
+    _pool: Callable[[], Executor] = field(repr=False)
+    # Monotonic time by which the node must finish (node timeout or workflow deadline), if any.
+    deadline: Optional[float] = None
+
+    @property
+    def assets(self) -> List[str]:
+        return [item.asset_url for item in self.inputs if item.asset_url]
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        return self.node.config.parameters
+
+    def time_left(self, default: float) -> float:
+        """``default`` seconds capped by what is left before ``deadline``; use it for network timeouts."""
+
+        if self.deadline is None:
+            return default
+        return max(0.0, min(default, self.deadline - time.monotonic()))
+
+    def report_progress(self, fraction: float) -> None:
+        """Publish completion in ``[0, 1]`` to ``WorkflowNodeState.progress``."""
+
+        self._report(min(1.0, max(0.0, fraction)))
+
+    async def run_in_process(self, func: Callable[..., T], *args: Any) -> T:
+        """Run a picklable module-level function in the process pool."""
+
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), func, *args)
+
+    async def map_in_process(self, func: Callable[[Any], T], items: Sequence[Any]) -> List[T]:
+        """Run ``func`` over ``items`` across the pool, reporting progress per finished item.
+
+        Cancelling the caller withdraws every item that has not started yet, so
+        long jobs stop at chunk granularity instead of running to completion.
+        """
+
+        if not items:
+            return []
+        pool = self._pool()
+        futures: List[Future] = [pool.submit(func, item) for item in items]
+        waiters = [asyncio.wrap_future(future) for future in futures]
+        done = 0
+        try:
+            for waiter in asyncio.as_completed(waiters):
+                await waiter
+                done += 1
+                self.report_progress(done / len(items))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            for waiter in waiters:
+                waiter.cancel()
+            raise
+        return [future.result() for future in futures]
+
+
+class NodeExecutor:
+    """Base class for node type implementations; subclasses override ``execute``."""
+
+    # Remote provider requests one evaluation makes; dry-run estimates add these up.
+    remote_calls: int = 0
+
+    async def execute(self, context: NodeContext) -> NodeOutput:
+        raise NotImplementedError
+
+    def cache_token(
+        self,
+        node: WorkflowNodeDefinition,
+        inputs: List[NodeInput],
+        snapshot: CreativeBoardSnapshot,
+    ) -> Optional[str]:
+        """Extra cache-key material for executors that read more than their inputs."""
+
+        return None
+
+
+class PassthroughExecutor(NodeExecutor):
+    """Forward the first upstream asset unchanged."""
+
+    async def execute(self, context: NodeContext) -> NodeOutput:
+        assets = context.assets
+        return NodeOutput(asset_url=assets[0] if assets else None)
+
+
+def _input_image_ids(inputs: List[NodeInput]) -> Optional[List[str]]:
+    image_ids = [str(item.metadata["image_id"]) for item in inputs if item.metadata.get("image_id")]
+    return image_ids or None
+
+
+class CanvasCompositeExecutor(NodeExecutor):
+    """Flatten the upstream board images, as laid out on the canvas, into one PNG.
+
+    With no image inputs the whole board is rendered. Rendering happens in the
+    process pool and the result lands in a content-addressed ``PreviewStore``.
+    """
+
+    # Only fetches board assets; no provider request is made.
+    remote_calls = 0
+
+    def __init__(self, store: PreviewStore, *, max_edge: int = DEFAULT_MAX_EDGE) -> None:
+        self.store = store
+        self.max_edge = max_edge
+
+    def _layout(self, node: WorkflowNodeDefinition, inputs: List[NodeInput], snapshot: CreativeBoardSnapshot):
+        max_edge = int(node.config.parameters.get("max_edge") or self.max_edge)
+        return board_layout(snapshot, image_ids=_input_image_ids(inputs), max_edge=max_edge)
+
+    def cache_token(
+        self,
+        node: WorkflowNodeDefinition,
+        inputs: List[NodeInput],
+        snapshot: CreativeBoardSnapshot,
+    ) -> Optional[str]:
+        # Moving, hiding or restacking an image changes the output without changing any input.
+        return layout_key(self._layout(node, inputs, snapshot))
+
+    async def execute(self, context: NodeContext) -> NodeOutput:
+        layout = self._layout(context.node, context.inputs, context.snapshot)
+        rendered = await context.run_in_process(
+            render_layout, layout, self.store.directory, context.time_left(FETCH_TIMEOUT)
+        )
+        await asyncio.to_thread(self.store.prune)
+        return NodeOutput(
+            asset_url=preview_url(rendered["key"]),
+            metadata={
+                "preview_key": rendered["key"],
+                "width": rendered["width"],
+                "height": rendered["height"],
+                "missing_images": rendered["missing"],
+            },
+            cacheable=not rendered["missing"],
+        )
+
+
+_PREVIEW_KEY = re.compile(r"[0-9a-f]{64}")
+
+
+class TiledUpscaleExecutor(NodeExecutor):
+    """Upscale the first upstream asset tile by tile across the process pool.
+
+    Source and output frames live in ``numpy.memmap`` scratch files, tiles are
+    resampled straight into the output file and the PNG is encoded from it in
+    row bands, so no process holds the full output frame in memory. Outputs
+    above ``max_pixels`` (8K UHD by default) fail the node instead of filling
+    the disk.
+    """
+
+    # Resampling is local; at most the source asset is fetched, never a provider.
+    remote_calls = 0
+
+    def __init__(
+        self,
+        store: PreviewStore,
+        *,
+        tile_size: int = DEFAULT_TILE_SIZE,
+        max_pixels: int = DEFAULT_MAX_PIXELS,
+        scratch_dir: Optional[str] = None,
+    ) -> None:
+        self.store = store
+        self.tile_size = tile_size
+        self.max_pixels = max_pixels
+        self.scratch_dir = scratch_dir
+
+    def _local_path(self, url: str) -> Optional[str]:
+        # Upstream composites point at our own preview route; read those from disk instead of over HTTP.
+        if url.startswith(PREVIEW_URL_PREFIX) and url.endswith(".png"):
+            key = url[len(PREVIEW_URL_PREFIX) : -len(".png")]
+            if _PREVIEW_KEY.fullmatch(key) and self.store.exists(key):
+                return self.store.path(key)
+        return None
+
+    async def execute(self, context: NodeContext) -> NodeOutput:
+        assets = context.assets
+        if not assets:
+            return NodeOutput()
+        # The scratch directory is created here rather than in the worker so it can be removed on
+        # every path, including a cancel or timeout while prepare_upscale is still running.
+        scratch = await asyncio.to_thread(tempfile.mkdtemp, prefix="upscale-", dir=self.scratch_dir)
+        plan: Optional[Dict[str, Any]] = None
+        try:
+            plan = await context.run_in_process(
+                functools.partial(
+                    prepare_upscale,
+                    assets[0],
+                    dict(context.parameters),
+                    self.store.directory,
+                    scratch,
+                    source_path=self._local_path(assets[0]),
+                    tile_size=int(context.parameters.get("tile_size") or self.tile_size),
+                    max_pixels=self.max_pixels,
+                    fetch_timeout=context.time_left(FETCH_TIMEOUT),
+                )
+            )
+            await context.map_in_process(upscale_tile, plan_tiles(plan))
+            rendered = await context.run_in_process(encode_upscaled, plan, self.store.directory)
+        finally:
+            # Cancelled or failed runs must not leave multi-gigabyte scratch files behind.
+            await asyncio.to_thread(shutil.rmtree, scratch, True)
+        await asyncio.to_thread(self.store.prune)
+        return NodeOutput(
+            asset_url=preview_url(rendered["key"]),
+            metadata={
+                "preview_key": rendered["key"],
+                "width": rendered["width"],
+                "height": rendered["height"],
+                "source_width": plan["source_size"][0],
+                "source_height": plan["source_size"][1],
+                "tiles": len(plan["tiles"]),
+            },
+        )
+
+
+class NodeExecutorRegistry:
+    """Maps node types to executor classes and owns the shared process pool.
+
+    Executors are instantiated once on first use. The pool is created lazily
+    with the ``spawn`` start method so worker processes never inherit the
+    event loop or open sockets of the API process.
+    """
+
+    def __init__(self, *, process_workers: Optional[int] = None) -> None:
+        self.process_workers = max(1, process_workers or os.cpu_count() or 1)
+        self._classes: Dict[WorkflowNodeType, Type[NodeExecutor]] = {}
+        self._instances: Dict[WorkflowNodeType, NodeExecutor] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def register(
+        self,
+        node_type: WorkflowNodeType,
+        executor: Union[Type[NodeExecutor], NodeExecutor],
+    ) -> None:
+        if isinstance(executor, NodeExecutor):
+            self._classes[node_type] = type(executor)
+            self._instances[node_type] = executor
+        else:
+            self._classes[node_type] = executor
+            self._instances.pop(node_type, None)
+
+    def get(self, node_type: WorkflowNodeType) -> Optional[NodeExecutor]:
+        executor = self._instances.get(node_type)
+        if executor is None:
+            executor_cls = self._classes.get(node_type)
+            if executor_cls is None:
+                return None
+            executor = self._instances[node_type] = executor_cls()
+        return executor
+
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is not None and getattr(self._pool, "_broken", False):
+            # A worker died (e.g. OOM-killed); replace the pool instead of failing every later node.
+            logger.warning("Workflow executor process pool is broken; starting a new one")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executors": {node_type.value: cls.__name__ for node_type, cls in self._classes.items()},
+            "process_workers": self.process_workers,
+            "pool_started": self._pool is not None,
+        }
+
+
+def default_executor_registry(
+    *,
+    process_workers: Optional[int] = None,
+    preview_store: Optional[PreviewStore] = None,
+    upscale_tile_size: int = DEFAULT_TILE_SIZE,
+    upscale_max_pixels: int = DEFAULT_MAX_PIXELS,
+    upscale_scratch_dir: Optional[str] = None,
+) -> NodeExecutorRegistry:
+    """Registry with the built-in executors for image-producing node types.
+
+    Local image operations need numpy and Pillow; without them (or without a
+    preview store to write to) those node types keep forwarding their input.
+    """
+
+    registry = NodeExecutorRegistry(process_workers=process_workers)
+    for node_type in (WorkflowNodeType.STYLE_TRANSFER, WorkflowNodeType.COMPOSITE, WorkflowNodeType.UPSCALE):
+        registry.register(node_type, PassthroughExecutor)
+    if COMPOSITOR_AVAILABLE and preview_store is not None:
+        registry.register(WorkflowNodeType.COMPOSITE, CanvasCompositeExecutor(preview_store))
+        registry.register(
+            WorkflowNodeType.UPSCALE,
+            TiledUpscaleExecutor(
+                preview_store,
+                tile_size=upscale_tile_size,
+                max_pixels=upscale_max_pixels,
+                scratch_dir=upscale_scratch_dir,
+            ),
+        )
+    return registry
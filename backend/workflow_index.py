@@ -0,0 +1,131 @@
+"""Secondary indexes for listing workflow executions newest-first, page by page."""
+
+from __future__ import annotations
+
+import base64
+import bisect
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (updated_at, workflow_id); the id breaks ties so every key is unique and cursors are stable.
+SortKey = Tuple[datetime, str]
+
+
+@dataclass(frozen=True)
+class IndexedExecution:
+    """Listing fields of one execution, as kept by ``ExecutionIndex``."""
+
+    workflow_id: str
+    board_id: str
+    owner_id: Optional[str]
+    status: str
+    created_at: datetime
+    updated_at: datetime
+
+    @property
+    def sort_key(self) -> SortKey:
+        return (self.updated_at, self.workflow_id)
+
+
+def encode_cursor(key: SortKey) -> str:
+    updated_at, workflow_id = key
+    raw = f"{updated_at.isoformat()}|{workflow_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` for anything it did not produce."""
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        updated_at, workflow_id = raw.split("|", 1)
+        return (datetime.fromisoformat(updated_at), workflow_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Invalid listing cursor: {cursor!r}") from exc
+
+
+class ExecutionIndex:
+    """Executions ordered by ``updated_at`` overall, per board, per owner and per (board, owner).
+
+    Every scope is a list of ``SortKey`` kept sorted with ``bisect``. A page is
+    one binary search for the cursor plus a slice, so its cost does not depend
+    on how many executions the process has seen. Updates are cheap in
+    practice: an execution that changes moves to the tail of each list, and it
+    usually sat close to the tail already.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, IndexedExecution] = {}
+        self._scopes: Dict[Tuple[Optional[str], ...], List[SortKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, workflow_id: str) -> bool:
+        return workflow_id in self._entries
+
+    @staticmethod
+    def _scope(board_id: Optional[str], owner_id: Optional[str]) -> Tuple[Optional[str], ...]:
+        if board_id and owner_id:
+            return ("board_owner", board_id, owner_id)
+        if board_id:
+            return ("board", board_id)
+        if owner_id:
+            return ("owner", owner_id)
+        return ("all",)
+
+    def _scopes_of(self, entry: IndexedExecution) -> Iterable[Tuple[Optional[str], ...]]:
+        yield self._scope(None, None)
+        yield self._scope(entry.board_id, None)
+        if entry.owner_id:
+            yield self._scope(None, entry.owner_id)
+            yield self._scope(entry.board_id, entry.owner_id)
+
+    def upsert(self, entry: IndexedExecution) -> None:
+        previous = self._entries.get(entry.workflow_id)
+        if previous is not None:
+            if previous.sort_key == entry.sort_key and previous.owner_id == entry.owner_id:
+                # Only the status changed (or nothing did); positions stay valid.
+                self._entries[entry.workflow_id] = entry
+                return
+            self._unlink(previous)
+        self._entries[entry.workflow_id] = entry
+        key = entry.sort_key
+        for scope in self._scopes_of(entry):
+            bisect.insort(self._scopes.setdefault(scope, []), key)
+
+    def remove(self, workflow_id: str) -> None:
+        entry = self._entries.pop(workflow_id, None)
+        if entry is not None:
+            self._unlink(entry)
+
+    def _unlink(self, entry: IndexedExecution) -> None:
+        key = entry.sort_key
+        for scope in self._scopes_of(entry):
+            keys = self._scopes.get(scope)
+            if not keys:
+                continue
+            position = bisect.bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+            if not keys:
+                del self._scopes[scope]
+
+    def page(
+        self,
+        *,
+        board_id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[SortKey] = None,
+    ) -> List[IndexedExecution]:
+        """Newest-first entries strictly older than ``after``, at most ``limit`` of them."""
+
+        keys = self._scopes.get(self._scope(board_id, owner_id), [])
+        end = bisect.bisect_left(keys, after) if after is not None else len(keys)
+        start = max(0, end - limit) if limit is not None else 0
+        return [self._entries[workflow_id] for _, workflow_id in reversed(keys[start:end])]
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "scopes": len(self._scopes)}
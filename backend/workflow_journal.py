@@ -0,0 +1,304 @@
+"""Write-ahead journal that lets workflow executions survive a backend restart."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT = "checkpoint"
+NODE = "node"
+FORGET = "forget"
+MAX_SLOTS = 64
+
+# kind, workflow_id, node_id, payload (serialized by the writer thread)
+_Entry = Tuple[str, str, Optional[str], Any]
+
+
+def _slot_path(path: str, slot: int) -> str:
+    root, extension = os.path.splitext(path)
+    return f"{root}.{slot}{extension}"
+
+
+def _try_lock(path: str) -> Optional[IO[bytes]]:
+    """Take an exclusive lock on ``path`` without waiting; ``None`` if another open file holds it.
+
+    The lock lives as long as the returned handle and is dropped by the OS
+    when the process exits, however it exits.
+    """
+
+    handle = open(path, "a+b")  # pylint: disable=consider-using-with
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:  # pragma: no cover - Windows
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+class SQLiteWorkflowJournal:
+    """Append-only SQLite journal of execution checkpoints and node transitions.
+
+    A checkpoint stores a full ``WorkflowExecution.to_record()`` payload and
+    compacts every earlier entry for the same workflow. Node entries written
+    afterwards carry a ``WorkflowNodeState`` dump and, once available, the
+    node's ``OperationResult`` record, so replay can rebuild the latest state.
+
+    Writers never block on SQLite: entries are queued and a writer thread
+    serializes and commits them in batches, one transaction per batch. A
+    queued checkpoint supersedes the entries queued before it for the same
+    workflow. Readers flush the queue first.
+
+    A journal file must only ever be replayed by one process; use
+    ``for_worker`` when several processes share one configured path.
+    """
+
+    def __init__(self, path: str, *, base_path: Optional[str] = None) -> None:
+        self.path = path
+        self.base_path = base_path
+        self._lock_handle: Optional[IO[bytes]] = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._mutex = threading.Lock()
+        self._pending: List[_Entry] = []
+        self._condition = threading.Condition()
+        self._writing = False
+        self._writer: Optional[threading.Thread] = None
+        with self._mutex:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS workflow_journal (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    workflow_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    node_id TEXT,
+                    payload TEXT NOT NULL,
+                    recorded_at TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS workflow_journal_workflow ON workflow_journal (workflow_id, seq)"
+            )
+
+    @classmethod
+    def for_worker(cls, path: str) -> "SQLiteWorkflowJournal":
+        """Open a journal slot of ``path`` that no other live process holds.
+
+        Each worker process sharing ``path`` gets a file of its own
+        (``name.0.ext``, ``name.1.ext``, ...), guarded by an exclusive lock
+        held for the life of the process. Two workers therefore never replay
+        or resume the same execution. ``adopt_orphans`` takes over the slots
+        of processes that have exited.
+        """
+
+        for slot in range(MAX_SLOTS):
+            slot_path = _slot_path(path, slot)
+            handle = _try_lock(f"{slot_path}.lock")
+            if handle is None:
+                continue
+            journal = cls(slot_path, base_path=path)
+            journal._lock_handle = handle
+            return journal
+        raise RuntimeError(f"All {MAX_SLOTS} journal slots of {path} are held by live processes")
+
+    def adopt_orphans(self) -> int:
+        """Move executions out of journal files no live process holds; returns how many.
+
+        Candidates are the other slots of ``base_path`` and the legacy
+        unslotted file. Each is locked while it is drained, so concurrent
+        adopters never take the same execution twice.
+        """
+
+        if self.base_path is None:
+            return 0
+        candidates = [self.base_path] + [_slot_path(self.base_path, slot) for slot in range(MAX_SLOTS)]
+        adopted = 0
+        for path in candidates:
+            if path == self.path or not os.path.isfile(path):
+                continue
+            handle = _try_lock(f"{path}.lock")
+            if handle is None:
+                continue
+            try:
+                orphan = SQLiteWorkflowJournal(path)
+                try:
+                    records = orphan.replay()
+                    for record in records:
+                        self.checkpoint(record)
+                    if not self.flush():
+                        raise RuntimeError(f"Could not copy journal entries out of {path}")
+                    orphan.clear()
+                finally:
+                    orphan.close()
+            finally:
+                handle.close()
+            if records:
+                logger.info("Adopted %d workflow executions from orphaned journal %s", len(records), path)
+            adopted += len(records)
+        return adopted
+
+    def checkpoint(self, record: Dict[str, Any]) -> None:
+        workflow_id = record["workflow_id"]
+        self._enqueue((CHECKPOINT, workflow_id, None, record), supersede=workflow_id)
+
+    def append_node(
+        self,
+        workflow_id: str,
+        node_state: Dict[str, Any],
+        result: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._enqueue((NODE, workflow_id, node_state["node_id"], {"state": node_state, "result": result}))
+
+    def forget(self, workflow_id: str) -> None:
+        self._enqueue((FORGET, workflow_id, None, None), supersede=workflow_id)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until every queued entry is committed; ``False`` if that took longer than ``timeout``."""
+
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def close(self) -> None:
+        """Commit what is queued, then release the file and its slot lock."""
+
+        self.flush()
+        with self._condition:
+            writer, self._writer = self._writer, None
+            self._condition.notify_all()
+        if writer is not None:
+            writer.join()
+        with self._mutex:
+            self._conn.close()
+        if self._lock_handle is not None:
+            self._lock_handle.close()
+            self._lock_handle = None
+
+    def clear(self) -> None:
+        with self._mutex:
+            self._conn.execute("DELETE FROM workflow_journal")
+
+    def _enqueue(self, entry: _Entry, *, supersede: Optional[str] = None) -> None:
+        with self._condition:
+            if supersede is not None:
+                self._pending = [queued for queued in self._pending if queued[1] != supersede]
+            self._pending.append(entry)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="workflow-journal", daemon=True)
+                self._writer.start()
+            self._condition.notify_all()
+
+    def _write_loop(self) -> None:
+        me = threading.current_thread()
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._writer is not me)
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                self._writing = True
+            try:
+                self._write(batch)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to write %d workflow journal entries; retrying", len(batch))
+                with self._condition:
+                    # Keep the batch ahead of anything queued since, unless a checkpoint superseded it.
+                    superseded = {entry[1] for entry in self._pending if entry[0] != NODE}
+                    self._pending[:0] = [entry for entry in batch if entry[1] not in superseded]
+                time.sleep(1.0)
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    def _write(self, batch: List[_Entry]) -> None:
+        recorded_at = datetime.utcnow().isoformat()
+        rows = []
+        for kind, workflow_id, node_id, payload in batch:
+            encoded = json.dumps(payload, default=str, ensure_ascii=False) if payload is not None else None
+            rows.append((kind, workflow_id, node_id, encoded))
+        with self._mutex:
+            self._conn.execute("BEGIN")
+            try:
+                for kind, workflow_id, node_id, encoded in rows:
+                    if kind != NODE:
+                        self._conn.execute("DELETE FROM workflow_journal WHERE workflow_id = ?", (workflow_id,))
+                    if kind == FORGET:
+                        continue
+                    self._conn.execute(
+                        "INSERT INTO workflow_journal (workflow_id, kind, node_id, payload, recorded_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (workflow_id, kind, node_id, encoded, recorded_at),
+                    )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def prune(self, older_than: datetime) -> int:
+        """Drop workflows whose latest journal entry is older than ``older_than``."""
+
+        self.flush()
+        with self._mutex:
+            cursor = self._conn.execute(
+                "DELETE FROM workflow_journal WHERE workflow_id IN ("
+                "SELECT workflow_id FROM workflow_journal GROUP BY workflow_id HAVING MAX(recorded_at) < ?"
+                ")",
+                (older_than.isoformat(),),
+            )
+            return cursor.rowcount
+
+    def replay(self) -> List[Dict[str, Any]]:
+        """Return the latest execution record for every journaled workflow."""
+
+        self.flush()
+        with self._mutex:
+            rows = self._conn.execute(
+                "SELECT workflow_id, kind, payload FROM workflow_journal ORDER BY seq"
+            ).fetchall()
+
+        records: Dict[str, Dict[str, Any]] = {}
+        for workflow_id, kind, payload in rows:
+            data = json.loads(payload)
+            if kind == CHECKPOINT:
+                records[workflow_id] = data
+                continue
+            record = records.get(workflow_id)
+            if record is None:
+                logger.warning("Journal entry for %s has no checkpoint; ignoring", workflow_id)
+                continue
+            _apply_node_entry(record, data)
+        return list(records.values())
+
+
+def _apply_node_entry(record: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    node_state = entry["state"]
+    node_id = node_state["node_id"]
+    node_states = record["state"].setdefault("node_states", [])
+    for index, existing in enumerate(node_states):
+        if existing.get("node_id") == node_id:
+            node_states[index] = node_state
+            break
+    else:
+        node_states.append(node_state)
+    if entry.get("result") is not None:
+        record.setdefault("results", {})[node_id] = entry["result"]
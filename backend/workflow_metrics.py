@@ -0,0 +1,134 @@
+"""Engine-wide latency and size histograms for workflow node evaluations."""
+
+from __future__ import annotations
+
+import bisect
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+DURATION_BUCKETS_MS: Sequence[float] = (
+    0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000,
+)
+SIZE_BUCKETS_BYTES: Sequence[float] = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Fixed-bucket histogram; memory does not grow with the number of observations."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.bounds = tuple(sorted(buckets))
+        # One extra slot for observations above the largest bound.
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside the bucket that contains it."""
+
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / bucket_count)
+            seen += bucket_count
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets: Dict[str, int] = {}
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            cumulative += bucket_count
+            buckets[f"{bound:g}"] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": (self.total / self.count) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+class _TypeMetrics:
+    def __init__(self) -> None:
+        self.duration_ms = Histogram(DURATION_BUCKETS_MS)
+        self.queue_wait_ms = Histogram(DURATION_BUCKETS_MS)
+        self.metadata_bytes = Histogram(SIZE_BUCKETS_BYTES)
+        self.cache: Dict[str, int] = {}
+        self.failed = 0
+
+
+class WorkflowMetrics:
+    """Aggregates node timings by node type and execution wall time by final status."""
+
+    def __init__(self) -> None:
+        self._nodes: Dict[str, _TypeMetrics] = {}
+        self._executions: Dict[str, Histogram] = {}
+
+    def observe_node(
+        self,
+        node_type: str,
+        *,
+        duration_ms: float,
+        queue_wait_ms: float,
+        metadata_bytes: int,
+        cache: str,
+        failed: bool = False,
+    ) -> None:
+        metrics = self._nodes.get(node_type)
+        if metrics is None:
+            metrics = self._nodes[node_type] = _TypeMetrics()
+        metrics.cache[cache] = metrics.cache.get(cache, 0) + 1
+        metrics.queue_wait_ms.observe(queue_wait_ms)
+        if failed:
+            metrics.failed += 1
+            return
+        if cache != "computed":
+            # Cache hits cost no evaluation time; counting them would hide slow node types.
+            return
+        metrics.duration_ms.observe(duration_ms)
+        metrics.metadata_bytes.observe(metadata_bytes)
+
+    def estimate(self, node_type: str) -> Optional[Tuple[float, float]]:
+        """Median and p95 evaluation time of a node type in ms, or ``None`` without history."""
+
+        metrics = self._nodes.get(node_type)
+        if metrics is None or not metrics.duration_ms.count:
+            return None
+        return metrics.duration_ms.quantile(0.5), metrics.duration_ms.quantile(0.95)
+
+    def observe_execution(self, status: str, wall_ms: float) -> None:
+        histogram = self._executions.get(status)
+        if histogram is None:
+            histogram = self._executions[status] = Histogram(DURATION_BUCKETS_MS)
+        histogram.observe(wall_ms)
+
+    def snapshot(self, node_type: Optional[str] = None) -> Dict[str, Any]:
+        nodes = {
+            name: {
+                "cache": dict(metrics.cache),
+                "failed": metrics.failed,
+                "duration_ms": metrics.duration_ms.snapshot(),
+                "queue_wait_ms": metrics.queue_wait_ms.snapshot(),
+                "metadata_bytes": metrics.metadata_bytes.snapshot(),
+            }
+            for name, metrics in sorted(self._nodes.items())
+            if node_type is None or name == node_type
+        }
+        return {
+            "nodes": nodes,
+            "executions": {status: histogram.snapshot() for status, histogram in sorted(self._executions.items())},
+        }
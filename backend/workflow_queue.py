@@ -0,0 +1,174 @@
+"""Priority- and owner-fair admission control for workflow executions."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+PRIORITY_WEIGHTS: Dict[str, float] = {"low": 1.0, "normal": 2.0, "high": 4.0}
+
+
+@dataclass(order=True)
+class _Waiter:
+    finish_tag: float
+    sequence: int
+    start_tag: float = field(compare=False)
+    owner_key: str = field(compare=False)
+    priority: str = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    future: "asyncio.Future[None]" = field(compare=False)
+
+
+class FairAdmissionQueue:
+    """Bounded pool of execution slots handed out by weighted fair queueing.
+
+    Each waiter gets a virtual finish tag of ``start + cost / weight`` where the
+    start tag is the later of the queue's virtual clock and the owner's previous
+    finish tag. Owners therefore share slots in proportion to their priority
+    weights, and a user submitting many large boards only delays their own work.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_active: int = 16,
+        weights: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        wait_window: int = 1024,
+    ) -> None:
+        self.max_active = max(1, max_active)
+        self.weights = dict(weights or PRIORITY_WEIGHTS)
+        self._clock = clock
+        # Abandoned waiters stay in the heap until popped; ``_waiting`` counts the live ones.
+        self._heap: List[_Waiter] = []
+        self._waiting = 0
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._owner_finish: Dict[str, float] = {}
+        self._active = 0
+        self._waits: Deque[float] = deque(maxlen=max(1, wait_window))
+        self.admitted = 0
+        self.abandoned = 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def __len__(self) -> int:
+        return self._waiting
+
+    async def acquire(self, *, owner_id: Optional[str], priority: str = "normal", cost: int = 1) -> None:
+        """Wait for an execution slot; pair every successful call with ``release``."""
+
+        if self._active < self.max_active and not self._waiting:
+            self._active += 1
+            self.admitted += 1
+            self._waits.append(0.0)
+            return
+
+        owner_key = owner_id or ""
+        weight = self.weights.get(priority, self.weights.get("normal", 1.0))
+        start_tag = max(self._virtual_time, self._owner_finish.get(owner_key, 0.0))
+        finish_tag = start_tag + max(1, cost) / weight
+        self._owner_finish[owner_key] = finish_tag
+        waiter = _Waiter(
+            finish_tag=finish_tag,
+            sequence=next(self._sequence),
+            start_tag=start_tag,
+            owner_key=owner_key,
+            priority=priority,
+            enqueued_at=self._clock(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._heap, waiter)
+        self._waiting += 1
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted just before the caller gave up; hand it on.
+                self.release()
+            else:
+                self._abandon(waiter)
+                self._dispatch()
+            raise
+
+    def release(self) -> None:
+        self._active = max(0, self._active - 1)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._heap and self._active < self.max_active:
+            waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue
+            self._waiting -= 1
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            self._active += 1
+            self.admitted += 1
+            self._waits.append(self._clock() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+        if not self._waiting:
+            self._heap.clear()
+            if len(self._owner_finish) > 1024:
+                # Owners whose tags are behind the virtual clock carry no state worth keeping.
+                self._owner_finish = {
+                    owner: tag for owner, tag in self._owner_finish.items() if tag > self._virtual_time
+                }
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Withdraw a cancelled waiter and give its owner back the virtual time it reserved.
+
+        The owner's later waiters were tagged after this one, so their tags are
+        recomputed as if it had never been queued.
+        """
+
+        self._waiting -= 1
+        self.abandoned += 1
+        later = sorted(
+            (
+                other
+                for other in self._heap
+                if other.owner_key == waiter.owner_key and other.sequence > waiter.sequence and not other.future.done()
+            ),
+            key=lambda other: other.sequence,
+        )
+        finish_tag = waiter.start_tag
+        for other in later:
+            start_tag = max(self._virtual_time, finish_tag)
+            finish_tag = start_tag + (other.finish_tag - other.start_tag)
+            other.start_tag, other.finish_tag = start_tag, finish_tag
+        self._owner_finish[waiter.owner_key] = finish_tag
+        if len(self._heap) > 2 * self._waiting + 64:
+            # Mostly abandoned entries: compact rather than let them pile up behind live ones.
+            self._heap = [other for other in self._heap if not other.future.done()]
+            heapq.heapify(self._heap)
+        elif later:
+            heapq.heapify(self._heap)
+
+    def stats(self) -> Dict[str, Any]:
+        queued: Dict[str, int] = {}
+        owners = set()
+        for waiter in self._heap:
+            if waiter.future.done():
+                continue
+            queued[waiter.priority] = queued.get(waiter.priority, 0) + 1
+            owners.add(waiter.owner_key)
+        waits = sorted(self._waits)
+        return {
+            "active": self._active,
+            "max_active": self.max_active,
+            "queued": sum(queued.values()),
+            "queued_by_priority": queued,
+            "queued_owners": len(owners),
+            "admitted": self.admitted,
+            "abandoned": self.abandoned,
+            "wait_seconds_avg": (sum(waits) / len(waits)) if waits else 0.0,
+            "wait_seconds_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+            "wait_seconds_max": waits[-1] if waits else 0.0,
+        }
@@ -0,0 +1,373 @@
+"""Bounded in-memory registry for workflow executions with on-disk spill."""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Iterator, List, Optional, Protocol, TypeVar
+
+logger = logging.getLogger(__name__)
+
+
+class SpillableExecution(Protocol):
+    """Subset of ``WorkflowExecution`` the registry relies on."""
+
+    workflow_id: str
+    board_id: str
+    owner_id: Optional[str]
+
+    def to_record(self) -> Dict[str, Any]:
+        ...
+
+    def approximate_size(self) -> int:
+        ...
+
+
+E = TypeVar("E", bound=SpillableExecution)
+
+
+@dataclass
+class SpilledExecutionSummary:
+    """Listing metadata kept alongside a spilled execution payload."""
+
+    workflow_id: str
+    board_id: str
+    owner_id: Optional[str]
+    status: str
+    created_at: str
+    updated_at: str
+
+
+class SQLiteSpillStore:
+    """Local SQLite table holding serialized executions evicted from memory.
+
+    Rows spilled more than ``ttl`` seconds ago, and the oldest rows beyond
+    ``max_rows``, are deleted by ``prune``; ``None`` disables either bound.
+    The file belongs to a single process: workers sharing it would overwrite
+    each other's executions.
+    """
+
+    # Seconds between TTL sweeps; a sweep also runs as soon as the row cap is exceeded.
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        ttl: Optional[float] = None,
+        max_rows: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._clock = clock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._mutex = threading.Lock()
+        with self._mutex:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS spilled_executions (
+                    workflow_id TEXT PRIMARY KEY,
+                    board_id TEXT NOT NULL,
+                    owner_id TEXT,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    spilled_at REAL NOT NULL DEFAULT 0
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(spilled_executions)")}
+            if "spilled_at" not in columns:
+                # Files written before rows were timestamped; their rows count as already expired.
+                self._conn.execute("ALTER TABLE spilled_executions ADD COLUMN spilled_at REAL NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS spilled_executions_spilled_at ON spilled_executions (spilled_at)"
+            )
+            # Approximate row count (replacements are counted as inserts); ``prune`` re-counts.
+            self._rows = int(self._conn.execute("SELECT COUNT(*) FROM spilled_executions").fetchone()[0])
+        self._next_prune = 0.0
+
+    def save(self, record: Dict[str, Any], payload: str) -> None:
+        with self._mutex:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spilled_executions "
+                "(workflow_id, board_id, owner_id, status, created_at, updated_at, payload, spilled_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record["workflow_id"],
+                    record["board_id"],
+                    record.get("owner_id"),
+                    record["state"]["status"],
+                    record["created_at"],
+                    record["updated_at"],
+                    payload,
+                    self._clock(),
+                ),
+            )
+            self._rows += 1
+
+    def prune(self, *, force: bool = False) -> List[str]:
+        """Delete expired and over-cap rows; return their workflow ids.
+
+        Cheap to call after every save: unless ``force`` is set it only sweeps
+        once per ``PRUNE_INTERVAL`` or when the row cap is exceeded.
+        """
+
+        now = self._clock()
+        over_cap = self.max_rows is not None and self._rows > self.max_rows
+        if not force and not over_cap and now < self._next_prune:
+            return []
+        self._next_prune = now + self.PRUNE_INTERVAL
+        removed: List[str] = []
+        with self._mutex:
+            if self.ttl is not None:
+                cutoff = (now - self.ttl,)
+                removed.extend(
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT workflow_id FROM spilled_executions WHERE spilled_at < ?", cutoff
+                    )
+                )
+                self._conn.execute("DELETE FROM spilled_executions WHERE spilled_at < ?", cutoff)
+            if self.max_rows is not None:
+                surplus = [
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT workflow_id FROM spilled_executions ORDER BY spilled_at DESC LIMIT -1 OFFSET ?",
+                        (self.max_rows,),
+                    )
+                ]
+                self._conn.executemany(
+                    "DELETE FROM spilled_executions WHERE workflow_id = ?", [(workflow_id,) for workflow_id in surplus]
+                )
+                removed.extend(surplus)
+            self._rows = int(self._conn.execute("SELECT COUNT(*) FROM spilled_executions").fetchone()[0])
+        return removed
+
+    def load(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        with self._mutex:
+            row = self._conn.execute(
+                "SELECT payload FROM spilled_executions WHERE workflow_id = ?",
+                (workflow_id,),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, workflow_id: str) -> None:
+        with self._mutex:
+            deleted = self._conn.execute("DELETE FROM spilled_executions WHERE workflow_id = ?", (workflow_id,))
+            self._rows = max(0, self._rows - deleted.rowcount)
+
+    def count(self) -> int:
+        with self._mutex:
+            return int(self._conn.execute("SELECT COUNT(*) FROM spilled_executions").fetchone()[0])
+
+    def summaries(
+        self,
+        *,
+        board_id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+    ) -> List[SpilledExecutionSummary]:
+        clauses: List[str] = []
+        params: List[str] = []
+        if board_id:
+            clauses.append("board_id = ?")
+            params.append(board_id)
+        if owner_id:
+            clauses.append("owner_id = ?")
+            params.append(owner_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._mutex:
+            rows = self._conn.execute(
+                "SELECT workflow_id, board_id, owner_id, status, created_at, updated_at "
+                f"FROM spilled_executions{where}",
+                params,
+            ).fetchall()
+        return [SpilledExecutionSummary(*row) for row in rows]
+
+
+class ExecutionRegistry(Generic[E]):
+    """LRU registry bounded by entry count, byte budget and idle TTL.
+
+    Executions reported busy by ``is_busy`` are never evicted. Evicted executions
+    are written to the spill store (when configured) and transparently rehydrated
+    through ``loader`` on the next ``get``.
+    """
+
+    def __init__(
+        self,
+        *,
+        loader: Callable[[Dict[str, Any]], E],
+        is_busy: Callable[[E], bool] = lambda execution: False,
+        max_entries: int = 512,
+        max_bytes: int = 256 * 1024 * 1024,
+        idle_ttl: float = 1800.0,
+        spill_store: Optional[SQLiteSpillStore] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._loader = loader
+        self._is_busy = is_busy
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.idle_ttl = idle_ttl
+        self._spill = spill_store
+        self._clock = clock
+        # workflow_id -> (execution, approximate size, last access)
+        self._resident: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rehydrations = 0
+        self.dropped = 0
+        # Called with the workflow id whenever an execution is forgotten for good.
+        self.on_drop: Optional[Callable[[str], None]] = None
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    def resident(self) -> Iterator[E]:
+        for entry in list(self._resident.values()):
+            yield entry[0]
+
+    def spilled_summaries(
+        self,
+        *,
+        board_id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+    ) -> List[SpilledExecutionSummary]:
+        if self._spill is None:
+            return []
+        return [
+            summary
+            for summary in self._spill.summaries(board_id=board_id, owner_id=owner_id)
+            if summary.workflow_id not in self._resident
+        ]
+
+    def put(self, execution: E) -> None:
+        workflow_id = execution.workflow_id
+        previous = self._resident.pop(workflow_id, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        size = self._measure(execution)
+        self._resident[workflow_id] = [execution, size, self._clock()]
+        self._bytes += size
+        self._enforce(keep=workflow_id)
+
+    def get(self, workflow_id: str) -> Optional[E]:
+        self._expire(keep=workflow_id)
+        entry = self._resident.get(workflow_id)
+        if entry is not None:
+            entry[2] = self._clock()
+            self._resident.move_to_end(workflow_id)
+            return entry[0]
+        if self._spill is None:
+            return None
+        record = self._spill.load(workflow_id)
+        if record is None:
+            return None
+        try:
+            execution = self._loader(record)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to rehydrate spilled workflow %s", workflow_id)
+            return None
+        self._spill.delete(workflow_id)
+        self.rehydrations += 1
+        self.put(execution)
+        return execution
+
+    def discard(self, workflow_id: str) -> None:
+        """Forget an execution without spilling it (e.g. it moved to another process)."""
+
+        entry = self._resident.pop(workflow_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        if self._spill is not None:
+            self._spill.delete(workflow_id)
+        self._dropped(workflow_id)
+
+    def refresh(self, workflow_id: str) -> None:
+        """Re-measure an execution after it changed and apply the bounds."""
+
+        entry = self._resident.get(workflow_id)
+        if entry is None:
+            return
+        self._bytes -= entry[1]
+        entry[1] = self._measure(entry[0])
+        self._bytes += entry[1]
+        self._enforce(keep=None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resident": len(self._resident),
+            "resident_bytes": self._bytes,
+            "spilled": self._spill.count() if self._spill is not None else 0,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "idle_ttl_seconds": self.idle_ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rehydrations": self.rehydrations,
+            "dropped": self.dropped,
+        }
+
+    def _measure(self, execution: E) -> int:
+        # Runs on every put and refresh, so this must not serialize the whole execution.
+        return execution.approximate_size()
+
+    def _expire(self, keep: Optional[str]) -> None:
+        if self.idle_ttl <= 0:
+            return
+        deadline = self._clock() - self.idle_ttl
+        for workflow_id, entry in list(self._resident.items()):
+            if entry[2] > deadline:
+                # Entries are kept in access order, so everything after is fresher.
+                break
+            if workflow_id == keep or self._is_busy(entry[0]):
+                continue
+            self._evict(workflow_id)
+            self.expirations += 1
+
+    def _enforce(self, keep: Optional[str]) -> None:
+        self._expire(keep)
+        if len(self._resident) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        for workflow_id, entry in list(self._resident.items()):
+            if len(self._resident) <= self.max_entries and self._bytes <= self.max_bytes:
+                break
+            if workflow_id == keep or self._is_busy(entry[0]):
+                continue
+            self._evict(workflow_id)
+            self.evictions += 1
+
+    def _evict(self, workflow_id: str) -> None:
+        execution, size, _ = self._resident.pop(workflow_id)
+        self._bytes -= size
+        if self._spill is None:
+            self.dropped += 1
+            self._dropped(workflow_id)
+            return
+        record = execution.to_record()
+        try:
+            self._spill.save(record, json.dumps(record, default=str, ensure_ascii=False))
+            expired = self._spill.prune()
+        except sqlite3.Error:
+            logger.exception("Failed to spill workflow %s", workflow_id)
+            self.dropped += 1
+            self._dropped(workflow_id)
+            return
+        self.dropped += len(expired)
+        for expired_id in expired:
+            self._dropped(expired_id)
+
+    def _dropped(self, workflow_id: str) -> None:
+        if self.on_drop is not None:
+            self.on_drop(workflow_id)
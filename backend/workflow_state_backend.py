@@ -0,0 +1,643 @@
+"""Execution state shared between processes so any worker can serve any workflow."""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Tuple
+
+try:  # Optional dependency: only needed when WORKFLOW_STATE_BACKEND=redis
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - exercised only without redis installed
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# workflow_id, event key, event payload
+StateListener = Callable[[str, str, Dict[str, Any]], None]
+
+# Event key reserved for engine-to-engine commands (e.g. cancel a run owned elsewhere).
+CONTROL_KEY = "control"
+
+# (updated_at as a POSIX timestamp, workflow_id): position of an execution in a listing.
+ListingKey = Tuple[float, str]
+
+
+def listing_score(updated_at: Any) -> float:
+    """Sorted-set score for an execution last updated at ``updated_at`` (datetime or ISO string).
+
+    Naive timestamps are UTC, as the engine writes them.
+    """
+
+    if not isinstance(updated_at, datetime):
+        updated_at = datetime.fromisoformat(str(updated_at))
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return updated_at.timestamp()
+
+
+def _listing_scopes(board_id: Optional[str], owner_id: Optional[str]) -> Iterable[Tuple[Optional[str], ...]]:
+    """Every listing an execution of ``board_id`` / ``owner_id`` belongs to."""
+
+    yield ("all",)
+    yield ("board", board_id)
+    if owner_id:
+        yield ("owner", owner_id)
+        yield ("board_owner", board_id, owner_id)
+
+
+def _listing_scope(board_id: Optional[str], owner_id: Optional[str]) -> Tuple[Optional[str], ...]:
+    """The one listing that answers a query filtered by ``board_id`` and/or ``owner_id``."""
+
+    if board_id and owner_id:
+        return ("board_owner", board_id, owner_id)
+    if board_id:
+        return ("board", board_id)
+    if owner_id:
+        return ("owner", owner_id)
+    return ("all",)
+
+
+class WorkflowStateBackend(Protocol):
+    """Store mirroring execution state and relaying events between engine processes.
+
+    Writers are synchronous and never block the event loop; implementations may
+    buffer them. Readers are coroutines. Node updates are atomic: the node state
+    and the execution version it was committed at always change together.
+    """
+
+    def add_listener(self, listener: StateListener) -> None:
+        ...
+
+    async def start(self) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+    def save_record(self, record: Dict[str, Any], node_versions: Optional[Dict[str, int]] = None) -> None:
+        ...
+
+    def update_node(self, workflow_id: str, node_state: Dict[str, Any], version: int) -> None:
+        ...
+
+    def update_status(
+        self,
+        workflow_id: str,
+        state: Dict[str, Any],
+        *,
+        board_id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+    ) -> None:
+        """Replace the listing fields and state; ``board_id``/``owner_id`` locate its listings for re-scoring."""
+        ...
+
+    def publish(self, workflow_id: str, key: str, event: Dict[str, Any]) -> None:
+        ...
+
+    async def load_record(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    async def load_state(self, workflow_id: str, since_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        ...
+
+    async def load_summary(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    async def summaries(
+        self,
+        *,
+        board_id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[ListingKey] = None,
+    ) -> List[Dict[str, Any]]:
+        """Newest-first by ``updated_at``, strictly older than ``after``, at most ``limit`` of them."""
+        ...
+
+
+def _split_record(
+    record: Dict[str, Any],
+    node_versions: Optional[Dict[str, int]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Tuple[int, Dict[str, Any]]]]:
+    """Break an execution record into listing metadata and per-node entries."""
+
+    state = dict(record["state"])
+    node_states = state.pop("node_states", None) or []
+    version = int(state.get("version") or 0)
+    meta = {
+        "workflow_id": record["workflow_id"],
+        "board_id": record["board_id"],
+        "owner_id": record.get("owner_id"),
+        "created_at": record["created_at"],
+        "updated_at": record["updated_at"],
+        "status": state.get("status"),
+        "version": version,
+        "state": state,
+        "order": [node_state["node_id"] for node_state in node_states],
+    }
+    node_versions = node_versions or {}
+    nodes = {
+        node_state["node_id"]: (node_versions.get(node_state["node_id"], version), node_state)
+        for node_state in node_states
+    }
+    return meta, nodes
+
+
+def _assemble_state(
+    meta: Dict[str, Any],
+    nodes: Dict[str, Tuple[int, Dict[str, Any]]],
+    since_version: Optional[int],
+) -> Dict[str, Any]:
+    state = dict(meta["state"])
+    state["version"] = int(meta.get("version") or 0)
+    if since_version is not None and since_version < int(state.get("node_set_version") or 0):
+        # Nodes were added or removed since then; only a full snapshot shows the removals.
+        since_version = None
+    order: List[str] = list(meta.get("order") or [])
+    known = set(order)
+    order.extend(sorted(node_id for node_id in nodes if node_id not in known))
+    node_states: List[Dict[str, Any]] = []
+    for node_id in order:
+        entry = nodes.get(node_id)
+        if entry is None:
+            continue
+        if since_version is None or entry[0] > since_version:
+            node_states.append(entry[1])
+    state["node_states"] = node_states
+    return state
+
+
+_SUMMARY_FIELDS = ("workflow_id", "board_id", "owner_id", "status", "created_at", "updated_at")
+
+
+def _summary(meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: meta.get(name) for name in _SUMMARY_FIELDS}
+
+
+class InMemoryStateBackend:
+    """Process-local stand-in for ``RedisStateBackend``, used by tests and single-worker setups.
+
+    Payloads are round-tripped through JSON so serialization problems surface the
+    same way they would against Redis.
+    """
+
+    def __init__(self) -> None:
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._nodes: Dict[str, Dict[str, Tuple[int, Dict[str, Any]]]] = {}
+        self._records: Dict[str, str] = {}
+        # listing scope (see _listing_scopes) -> ListingKey list kept sorted with bisect
+        self._listings: Dict[Tuple[Optional[str], ...], List[ListingKey]] = {}
+        self._listeners: List[StateListener] = []
+
+    def add_listener(self, listener: StateListener) -> None:
+        self._listeners.append(listener)
+
+    async def start(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    def save_record(self, record: Dict[str, Any], node_versions: Optional[Dict[str, int]] = None) -> None:
+        payload = json.dumps(record, default=str, ensure_ascii=False)
+        meta, nodes = _split_record(json.loads(payload), node_versions)
+        workflow_id = meta["workflow_id"]
+        previous = self._meta.get(workflow_id)
+        self._records[workflow_id] = payload
+        self._meta[workflow_id] = meta
+        self._nodes[workflow_id] = nodes
+        self._relist(previous, meta)
+
+    def _relist(self, previous: Optional[Dict[str, Any]], meta: Dict[str, Any]) -> None:
+        """Move an execution from its old listing position (if any) to the one ``meta`` implies."""
+
+        workflow_id = meta["workflow_id"]
+        if previous is not None:
+            old_key = (listing_score(previous["updated_at"]), workflow_id)
+            for scope in _listing_scopes(previous["board_id"], previous.get("owner_id")):
+                keys = self._listings.get(scope, [])
+                position = bisect.bisect_left(keys, old_key)
+                if position < len(keys) and keys[position] == old_key:
+                    del keys[position]
+        key = (listing_score(meta["updated_at"]), workflow_id)
+        for scope in _listing_scopes(meta["board_id"], meta.get("owner_id")):
+            bisect.insort(self._listings.setdefault(scope, []), key)
+
+    def update_node(self, workflow_id: str, node_state: Dict[str, Any], version: int) -> None:
+        meta = self._meta.get(workflow_id)
+        if meta is None:
+            return
+        entry = json.loads(json.dumps(node_state, default=str, ensure_ascii=False))
+        self._nodes[workflow_id][entry["node_id"]] = (version, entry)
+        meta["version"] = max(int(meta.get("version") or 0), version)
+
+    def update_status(
+        self,
+        workflow_id: str,
+        state: Dict[str, Any],
+        *,
+        board_id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+    ) -> None:
+        previous = self._meta.get(workflow_id)
+        if previous is None:
+            return
+        meta = dict(previous)
+        state = json.loads(json.dumps(state, default=str, ensure_ascii=False))
+        state.pop("node_states", None)
+        meta["state"] = state
+        meta["status"] = state.get("status")
+        meta["updated_at"] = state.get("updated_at") or meta.get("updated_at")
+        meta["version"] = max(int(meta.get("version") or 0), int(state.get("version") or 0))
+        self._meta[workflow_id] = meta
+        self._relist(previous, meta)
+
+    def publish(self, workflow_id: str, key: str, event: Dict[str, Any]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(workflow_id, key, event)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Workflow state listener failed")
+
+    async def load_record(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        payload = self._records.get(workflow_id)
+        return json.loads(payload) if payload is not None else None
+
+    async def load_state(self, workflow_id: str, since_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        meta = self._meta.get(workflow_id)
+        if meta is None:
+            return None
+        return _assemble_state(meta, self._nodes.get(workflow_id, {}), since_version)
+
+    async def load_summary(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        meta = self._meta.get(workflow_id)
+        return _summary(meta) if meta is not None else None
+
+    async def summaries(
+        self,
+        *,
+        board_id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[ListingKey] = None,
+    ) -> List[Dict[str, Any]]:
+        keys = self._listings.get(_listing_scope(board_id, owner_id), [])
+        end = bisect.bisect_left(keys, after) if after is not None else len(keys)
+        start = max(0, end - limit) if limit is not None else 0
+        return [_summary(self._meta[workflow_id]) for _, workflow_id in reversed(keys[start:end])]
+
+
+class RedisStateBackend:
+    """Redis-backed state shared by every uvicorn worker and host.
+
+    Key layout, all under ``prefix`` and expiring after ``ttl`` seconds:
+
+    - ``{id}:meta``   hash of listing fields, the state (sans nodes) and node order
+    - ``{id}:nodes``  hash of node_id -> ``{"version": ..., "state": ...}``
+    - ``{id}:record`` full ``WorkflowExecution.to_record()`` written at checkpoints
+    - ``listing:all``, ``listing:board:{board_id}``, ``listing:owner:{owner_id}``
+      and ``listing:board_owner:{board_id}:{owner_id}`` sorted sets of workflow
+      ids scored by ``updated_at`` and re-scored on every status write. Members
+      with equal scores sort by id, so a page is one ``ZREVRANGEBYSCORE ...
+      LIMIT`` from the cursor down in the one set matching the query's filters.
+      Entries not updated for ``ttl`` are trimmed on write and dangling ones
+      are removed on read.
+
+    Writes are coalesced per key in memory and flushed by a background task, one
+    MULTI/EXEC transaction per batch; a batch whose transaction fails is put back
+    ahead of newer writes and retried. Events go out on ``events:{id}`` channels
+    and every backend instance pattern-subscribes to all of them.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        prefix: str = "admagic:workflow:",
+        ttl: int = 7 * 24 * 3600,
+        max_pending: int = 10000,
+    ) -> None:
+        if aioredis is None:
+            raise RuntimeError("redis package is required for RedisStateBackend (pip install redis)")
+        self.url = url
+        self.prefix = prefix
+        self.ttl = ttl
+        self.max_pending = max(1, max_pending)
+        self.page_batch = 200
+        self._client = aioredis.from_url(url, decode_responses=True)
+        self._listeners: List[StateListener] = []
+        self._pending: "OrderedDict[Tuple[str, str, str], Tuple[str, Any]]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._subscriber: Optional[asyncio.Task] = None
+        self._control_sequence = itertools.count()
+        self.dropped = 0
+
+    def add_listener(self, listener: StateListener) -> None:
+        self._listeners.append(listener)
+
+    async def start(self) -> None:
+        if self._flusher is None:
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+        if self._subscriber is None:
+            self._subscriber = asyncio.create_task(self._subscribe_loop())
+
+    async def close(self) -> None:
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            await asyncio.gather(self._subscriber, return_exceptions=True)
+            self._subscriber = None
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self._flush()
+        await self._client.close()
+
+    # Writers -----------------------------------------------------------------
+
+    def save_record(self, record: Dict[str, Any], node_versions: Optional[Dict[str, int]] = None) -> None:
+        workflow_id = record["workflow_id"]
+        # A full record supersedes any node or status writes still queued for it.
+        for key in [key for key in self._pending if key[1] == workflow_id and key[0] in {"node", "status"}]:
+            del self._pending[key]
+        payload = json.dumps(record, default=str, ensure_ascii=False)
+        self._enqueue(("record", workflow_id, ""), "record", (payload, dict(node_versions or {})))
+
+    def update_node(self, workflow_id: str, node_state: Dict[str, Any], version: int) -> None:
+        payload = json.dumps({"version": version, "state": node_state}, default=str, ensure_ascii=False)
+        self._enqueue(("node", workflow_id, node_state["node_id"]), "node", (version, payload))
+
+    def update_status(
+        self,
+        workflow_id: str,
+        state: Dict[str, Any],
+        *,
+        board_id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+    ) -> None:
+        state = {name: value for name, value in state.items() if name != "node_states"}
+        payload = json.dumps(state, default=str, ensure_ascii=False)
+        self._enqueue(("status", workflow_id, ""), "status", (payload, board_id, owner_id))
+
+    def publish(self, workflow_id: str, key: str, event: Dict[str, Any]) -> None:
+        payload = json.dumps({"key": key, "event": event}, default=str, ensure_ascii=False)
+        # Control messages are commands, not state, and must never be coalesced away.
+        if key == CONTROL_KEY:
+            slot = ("control", workflow_id, str(next(self._control_sequence)))
+        else:
+            slot = ("event", workflow_id, key)
+        self._enqueue(slot, "event", payload)
+
+    def _enqueue(self, slot: Tuple[str, str, str], kind: str, value: Any) -> None:
+        self._pending.pop(slot, None)
+        if len(self._pending) >= self.max_pending:
+            # Redis is unreachable or slow; drop the oldest write rather than grow unbounded.
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._pending[slot] = (kind, value)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await self._flush()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to flush workflow state to Redis")
+                await asyncio.sleep(1.0)
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+        # Writes queued while the transaction is in flight land in a fresh dict; the
+        # batch is put back if the transaction fails so nothing is lost on a Redis error.
+        batch = list(self._pending.items())
+        self._pending.clear()
+        try:
+            await self._execute(batch)
+        except BaseException:
+            self._requeue(batch)
+            raise
+
+    def _requeue(self, batch: List[Tuple[Tuple[str, str, str], Tuple[str, Any]]]) -> None:
+        """Put a failed batch back ahead of newer writes, unless one of those supersedes it."""
+
+        newer = self._pending
+        recorded = {workflow_id for kind, workflow_id, _ in newer if kind == "record"}
+        restored: "OrderedDict[Tuple[str, str, str], Tuple[str, Any]]" = OrderedDict()
+        for slot, entry in batch:
+            if slot in newer or (slot[0] in {"node", "status"} and slot[1] in recorded):
+                continue
+            restored[slot] = entry
+        restored.update(newer)
+        while len(restored) > self.max_pending:
+            restored.popitem(last=False)
+            self.dropped += 1
+        self._pending = restored
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _execute(self, batch: List[Tuple[Tuple[str, str, str], Tuple[str, Any]]]) -> None:
+        pipe = self._client.pipeline(transaction=True)
+        for (_, workflow_id, field_name), (kind, value) in batch:
+            base = f"{self.prefix}{workflow_id}"
+            if kind == "record":
+                payload, node_versions = value
+                meta, nodes = _split_record(json.loads(payload), node_versions)
+                pipe.set(f"{base}:record", payload, ex=self.ttl)
+                pipe.delete(f"{base}:nodes")
+                if nodes:
+                    pipe.hset(
+                        f"{base}:nodes",
+                        mapping={
+                            node_id: json.dumps({"version": entry[0], "state": entry[1]}, ensure_ascii=False)
+                            for node_id, entry in nodes.items()
+                        },
+                    )
+                pipe.hset(f"{base}:meta", mapping=self._meta_mapping(meta))
+                self._list(pipe, workflow_id, meta["board_id"], meta.get("owner_id"), meta["updated_at"])
+                pipe.expire(f"{base}:nodes", self.ttl)
+                pipe.expire(f"{base}:meta", self.ttl)
+            elif kind == "node":
+                version, payload = value
+                pipe.hset(f"{base}:nodes", field_name, payload)
+                pipe.hset(f"{base}:meta", "version", version)
+            elif kind == "status":
+                payload, board_id, owner_id = value
+                state = json.loads(payload)
+                mapping = {
+                    "state": payload,
+                    "status": state.get("status") or "",
+                    "version": int(state.get("version") or 0),
+                }
+                if state.get("updated_at"):
+                    mapping["updated_at"] = state["updated_at"]
+                    if board_id:
+                        self._list(pipe, workflow_id, board_id, owner_id, state["updated_at"])
+                pipe.hset(f"{base}:meta", mapping=mapping)
+            else:
+                pipe.publish(f"{self.prefix}events:{workflow_id}", value)
+        await pipe.execute()
+
+    @staticmethod
+    def _meta_mapping(meta: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "workflow_id": meta["workflow_id"],
+            "board_id": meta["board_id"],
+            "owner_id": meta.get("owner_id") or "",
+            "created_at": meta["created_at"],
+            "updated_at": meta["updated_at"],
+            "status": meta.get("status") or "",
+            "version": meta["version"],
+            "state": json.dumps(meta["state"], ensure_ascii=False),
+            "order": json.dumps(meta["order"], ensure_ascii=False),
+        }
+
+    async def _subscribe_loop(self) -> None:
+        channel_prefix = f"{self.prefix}events:"
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{channel_prefix}*")
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    workflow_id = str(message["channel"])[len(channel_prefix):]
+                    data = json.loads(message["data"])
+                    for listener in list(self._listeners):
+                        try:
+                            listener(workflow_id, data["key"], data["event"])
+                        except Exception:  # pylint: disable=broad-except
+                            logger.exception("Workflow state listener failed")
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Workflow event subscription lost; reconnecting")
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.close()
+
+    # Readers -----------------------------------------------------------------
+
+    async def load_record(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        payload = await self._client.get(f"{self.prefix}{workflow_id}:record")
+        return json.loads(payload) if payload else None
+
+    async def load_state(self, workflow_id: str, since_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        base = f"{self.prefix}{workflow_id}"
+        pipe = self._client.pipeline(transaction=True)
+        pipe.hgetall(f"{base}:meta")
+        pipe.hgetall(f"{base}:nodes")
+        raw_meta, raw_nodes = await pipe.execute()
+        if not raw_meta:
+            return None
+        meta = self._decode_meta(raw_meta)
+        nodes: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        for node_id, payload in raw_nodes.items():
+            entry = json.loads(payload)
+            nodes[node_id] = (int(entry["version"]), entry["state"])
+        return _assemble_state(meta, nodes, since_version)
+
+    async def load_summary(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        values = await self._client.hmget(f"{self.prefix}{workflow_id}:meta", list(_SUMMARY_FIELDS))
+        return self._decode_summary(values)
+
+    def _listing_key(self, scope: Tuple[Optional[str], ...]) -> str:
+        return f"{self.prefix}listing:{':'.join(str(part) for part in scope)}"
+
+    def _list(
+        self,
+        pipe: Any,
+        workflow_id: str,
+        board_id: str,
+        owner_id: Optional[str],
+        updated_at: Any,
+    ) -> None:
+        """Queue (re-)scoring ``workflow_id`` in every listing it belongs to."""
+
+        score = listing_score(updated_at)
+        horizon = time.time() - self.ttl
+        for scope in _listing_scopes(board_id, owner_id):
+            listing = self._listing_key(scope)
+            pipe.zadd(listing, {workflow_id: score})
+            pipe.zremrangebyscore(listing, "-inf", horizon)
+            pipe.expire(listing, self.ttl)
+
+    async def summaries(
+        self,
+        *,
+        board_id: Optional[str] = None,
+        owner_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[ListingKey] = None,
+    ) -> List[Dict[str, Any]]:
+        listing = self._listing_key(_listing_scope(board_id, owner_id))
+        # Inclusive upper bound: members tied with the cursor's score but with a smaller id
+        # still belong on this page; the ones at or above the cursor id are skipped below.
+        upper: Any = after[0] if after is not None else "+inf"
+        batch = min(limit, self.page_batch) if limit is not None else self.page_batch
+        items: List[Dict[str, Any]] = []
+        dangling: List[str] = []
+        offset = 0
+        while limit is None or len(items) < limit:
+            rows = await self._client.zrevrangebyscore(
+                listing, upper, "-inf", start=offset, num=batch, withscores=True
+            )
+            offset += len(rows)
+            candidates = [
+                workflow_id
+                for workflow_id, score in rows
+                if after is None or score < after[0] or workflow_id < after[1]
+            ]
+            if candidates:
+                pipe = self._client.pipeline(transaction=False)
+                for workflow_id in candidates:
+                    pipe.hmget(f"{self.prefix}{workflow_id}:meta", list(_SUMMARY_FIELDS))
+                for workflow_id, values in zip(candidates, await pipe.execute()):
+                    item = self._decode_summary(values)
+                    if item is None:
+                        dangling.append(workflow_id)
+                        continue
+                    items.append(item)
+                    if limit is not None and len(items) >= limit:
+                        break
+            if len(rows) < batch:
+                break
+        if dangling:
+            # The execution's keys expired; forget it so later pages do not walk past it again.
+            await self._client.zrem(listing, *dangling)
+        return items
+
+    @staticmethod
+    def _decode_summary(values: List[Optional[str]]) -> Optional[Dict[str, Any]]:
+        if not values or values[0] is None:
+            return None
+        item: Dict[str, Any] = dict(zip(_SUMMARY_FIELDS, values))
+        item["owner_id"] = item["owner_id"] or None
+        return item
+
+    @staticmethod
+    def _decode_meta(raw: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            "workflow_id": raw.get("workflow_id"),
+            "board_id": raw.get("board_id"),
+            "owner_id": raw.get("owner_id") or None,
+            "created_at": raw.get("created_at"),
+            "updated_at": raw.get("updated_at"),
+            "status": raw.get("status"),
+            "version": int(raw.get("version") or 0),
+            "state": json.loads(raw.get("state") or "{}"),
+            "order": json.loads(raw.get("order") or "[]"),
+        }
@@ -0,0 +1,230 @@
+"""Tiled image upscaling on disk-backed scratch frames.
+
+The output frame never exists in process memory: it is a ``numpy.memmap``
+scratch file that worker processes fill tile by tile, and the final PNG is
+encoded from it in row bands. Peak RSS therefore depends on the tile size and
+the source image, not on the output resolution. Requires the optional
+``numpy`` and ``Pillow`` packages (see ``COMPOSITOR_AVAILABLE``).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from workflow_compositor import COMPOSITOR_AVAILABLE, FETCH_TIMEOUT, load_image
+
+try:  # Optional dependencies, see workflow_compositor.
+    import numpy as np
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the deployment
+    np = None
+    Image = None
+
+DEFAULT_TILE_SIZE = 512
+# Tile edges are clamped to this range: a tile is resampled in memory, so huge tiles bring back full-frame RSS.
+MIN_TILE_SIZE = 16
+MAX_TILE_SIZE = 2048
+# 8K UHD (7680 x 4320).
+DEFAULT_MAX_PIXELS = 7680 * 4320
+DEFAULT_SCALE = 2.0
+# Raw bytes fed to zlib per IDAT chunk while encoding.
+ENCODE_BAND_BYTES = 4 * 1024 * 1024
+# Extra source pixels around each tile so the resampling kernel sees the same
+# neighbourhood as a full-frame resize and tile seams stay invisible.
+_KERNEL_SUPPORT = 3
+
+
+def output_size(
+    width: int,
+    height: int,
+    parameters: Dict[str, Any],
+    *,
+    max_pixels: int = DEFAULT_MAX_PIXELS,
+) -> Tuple[int, int]:
+    """Target size from ``target_width`` / ``target_height`` or ``scale`` node parameters."""
+
+    target_width = int(parameters.get("target_width") or 0)
+    target_height = int(parameters.get("target_height") or 0)
+    if target_width and target_height:
+        size = (target_width, target_height)
+    elif target_width:
+        size = (target_width, max(1, int(round(height * target_width / width))))
+    elif target_height:
+        size = (max(1, int(round(width * target_height / height))), target_height)
+    else:
+        scale = float(parameters.get("scale") or DEFAULT_SCALE)
+        if scale <= 0:
+            raise ValueError("scale must be positive")
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    if size[0] <= 0 or size[1] <= 0:
+        raise ValueError("target size must be positive")
+    if size[0] * size[1] > max_pixels:
+        raise ValueError(f"upscaled size {size[0]}x{size[1]} exceeds the limit of {max_pixels} pixels")
+    return size
+
+
+def prepare_upscale(
+    source_url: str,
+    parameters: Dict[str, Any],
+    directory: str,
+    scratch: str,
+    *,
+    source_path: Optional[str] = None,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    max_pixels: int = DEFAULT_MAX_PIXELS,
+    fetch_timeout: float = FETCH_TIMEOUT,
+) -> Dict[str, Any]:
+    """Decode the source into a scratch memmap and allocate the output frame.
+
+    Runs in the executor process pool and returns a picklable plan for
+    ``upscale_tile`` and ``encode_upscaled``; if ``<directory>/<key>.png``
+    already exists the plan is marked ``cached`` and has no scratch files.
+    ``scratch`` is an empty directory owned by the caller, who removes it
+    whatever happens (this function may be abandoned mid-way on cancel).
+    ``source_path`` is a local copy of ``source_url`` (e.g. an earlier
+    preview) that is read instead of fetching the URL; ``fetch_timeout``
+    bounds the download otherwise. The output key hashes the decoded
+    source pixels, so new content behind a stable URL is never served stale.
+    """
+
+    if not COMPOSITOR_AVAILABLE:
+        raise RuntimeError("Local upscaling requires numpy and Pillow")
+
+    if source_path is not None:
+        image = Image.open(source_path)
+        image.load()
+    else:
+        image = load_image(source_url, timeout=fetch_timeout)
+    width, height = output_size(image.width, image.height, parameters, max_pixels=max_pixels)
+    rgb = image.convert("RGB")
+    image.close()
+    pixels = np.asarray(rgb)
+    digest = hashlib.sha256(f"upscale:{width}x{height}:{rgb.width}x{rgb.height}:".encode("utf-8"))
+    digest.update(memoryview(np.ascontiguousarray(pixels)).cast("B"))
+    key = digest.hexdigest()
+    plan: Dict[str, Any] = {"key": key, "width": width, "height": height, "source_size": rgb.size}
+    if os.path.isfile(os.path.join(directory, f"{key}.png")):
+        return {**plan, "cached": True, "tiles": []}
+
+    source_frame = np.memmap(
+        os.path.join(scratch, "source.u8"), dtype=np.uint8, mode="w+", shape=(rgb.height, rgb.width, 3)
+    )
+    source_frame[...] = pixels
+    source_frame.flush()
+    del source_frame, pixels, rgb
+    # Sparse file: disk blocks are only allocated as tiles are written.
+    np.memmap(os.path.join(scratch, "output.u8"), dtype=np.uint8, mode="w+", shape=(height, width, 3)).flush()
+
+    tile = min(MAX_TILE_SIZE, max(MIN_TILE_SIZE, tile_size))
+    tiles = [
+        (left, top, min(left + tile, width), min(top + tile, height))
+        for top in range(0, height, tile)
+        for left in range(0, width, tile)
+    ]
+    return {**plan, "cached": False, "scratch": scratch, "tiles": tiles}
+
+
+def plan_tiles(plan: Dict[str, Any]) -> List[Tuple[Dict[str, Any], Tuple[int, int, int, int]]]:
+    """Per-tile jobs for ``map_in_process``; the plan dict is small, so pickling it per tile is cheap."""
+
+    if plan["cached"]:
+        return []
+    job_plan = {name: plan[name] for name in ("scratch", "width", "height", "source_size")}
+    return [(job_plan, tile) for tile in plan["tiles"]]
+
+
+def upscale_tile(job: Tuple[Dict[str, Any], Tuple[int, int, int, int]]) -> None:
+    """Resample one output tile from the source memmap straight into the output memmap."""
+
+    plan, (left, top, right, bottom) = job
+    source_width, source_height = plan["source_size"]
+    width, height = plan["width"], plan["height"]
+    source = np.memmap(
+        os.path.join(plan["scratch"], "source.u8"), dtype=np.uint8, mode="r", shape=(source_height, source_width, 3)
+    )
+    output = np.memmap(os.path.join(plan["scratch"], "output.u8"), dtype=np.uint8, mode="r+", shape=(height, width, 3))
+
+    ratio_x = source_width / width
+    ratio_y = source_height / height
+    box = (left * ratio_x, top * ratio_y, right * ratio_x, bottom * ratio_y)
+    margin = int(math.ceil(_KERNEL_SUPPORT * max(ratio_x, ratio_y, 1.0))) + 1
+    crop_left = max(0, int(math.floor(box[0])) - margin)
+    crop_top = max(0, int(math.floor(box[1])) - margin)
+    crop_right = min(source_width, int(math.ceil(box[2])) + margin)
+    crop_bottom = min(source_height, int(math.ceil(box[3])) + margin)
+
+    crop = Image.fromarray(np.ascontiguousarray(source[crop_top:crop_bottom, crop_left:crop_right]), "RGB")
+    resized = crop.resize(
+        (right - left, bottom - top),
+        Image.LANCZOS,
+        box=(box[0] - crop_left, box[1] - crop_top, box[2] - crop_left, box[3] - crop_top),
+    )
+    output[top:bottom, left:right] = np.asarray(resized)
+    output.flush()
+
+
+def encode_upscaled(plan: Dict[str, Any], directory: str) -> Dict[str, Any]:
+    """Stream the output frame into ``<directory>/<key>.png`` and drop the scratch files."""
+
+    path = os.path.join(directory, f"{plan['key']}.png")
+    try:
+        if not plan["cached"] and not os.path.isfile(path):
+            os.makedirs(directory, exist_ok=True)
+            handle, temporary = tempfile.mkstemp(dir=directory, suffix=".part")
+            try:
+                with open(os.path.join(plan["scratch"], "output.u8"), "rb") as frame, os.fdopen(handle, "wb") as stream:
+                    _write_png(stream, frame, plan["width"], plan["height"])
+            except BaseException:
+                os.unlink(temporary)
+                raise
+            os.replace(temporary, path)
+    finally:
+        discard_scratch(plan)
+    return {"key": plan["key"], "width": plan["width"], "height": plan["height"]}
+
+
+def discard_scratch(plan: Optional[Dict[str, Any]]) -> None:
+    if plan and plan.get("scratch"):
+        shutil.rmtree(plan["scratch"], ignore_errors=True)
+
+
+def _write_png(stream, frame, width: int, height: int) -> None:
+    """Minimal streaming RGB8 PNG encoder: one band of rows in memory at a time.
+
+    Pillow needs the whole frame as a single image to encode it; this reads the
+    raw frame file band by band (plain reads, so encoding does not map the whole
+    output into the worker) and writes filter-type-0 scanlines through an
+    incremental zlib stream.
+    """
+
+    stream.write(b"\x89PNG\r\n\x1a\n")
+    _write_chunk(stream, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    compressor = zlib.compressobj(6)
+    rows = max(1, ENCODE_BAND_BYTES // (width * 3 + 1))
+    band = np.empty((rows, width * 3), dtype=np.uint8)
+    scanlines = np.zeros((rows, width * 3 + 1), dtype=np.uint8)
+    for top in range(0, height, rows):
+        count = min(rows, height - top)
+        if frame.readinto(band[:count]) != band[:count].nbytes:
+            raise ValueError("upscale scratch frame is truncated")
+        scanlines[:count, 1:] = band[:count]
+        data = compressor.compress(scanlines[:count].tobytes())
+        if data:
+            _write_chunk(stream, b"IDAT", data)
+    _write_chunk(stream, b"IDAT", compressor.flush())
+    _write_chunk(stream, b"IEND", b"")
+
+
+def _write_chunk(stream, kind: bytes, data: bytes) -> None:
+    stream.write(struct.pack(">I", len(data)))
+    stream.write(kind)
+    stream.write(data)
+    stream.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+